@@ -0,0 +1,83 @@
+"""Initial schema: users, images and jobs
+
+Databases created by the API's old create_all startup already have these
+tables; they are left as they are and only stamped.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name: str) -> bool:
+    # Offline (--sql) runs cannot inspect, and emit the full DDL
+    if op.get_context().as_sql:
+        return False
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if not _has_table("users"):
+        op.create_table(
+            "users",
+            sa.Column("id", UUID(as_uuid=True), primary_key=True),
+            sa.Column("email", sa.String(), nullable=False),
+            sa.Column("hashed_password", sa.String(), nullable=False),
+            sa.Column("credits_remaining", sa.Integer()),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("last_login", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    if not _has_table("images"):
+        op.create_table(
+            "images",
+            sa.Column("id", UUID(as_uuid=True), primary_key=True),
+            sa.Column("user_id", UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("original_filename", sa.String(), nullable=False),
+            sa.Column("original_url", sa.String(), nullable=False),
+            sa.Column("room_type", sa.String()),
+            sa.Column("width", sa.Integer()),
+            sa.Column("height", sa.Integer()),
+            sa.Column("file_size", sa.Integer()),
+            sa.Column("format", sa.String()),
+            sa.Column("created_at", sa.DateTime()),
+        )
+
+    if not _has_table("jobs"):
+        op.create_table(
+            "jobs",
+            sa.Column("id", UUID(as_uuid=True), primary_key=True),
+            sa.Column("user_id", UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("image_id", UUID(as_uuid=True), sa.ForeignKey("images.id"), nullable=False),
+            sa.Column("room_type", sa.String(), nullable=False),
+            sa.Column("style_preset", sa.String(), nullable=False),
+            sa.Column("fix_white_balance", sa.Boolean()),
+            sa.Column("wall_decorations", sa.Boolean()),
+            sa.Column("include_tv", sa.Boolean()),
+            sa.Column("status", sa.String()),
+            sa.Column("retry_count", sa.Integer()),
+            sa.Column("error_message", sa.String(), nullable=True),
+            sa.Column("progress_percent", sa.Float()),
+            sa.Column("current_step", sa.String(), nullable=True),
+            sa.Column("generation_time_seconds", sa.Integer(), nullable=True),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("started_at", sa.DateTime(), nullable=True),
+            sa.Column("completed_at", sa.DateTime(), nullable=True),
+            sa.Column("result_url", sa.String(), nullable=True),
+        )
+
+
+def downgrade():
+    op.drop_table("jobs")
+    op.drop_table("images")
+    op.drop_index("ix_users_email", table_name="users")
+    op.drop_table("users")
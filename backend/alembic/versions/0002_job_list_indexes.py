@@ -0,0 +1,37 @@
+"""Keyset pagination indexes for list_jobs
+
+Built CONCURRENTLY so a populated jobs table stays writable meanwhile.
+IF NOT EXISTS adopts the ones the old startup schema sync created.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# (name, columns); each filter of list_jobs leads one of these, ahead of
+# the (created_at, id) sort key
+INDEXES = [
+    ("ix_jobs_created_at_id", ["created_at", "id"]),
+    ("ix_jobs_status_created_at_id", ["status", "created_at", "id"]),
+    ("ix_jobs_user_id_created_at_id", ["user_id", "created_at", "id"]),
+    ("ix_jobs_room_type_style_preset_created_at_id", ["room_type", "style_preset", "created_at", "id"]),
+    ("ix_jobs_style_preset_created_at_id", ["style_preset", "created_at", "id"]),
+]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES:
+            op.create_index(name, "jobs", columns, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, _ in INDEXES:
+            op.drop_index(name, table_name="jobs", if_exists=True, postgresql_concurrently=True)
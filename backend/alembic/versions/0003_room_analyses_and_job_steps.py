@@ -0,0 +1,61 @@
+"""Room analysis cache and per-step job timings
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name: str) -> bool:
+    # Offline (--sql) runs cannot inspect, and emit the full DDL
+    if op.get_context().as_sql:
+        return False
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if not _has_table("room_analyses"):
+        op.create_table(
+            "room_analyses",
+            sa.Column("id", UUID(as_uuid=True), primary_key=True),
+            sa.Column("image_hash", sa.String(64), nullable=False),
+            sa.Column("model", sa.String(), nullable=False),
+            sa.Column("prompt_version", sa.String(), nullable=False),
+            sa.Column("analysis", sa.Text(), nullable=False),
+            sa.Column("created_at", sa.DateTime()),
+            sa.UniqueConstraint("image_hash", "model", "prompt_version", name="uq_room_analyses_key"),
+        )
+
+    if not _has_table("job_steps"):
+        op.create_table(
+            "job_steps",
+            sa.Column("id", UUID(as_uuid=True), primary_key=True),
+            sa.Column("job_id", UUID(as_uuid=True), sa.ForeignKey("jobs.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("attempt", sa.Integer()),
+            sa.Column("step", sa.String(), nullable=False),
+            sa.Column("status", sa.String(), nullable=False),
+            sa.Column("error_message", sa.String(), nullable=True),
+            sa.Column("model", sa.String(), nullable=True),
+            sa.Column("started_at", sa.DateTime()),
+            sa.Column("duration_seconds", sa.Float(), nullable=False),
+            sa.Column("prompt_tokens", sa.Integer()),
+            sa.Column("completion_tokens", sa.Integer()),
+            sa.Column("cost_usd", sa.Float(), nullable=True),
+            sa.Column("bytes_sent", sa.BigInteger()),
+            sa.Column("bytes_received", sa.BigInteger()),
+        )
+        op.create_index("ix_job_steps_job_id", "job_steps", ["job_id"])
+
+
+def downgrade():
+    op.drop_index("ix_job_steps_job_id", table_name="job_steps")
+    op.drop_table("job_steps")
+    op.drop_table("room_analyses")
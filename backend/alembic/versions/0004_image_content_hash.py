@@ -0,0 +1,36 @@
+"""SHA-256 of uploaded images, keying the analysis cache
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def _has_column(table: str, column: str) -> bool:
+    # Offline (--sql) runs cannot inspect, and emit the full DDL
+    if op.get_context().as_sql:
+        return False
+    return column in {c["name"] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    if not _has_column("images", "content_hash"):
+        op.add_column("images", sa.Column("content_hash", sa.String(64), nullable=True))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_images_content_hash", "images", ["content_hash"],
+            if_not_exists=True, postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_images_content_hash", table_name="images", if_exists=True, postgresql_concurrently=True)
+    op.drop_column("images", "content_hash")
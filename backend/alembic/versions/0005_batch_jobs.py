@@ -0,0 +1,79 @@
+"""Batch jobs: parent link and batch parent flag
+
+parent_job_id was first added by the startup schema sync, without its
+foreign key or index. The foreign key is added NOT VALID and validated
+in its own transaction, so jobs is not locked against writes while
+existing rows are checked.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def _inspector():
+    # Offline (--sql) runs cannot inspect, and emit the full DDL
+    return None if op.get_context().as_sql else sa.inspect(op.get_bind())
+
+
+def _has_column(table: str, column: str) -> bool:
+    inspector = _inspector()
+    return inspector is not None and column in {c["name"] for c in inspector.get_columns(table)}
+
+
+def _has_foreign_key(table: str, column: str) -> bool:
+    inspector = _inspector()
+    return inspector is not None and any(
+        fk["constrained_columns"] == [column] for fk in inspector.get_foreign_keys(table)
+    )
+
+
+def upgrade():
+    if not _has_column("jobs", "parent_job_id"):
+        op.add_column("jobs", sa.Column("parent_job_id", UUID(as_uuid=True), nullable=True))
+    add_foreign_key = not _has_foreign_key("jobs", "parent_job_id")
+    if add_foreign_key:
+        op.execute(
+            "ALTER TABLE jobs ADD CONSTRAINT jobs_parent_job_id_fkey "
+            "FOREIGN KEY (parent_job_id) REFERENCES jobs (id) NOT VALID"
+        )
+
+    # A constant default only touches the catalog on Postgres 11+
+    if not _has_column("jobs", "is_batch_parent"):
+        op.add_column(
+            "jobs",
+            sa.Column("is_batch_parent", sa.Boolean(), nullable=False, server_default=sa.false())
+        )
+    op.execute(
+        "UPDATE jobs SET is_batch_parent = true "
+        "WHERE NOT is_batch_parent AND id IN (SELECT parent_job_id FROM jobs WHERE parent_job_id IS NOT NULL)"
+    )
+
+    with op.get_context().autocommit_block():
+        if add_foreign_key:
+            op.execute("ALTER TABLE jobs VALIDATE CONSTRAINT jobs_parent_job_id_fkey")
+        op.create_index(
+            "ix_jobs_parent_job_id", "jobs", ["parent_job_id"],
+            if_not_exists=True, postgresql_concurrently=True
+        )
+        op.create_index(
+            "ix_jobs_is_batch_parent_created_at_id", "jobs", ["is_batch_parent", "created_at", "id"],
+            if_not_exists=True, postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_jobs_is_batch_parent_created_at_id", table_name="jobs", if_exists=True, postgresql_concurrently=True)
+        op.drop_index("ix_jobs_parent_job_id", table_name="jobs", if_exists=True, postgresql_concurrently=True)
+    op.drop_column("jobs", "is_batch_parent")
+    op.drop_constraint("jobs_parent_job_id_fkey", "jobs", type_="foreignkey")
+    op.drop_column("jobs", "parent_job_id")
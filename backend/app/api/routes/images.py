@@ -1,40 +1,62 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.base import get_db
 from app.models.image import Image
-from app.schemas.image import ImageRead, ImageRead
-from app.services.storage import storage_service
+from app.schemas.image import ImageRead, ImageUploadRequest, ImageUploadTicket, ImageUploadComplete, PresignedUrl
+from app.services.storage import storage_service, UploadTooLargeError
 from app.core.config import settings
+from app.services.worker import queue_speculative_analysis
+from app.services.analysis_cache import get_cached_analysis, mark_speculative_analysis
+from typing import Optional
 import uuid
 
 router = APIRouter()
 
+async def _start_speculative_analysis(db_image: Image, requested: Optional[bool]):
+    """
+    Queues a low-priority room analysis so it is (or is being) done by the
+    time the user has picked room type and style.
+    """
+    enabled = settings.SPECULATIVE_ANALYSIS_ENABLED if requested is None else requested
+    if not enabled:
+        return
+    if db_image.content_hash and await get_cached_analysis(db_image.content_hash) is not None:
+        return
+    await mark_speculative_analysis(db_image.id, "queued")
+    queue_speculative_analysis(str(db_image.id))
+
 @router.post("/upload", response_model=ImageRead)
 async def upload_image(
     file: UploadFile = File(...),
+    speculative_analysis: Optional[bool] = Query(None),
     db: AsyncSession = Depends(get_db)
 ):
     # For MVP, assume a fixed user ID if not provided
     # In a real app, this would come from auth
     user_id = uuid.UUID(settings.DEFAULT_USER_ID)
     
-    file_content = await file.read()
     file_extension = file.filename.split(".")[-1]
     object_name = f"{uuid.uuid4()}.{file_extension}"
     
-    url = await storage_service.upload_file(
-        settings.BUCKET_UPLOADS,
-        object_name,
-        file_content,
-        file.content_type
-    )
+    # Stream the spooled upload to storage instead of reading it into memory
+    try:
+        url, file_size, content_hash = await storage_service.upload_stream(
+            settings.BUCKET_UPLOADS,
+            object_name,
+            file.file,
+            file.content_type
+        )
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     
     db_image = Image(
         id=uuid.uuid4(),
         user_id=user_id,
         original_filename=file.filename,
         original_url=url,
-        file_size=len(file_content),
+        file_size=file_size,
+        content_hash=content_hash,
         format=file.content_type
     )
     
@@ -42,9 +64,104 @@ async def upload_image(
     await db.commit()
     await db.refresh(db_image)
     
+    await _start_speculative_analysis(db_image, speculative_analysis)
+    
+    return db_image
+
+@router.post("/presign", response_model=ImageUploadTicket)
+async def presign_upload(upload_in: ImageUploadRequest):
+    """
+    Issues a presigned POST form so the client uploads straight to storage,
+    which enforces UPLOAD_MAX_BYTES. Call /complete afterwards to register the image.
+    """
+    file_extension = upload_in.filename.split(".")[-1]
+    object_name = f"{uuid.uuid4()}.{file_extension}"
+    upload_url, fields = storage_service.presigned_post_form(
+        settings.BUCKET_UPLOADS, object_name, upload_in.content_type
+    )
+    return {
+        "upload_url": upload_url,
+        "fields": fields,
+        "object_name": object_name,
+        "expires_in": settings.STORAGE_PRESIGN_EXPIRY_SECONDS
+    }
+
+@router.post("/complete", response_model=ImageRead)
+async def complete_upload(
+    upload_in: ImageUploadComplete,
+    speculative_analysis: Optional[bool] = Query(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Registers an image uploaded through a presigned form. Calling it again
+    for the same object returns the image registered the first time.
+    """
+    user_id = uuid.UUID(settings.DEFAULT_USER_ID)
+    
+    # Only accept object names in the shape /presign hands out
+    stem = upload_in.object_name.split(".", 1)[0]
+    try:
+        uuid.UUID(stem)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid object name")
+    
+    # The image id is derived from the object, so a repeated call finds it
+    original_url = storage_service.get_url(settings.BUCKET_UPLOADS, upload_in.object_name)
+    image_id = uuid.uuid5(uuid.NAMESPACE_URL, original_url)
+    existing = await db.get(Image, image_id)
+    if existing:
+        return existing
+    
+    stat = await storage_service.stat_object(settings.BUCKET_UPLOADS, upload_in.object_name)
+    if stat is None:
+        raise HTTPException(status_code=404, detail="Uploaded object not found")
+    if stat.size > settings.UPLOAD_MAX_BYTES:
+        await storage_service.remove_object(settings.BUCKET_UPLOADS, upload_in.object_name)
+        raise HTTPException(status_code=413, detail=f"Upload exceeds the {settings.UPLOAD_MAX_BYTES} byte limit")
+    
+    # The bytes never pass through the API; the worker hashes them the
+    # first time it fetches the photo
+    db_image = Image(
+        id=image_id,
+        user_id=user_id,
+        original_filename=upload_in.original_filename,
+        original_url=original_url,
+        file_size=stat.size,
+        format=upload_in.content_type or stat.content_type
+    )
+    
+    db.add(db_image)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # A concurrent call registered it first
+        await db.rollback()
+        return await db.get(Image, image_id)
+    await db.refresh(db_image)
+    
+    await _start_speculative_analysis(db_image, speculative_analysis)
+    
     return db_image
 
 @router.get("/{image_id}", response_model=ImageRead)
 async def get_image(image_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
-    # Standard implementation to fetch image metadata
-    pass
+    db_image = await db.get(Image, image_id)
+    if not db_image:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return db_image
+
+@router.get("/{image_id}/download-url", response_model=PresignedUrl)
+async def get_image_download_url(image_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
+    """
+    Short-lived presigned GET URL for the original upload.
+    """
+    db_image = await db.get(Image, image_id)
+    if not db_image:
+        raise HTTPException(status_code=404, detail="Image not found")
+    location = storage_service.split_url(db_image.original_url)
+    if not location:
+        raise HTTPException(status_code=404, detail="Image is not held in storage")
+    return {
+        "url": storage_service.presigned_get_url(*location),
+        "expires_in": settings.STORAGE_PRESIGN_EXPIRY_SECONDS
+    }
@@ -1,13 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, tuple_, or_, false
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.models.base import get_db
+from app.models.base import get_db, AsyncSessionLocal
 from app.models.job import Job
-from app.schemas.job import JobCreate, JobRead, JobList
+from app.schemas.job import JobCreate, JobRead, JobList, JobBatchCreate, JobBatchRead, JobStepRead
+from app.schemas.image import PresignedUrl
 from app.core.config import settings
-from app.services.worker import queue_staging_job
+from app.services.worker import queue_staging_job, queue_staging_batch
+from app.services.progress import publish_progress, get_progress_snapshot, stream_progress
+from datetime import datetime
+from typing import List, Optional
+import base64
+import json
 import uuid
 
 router = APIRouter()
+# Mounted under /ws/jobs, see section 6.4 of the design plan
+ws_router = APIRouter()
 
 @router.post("/", response_model=JobRead)
 async def create_job(
@@ -34,18 +44,114 @@ async def create_job(
     await db.refresh(db_job)
     
     # Queue the job
+    await publish_progress(db_job.id, db_job.status, 0.0, queued_at=db_job.created_at)
     queue_staging_job(str(db_job.id))
     
     return db_job
 
+@router.post("/batch", response_model=JobBatchRead)
+async def create_batch_job(
+    batch_in: JobBatchCreate,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Stages one photo in several styles. The room is analyzed once and each
+    style is rendered concurrently as a child job of the returned parent.
+    """
+    user_id = uuid.UUID(settings.DEFAULT_USER_ID)
+    # Preserve request order while dropping duplicate styles
+    style_presets = list(dict.fromkeys(batch_in.style_presets))
+    options = dict(
+        user_id=user_id,
+        image_id=batch_in.image_id,
+        room_type=batch_in.room_type,
+        fix_white_balance=batch_in.fix_white_balance,
+        wall_decorations=batch_in.wall_decorations,
+        include_tv=batch_in.include_tv,
+        status="queued"
+    )
+    
+    parent_job = Job(id=uuid.uuid4(), style_preset=",".join(style_presets), is_batch_parent=True, **options)
+    db.add(parent_job)
+    await db.flush()
+    children = [
+        Job(id=uuid.uuid4(), parent_job_id=parent_job.id, style_preset=style_preset, **options)
+        for style_preset in style_presets
+    ]
+    db.add_all(children)
+    await db.commit()
+    
+    for job in [parent_job, *children]:
+        await db.refresh(job)
+        await publish_progress(job.id, job.status, 0.0, queued_at=job.created_at)
+    queue_staging_batch(str(parent_job.id))
+    
+    return {"job": parent_job, "children": children}
+
+def _encode_cursor(created_at: datetime, job_id: uuid.UUID) -> str:
+    raw = f"{created_at.isoformat()}|{job_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, job_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), uuid.UUID(job_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+# Only the columns JobRead needs; original_image_url lives on Image
+_JOB_LIST_COLUMNS = [getattr(Job, name) for name in JobRead.model_fields if name != "original_image_url"]
+
 @router.get("/", response_model=JobList)
 async def list_jobs(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    room_type: Optional[str] = None,
+    style_preset: Optional[str] = None,
+    user_id: Optional[uuid.UUID] = None,
+    parent_job_id: Optional[uuid.UUID] = None,
+    include_batch_parents: bool = False,
     db: AsyncSession = Depends(get_db)
 ):
-    from sqlalchemy import select
-    result = await db.execute(select(Job).order_by(Job.created_at.desc()))
-    jobs = result.scalars().all()
-    return {"jobs": jobs}
+    """
+    Newest-first job list with keyset pagination on (created_at, id).
+    Pass the returned next_cursor to fetch the following page.
+    status, user_id, style_preset and room_type + style_preset each have an
+    index ending in (created_at, id); other filter combinations are applied
+    on top of one of those scans.
+    Batch parents are left out unless include_batch_parents is set; their
+    per-style children are listed instead.
+    """
+    stmt = select(*_JOB_LIST_COLUMNS)
+    if not include_batch_parents:
+        # "= false" rather than "IS false", which Postgres cannot match to an index
+        stmt = stmt.where(Job.is_batch_parent == false())
+    if status:
+        stmt = stmt.where(Job.status == status)
+    if room_type:
+        stmt = stmt.where(Job.room_type == room_type)
+    if style_preset:
+        stmt = stmt.where(Job.style_preset == style_preset)
+    if user_id:
+        stmt = stmt.where(Job.user_id == user_id)
+    if parent_job_id:
+        stmt = stmt.where(Job.parent_job_id == parent_job_id)
+    if cursor:
+        cursor_created_at, cursor_id = _decode_cursor(cursor)
+        stmt = stmt.where(tuple_(Job.created_at, Job.id) < tuple_(cursor_created_at, cursor_id))
+
+    stmt = stmt.order_by(Job.created_at.desc(), Job.id.desc()).limit(limit + 1)
+    result = await db.execute(stmt)
+    rows = [dict(row._mapping) for row in result]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+
+    return {"jobs": rows, "next_cursor": next_cursor}
 
 @router.get("/{job_id}", response_model=JobRead)
 async def get_job_status(
@@ -53,7 +159,6 @@ async def get_job_status(
     db: AsyncSession = Depends(get_db)
 ):
     # Status endpoint for polling
-    from sqlalchemy import select
     from app.models.image import Image
     
     # query to join job and image to get the original url
@@ -71,15 +176,130 @@ async def get_job_status(
     job_dict = {c.name: getattr(job, c.name) for c in job.__table__.columns}
     job_dict['original_image_url'] = image.original_url
     
+    # Intermediate progress only lives in Redis while the job runs
+    if job.status in ("queued", "in_progress"):
+        snapshot = await get_progress_snapshot(job_id)
+        if snapshot:
+            for field in ("status", "progress_percent", "current_step"):
+                job_dict[field] = snapshot[field]
+    
     return job_dict
 
+@router.get("/{job_id}/result-url", response_model=PresignedUrl)
+async def get_job_result_url(
+    job_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Short-lived presigned GET URL for the staged result.
+    """
+    from app.services.storage import storage_service
+    
+    job = await db.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    location = storage_service.split_url(job.result_url) if job.result_url else None
+    if not location:
+        raise HTTPException(status_code=404, detail="Job has no result yet")
+    return {
+        "url": storage_service.presigned_get_url(*location),
+        "expires_in": settings.STORAGE_PRESIGN_EXPIRY_SECONDS
+    }
+
+@router.get("/{job_id}/steps", response_model=List[JobStepRead])
+async def get_job_steps(
+    job_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Per-step timings, token usage and bytes transferred, across all attempts.
+    """
+    from app.models.job_step import JobStep
+
+    if not await db.get(Job, job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    result = await db.execute(
+        select(JobStep).where(JobStep.job_id == job_id).order_by(JobStep.started_at)
+    )
+    return result.scalars().all()
+
+async def _job_progress_events(job_id: uuid.UUID):
+    """
+    Progress events for a job, falling back to a single DB read when Redis
+    holds no snapshot (e.g. the job finished before the snapshot TTL).
+    """
+    if await get_progress_snapshot(job_id) is None:
+        async with AsyncSessionLocal() as session:
+            job = await session.get(Job, job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        yield {
+            "job_id": str(job.id),
+            "status": job.status,
+            "progress_percent": job.progress_percent,
+            "current_step": job.current_step,
+            "result_url": job.result_url,
+            "error_message": job.error_message,
+        }
+        if job.status in ("completed", "error"):
+            return
+
+    async for event in stream_progress(job_id):
+        yield event
+
+@router.get("/{job_id}/events")
+async def stream_job_events(job_id: uuid.UUID):
+    """
+    Server-Sent Events stream of job progress.
+    """
+    events = _job_progress_events(job_id)
+    # Surface a 404 before the stream starts
+    try:
+        first_event = await events.__anext__()
+    except StopAsyncIteration:
+        first_event = None
+
+    async def event_source():
+        if first_event is not None:
+            yield f"data: {json.dumps(first_event)}\n\n"
+        async for event in events:
+            if event is None:
+                yield ": keepalive\n\n"
+            else:
+                yield f"data: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@ws_router.websocket("/{job_id}/updates")
+async def job_updates_websocket(websocket: WebSocket, job_id: uuid.UUID):
+    """
+    WebSocket stream of job progress.
+    """
+    await websocket.accept()
+    try:
+        async for event in _job_progress_events(job_id):
+            if event is None:
+                await websocket.send_json({"type": "keepalive"})
+            else:
+                await websocket.send_json(event)
+        await websocket.close()
+    except HTTPException as e:
+        await websocket.close(code=4404, reason=e.detail)
+    except WebSocketDisconnect:
+        pass
+
 @router.delete("/{job_id}")
 async def delete_job(
     job_id: uuid.UUID,
     db: AsyncSession = Depends(get_db)
 ):
     from sqlalchemy import delete
-    result = await db.execute(delete(Job).where(Job.id == job_id))
+    # Deleting a batch parent removes its per-style children too
+    result = await db.execute(delete(Job).where(or_(Job.id == job_id, Job.parent_job_id == job_id)))
     await db.commit()
     
     if result.rowcount == 0:
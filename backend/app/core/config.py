@@ -10,14 +10,154 @@ class Settings(BaseSettings):
     STORAGE_SECRET_KEY: str = "minioadmin"
     STORAGE_USE_SSL: bool = False
     STORAGE_PUBLIC_ENDPOINT: str = "localhost:9000"
+    STORAGE_PUBLIC_USE_SSL: bool = False
+    STORAGE_REGION: str = "us-east-1"
+    # Anonymous read access on the buckets; disable to serve only presigned URLs
+    STORAGE_PUBLIC_READ: bool = True
+    STORAGE_PRESIGN_EXPIRY_SECONDS: int = 900
+    # Threads running blocking MinIO calls and the matching urllib3 pool size
+    STORAGE_MAX_WORKERS: int = 16
+    STORAGE_POOL_MAXSIZE: int = 16
+    STORAGE_READ_TIMEOUT_SECONDS: float = 60.0
+    STORAGE_READ_CHUNK_SIZE: int = 1024 * 1024
     
     BUCKET_UPLOADS: str = "stage-uploads"
     BUCKET_RESULTS: str = "stage-results"
     BUCKET_THUMBNAILS: str = "stage-thumbnails"
     
+    # Streaming uploads: size cap and multipart part size (S3 minimum is 5 MiB)
+    UPLOAD_MAX_BYTES: int = 100 * 1024 * 1024
+    UPLOAD_PART_SIZE: int = 5 * 1024 * 1024
+    UPLOAD_PARALLEL_PARTS: int = 2
+    
     OPENROUTER_API_KEY: str = ""
     LITELLM_ANALYSIS_MODEL: str = "openrouter/google/gemini-2.0-flash-exp:free"
     LITELLM_GENERATION_MODEL: str = "openrouter/google/gemini-2.0-flash-exp:free"
+    # "openrouter", or "mock" for the offline stand-in in app/mock_llm.py
+    LLM_BACKEND: str = "openrouter"
+    OPENROUTER_BASE_URL: str = "https://openrouter.ai/api/v1"
+    MOCK_LLM_BASE_URL: str = "http://localhost:8100/api/v1"
+    # Mock latencies are log-normal around these medians
+    MOCK_LLM_TEXT_LATENCY_SECONDS: float = 2.0
+    MOCK_LLM_IMAGE_LATENCY_SECONDS: float = 10.0
+    MOCK_LLM_LATENCY_SIGMA: float = 0.5
+    # Fractions of mock requests answered with a 500 / a 429
+    MOCK_LLM_ERROR_RATE: float = 0.0
+    MOCK_LLM_RATE_LIMIT_RATE: float = 0.0
+    MOCK_LLM_SEED: int = 0
+    # Comma-separated image generation models to route between; defaults to LITELLM_GENERATION_MODEL
+    LITELLM_GENERATION_MODELS: str = ""
+    
+    # Latency-aware routing and hedged requests for image generation
+    ROUTER_EWMA_ALPHA: float = 0.2
+    ROUTER_LATENCY_WINDOW: int = 200
+    HEDGE_ENABLED: bool = True
+    # Hedge once the primary is slower than this percentile of its recent latencies
+    HEDGE_PERCENTILE: float = 0.95
+    HEDGE_MIN_DELAY_SECONDS: float = 5.0
+    # Used until a model has enough samples for a percentile
+    HEDGE_INITIAL_DELAY_SECONDS: float = 30.0
+    # At most this fraction of calls may send a hedged duplicate
+    HEDGE_BUDGET_RATIO: float = 0.1
+    
+    # Number of encoded source photos kept in memory per process (0 disables)
+    IMAGE_CACHE_MAX_ENTRIES: int = 16
+    # Processes used for Pillow decode/resize/encode (0 runs it in a thread instead)
+    IMAGE_PROCESS_POOL_WORKERS: int = 2
+    # How source photos reach the models: "url" (presigned storage URL the provider
+    # fetches), "base64" (inline data URL) or "auto" (URLs when STORAGE_PUBLIC_ENDPOINT
+    # is publicly reachable, base64 otherwise)
+    LLM_IMAGE_TRANSPORT: str = "auto"
+    LLM_IMAGE_URL_EXPIRY_SECONDS: int = 1800
+    # Originals larger than this are sent as a downscaled copy instead
+    LLM_IMAGE_URL_MAX_BYTES: int = 10 * 1024 * 1024
+    
+    # Asyncio worker (python -m app.services.async_worker)
+    WORKER_CONCURRENCY: int = 16
+    WORKER_HEARTBEAT_SECONDS: int = 15
+    WORKER_DEQUEUE_TIMEOUT_SECONDS: int = 5
+    WORKER_DRAIN_TIMEOUT_SECONDS: int = 240
+    # How often jobs abandoned by a dead worker are failed or retried
+    WORKER_ORPHAN_CHECK_SECONDS: int = 60
+    # Prometheus endpoint of the worker process (0 disables)
+    WORKER_METRICS_PORT: int = 9100
+    
+    # OpenTelemetry tracing: "" (off), "otlp" or "file"
+    TRACING_EXPORTER: str = ""
+    OTEL_EXPORTER_OTLP_ENDPOINT: str = "http://localhost:4318"
+    TRACING_FILE_PATH: str = "traces.jsonl"
+    
+    # Job progress events (Redis pub/sub)
+    PROGRESS_SNAPSHOT_TTL_SECONDS: int = 86400
+    PROGRESS_KEEPALIVE_SECONDS: float = 15.0
+    
+    # "two_step": separate plan and prompt calls; "fused": one structured-output
+    # call for both, falling back to two_step if its output is unusable
+    PIPELINE_MODE: str = "two_step"
+    # Styles rendered at once within a multi-style batch job
+    BATCH_MAX_CONCURRENCY: int = 3
+    
+    # Failed jobs are retried from their last completed step with exponential backoff
+    # Time budget of one attempt; on expiry the job is retried or failed like any error.
+    # The RQ timeout adds JOB_TIMEOUT_GRACE_SECONDS so the job can record that itself
+    JOB_TIMEOUT_SECONDS: int = 300
+    BATCH_JOB_TIMEOUT_SECONDS: int = 900
+    JOB_TIMEOUT_GRACE_SECONDS: int = 60
+    JOB_MAX_RETRIES: int = 3
+    JOB_RETRY_BASE_DELAY_SECONDS: int = 10
+    JOB_RETRY_MAX_DELAY_SECONDS: int = 300
+    JOB_CHECKPOINT_TTL_SECONDS: int = 86400
+    # How often the worker moves due retries from the scheduled registry to the queue
+    WORKER_SCHEDULER_INTERVAL_SECONDS: int = 1
+    
+    # Distributed OpenRouter rate limiting per model: token buckets plus an
+    # AIMD concurrency limit that halves on 429s and grows back on success
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_REQUESTS_PER_MINUTE: int = 60
+    RATE_LIMIT_TOKENS_PER_MINUTE: int = 400000
+    RATE_LIMIT_INITIAL_CONCURRENCY: int = 8
+    RATE_LIMIT_MIN_CONCURRENCY: int = 1
+    RATE_LIMIT_MAX_CONCURRENCY: int = 64
+    RATE_LIMIT_BACKOFF_FACTOR: float = 0.5
+    RATE_LIMIT_DEFAULT_RETRY_AFTER_SECONDS: float = 5.0
+    RATE_LIMIT_MAX_RETRIES: int = 3
+    RATE_LIMIT_MAX_WAIT_SECONDS: int = 120
+    # Slots held by a crashed worker are freed after this long
+    RATE_LIMIT_LEASE_SECONDS: int = 180
+    RATE_LIMIT_COMPLETION_TOKEN_ESTIMATE: int = 1000
+    
+    # Circuit breakers on the OpenRouter endpoints; workers stop taking jobs while one is open
+    CIRCUIT_BREAKER_ENABLED: bool = True
+    CIRCUIT_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_FAILURE_WINDOW_SECONDS: int = 60
+    CIRCUIT_OPEN_SECONDS: int = 30
+    CIRCUIT_PROBE_TIMEOUT_SECONDS: int = 90
+    
+    # Coalesce identical in-flight LLM/image requests across workers
+    SINGLEFLIGHT_ENABLED: bool = True
+    SINGLEFLIGHT_LOCK_TTL_SECONDS: int = 180
+    SINGLEFLIGHT_RESULT_TTL_SECONDS: int = 60
+    
+    # Pooled outbound HTTP clients (OpenRouter, litellm, image downloads)
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 60.0
+    HTTP_TIMEOUT_SECONDS: float = 60.0
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = 10.0
+    HTTP2_ENABLED: bool = True
+    
+    # Room analysis cache (Redis, optionally persisted to the room_analyses table)
+    ANALYSIS_CACHE_TTL_SECONDS: int = 30 * 86400
+    ANALYSIS_CACHE_MAX_ENTRIES: int = 10000
+    ANALYSIS_CACHE_PERSIST: bool = True
+    # Start room analysis at upload time on the low-priority queue. Off by default:
+    # it spends a paid vision call on every upload, even if no job follows.
+    # Uploads can still opt in per request with ?speculative_analysis=true
+    SPECULATIVE_ANALYSIS_ENABLED: bool = False
+    SPECULATIVE_ANALYSIS_WAIT_SECONDS: int = 60
+    # Furniture placement plan memoization (Redis)
+    PLAN_CACHE_TTL_SECONDS: int = 7 * 86400
+    PLAN_CACHE_MAX_ENTRIES: int = 20000
     
     DEFAULT_USER_ID: str = "d7e45013-a883-4f63-8534-e1136093ba7a"
     
@@ -1,10 +1,14 @@
-from fastapi import FastAPI
+import time
+import asyncio
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.routes import images, jobs
-from app.models import Base
 from app.models.base import engine
+from app.services.metrics import http_request_duration
+from app.services.tracing import setup_tracing, shutdown_tracing
 
 app = FastAPI(title="StageMasterAI API")
+setup_tracing("stagemaster-api", app=app)
 
 # Configure CORS
 app.add_middleware(
@@ -15,16 +19,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.monotonic()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template, not raw path, to keep cardinality bounded
+        route = request.scope.get("route")
+        http_request_duration.labels(
+            request.method, getattr(route, "path", "unmatched"), str(status)
+        ).observe(time.monotonic() - started)
+
 @app.on_event("startup")
 async def startup():
-    # Create tables on startup for the MVP with retry logic
+    # The schema is managed by Alembic (`alembic upgrade head` runs before
+    # the API starts); this only seeds the default user, with retry logic
     import asyncio
     retries = 5
     while retries > 0:
         try:
-            async with engine.begin() as conn:
-                await conn.run_sync(Base.metadata.create_all)
-            
             # Ensure default user exists
             from sqlalchemy.ext.asyncio import AsyncSession
             from sqlalchemy.orm import sessionmaker
@@ -53,8 +70,19 @@ async def startup():
                 raise e
             await asyncio.sleep(5)
 
+@app.on_event("shutdown")
+async def shutdown():
+    from app.services.image_processing import shutdown_image_executor
+    from app.services.redis_client import close_async_redis
+    from app.services.http_clients import close_http_clients
+    shutdown_image_executor()
+    await close_async_redis()
+    await close_http_clients()
+    shutdown_tracing()
+
 app.include_router(images.router, prefix="/api/v1/images", tags=["images"])
 app.include_router(jobs.router, prefix="/api/v1/jobs", tags=["jobs"])
+app.include_router(jobs.ws_router, prefix="/ws/jobs", tags=["jobs"])
 
 @app.get("/")
 async def root():
@@ -62,4 +90,22 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    from app.services.circuit_breaker import get_breaker_states, OPEN
+    try:
+        breakers = await get_breaker_states()
+    except Exception as e:
+        return {"status": "healthy", "circuit_breakers": f"unavailable: {e}"}
+    degraded = any(b["state"] == OPEN for b in breakers.values())
+    return {"status": "degraded" if degraded else "healthy", "circuit_breakers": breakers}
+
+@app.get("/metrics")
+async def metrics():
+    from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+    # Queue gauges are read from Redis synchronously during collection
+    return Response(await asyncio.to_thread(generate_latest), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/cache/stats")
+async def cache_stats():
+    # Hit/miss counters for the LLM result caches (analysis, plan)
+    from app.services.llm_cache import get_cache_stats
+    return await get_cache_stats()
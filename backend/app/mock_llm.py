@@ -0,0 +1,153 @@
+"""
+Offline stand-in for the OpenRouter chat completions API, for load tests.
+
+Answers text requests (including fused-planning JSON) and image generation
+requests with synthetic output after a log-normal delay, and injects 500s
+and 429s at configured rates. Every response is derived from a hash of the
+request body, the attempt number for that body and MOCK_LLM_SEED, so runs
+are reproducible while retries of a failed request can still succeed.
+
+Run with: uvicorn app.mock_llm:app --port 8100
+and point the workers at it with LLM_BACKEND=mock.
+"""
+import io
+import re
+import json
+import math
+import time
+import base64
+import random
+import asyncio
+import hashlib
+from collections import OrderedDict
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from PIL import Image, ImageDraw
+from app.core.config import settings
+
+app = FastAPI(title="Stage Master mock LLM")
+
+DEFAULT_SIZE = (1024, 768)
+
+_WORDS = (
+    "sofa oak walnut linen accent chair rug pendant lamp window natural light "
+    "hardwood floor coffee table sideboard plant neutral palette warm shadow "
+    "texture brass marble ceiling wall corner layout symmetry perspective"
+).split()
+
+# Requests seen per body hash, so retries draw a different outcome; only the
+# most recent MAX_TRACKED_BODIES bodies are remembered
+MAX_TRACKED_BODIES = 10000
+_attempts: "OrderedDict[str, int]" = OrderedDict()
+
+
+def _next_attempt(digest: str) -> int:
+    attempt = _attempts.pop(digest, 0) + 1
+    _attempts[digest] = attempt
+    while len(_attempts) > MAX_TRACKED_BODIES:
+        _attempts.popitem(last=False)
+    return attempt
+
+
+def _prompt_text(payload: dict) -> str:
+    texts = []
+    for message in payload.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            texts.append(content)
+        elif isinstance(content, list):
+            texts.extend(part.get("text", "") for part in content if part.get("type") == "text")
+    return "\n".join(texts)
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _text_reply(payload: dict, rng: random.Random) -> str:
+    paragraph = " ".join(_sentence(rng, rng.randint(8, 16)) for _ in range(rng.randint(6, 12)))
+    if (payload.get("response_format") or {}).get("type") == "json_object":
+        return json.dumps({
+            "placement_plan": paragraph,
+            "image_prompt": " ".join(_sentence(rng, 12) for _ in range(6)),
+        })
+    return paragraph
+
+
+def _render_image(prompt: str, seed: str) -> str:
+    """
+    Draws a deterministic placeholder "staged room" as a JPEG data URL, at the
+    resolution the prompt asks for.
+    """
+    match = re.search(r"resolution of (\d+)x(\d+)", prompt)
+    width, height = (int(match.group(1)), int(match.group(2))) if match else DEFAULT_SIZE
+    rng = random.Random(seed)
+
+    image = Image.new("RGB", (width, height), tuple(rng.randint(150, 230) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, int(height * 0.65), width, height), fill=tuple(rng.randint(80, 150) for _ in range(3)))
+    for _ in range(rng.randint(3, 6)):
+        x, y = rng.randint(0, width * 3 // 4), rng.randint(height // 2, height * 3 // 4)
+        w, h = rng.randint(width // 10, width // 4), rng.randint(height // 10, height // 4)
+        draw.rectangle((x, y, x + w, y + h), fill=tuple(rng.randint(20, 200) for _ in range(3)))
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=85)
+    return f"data:image/jpeg;base64,{base64.b64encode(buffer.getvalue()).decode('utf-8')}"
+
+
+@app.get("/health")
+async def health_check():
+    return {"status": "healthy"}
+
+
+@app.post("/api/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.body()
+    payload = json.loads(body)
+    digest = hashlib.sha256(body).hexdigest()
+    attempt = _next_attempt(digest)
+    seed = f"{settings.MOCK_LLM_SEED}:{digest}:{attempt}"
+    rng = random.Random(seed)
+
+    wants_image = "image" in payload.get("modalities", [])
+    median = settings.MOCK_LLM_IMAGE_LATENCY_SECONDS if wants_image else settings.MOCK_LLM_TEXT_LATENCY_SECONDS
+    await asyncio.sleep(median * math.exp(rng.gauss(0, settings.MOCK_LLM_LATENCY_SIGMA)))
+
+    roll = rng.random()
+    if roll < settings.MOCK_LLM_RATE_LIMIT_RATE:
+        return JSONResponse(
+            status_code=429,
+            content={"error": {"code": 429, "message": "Mock rate limit"}},
+            headers={"Retry-After": "2"}
+        )
+    if roll < settings.MOCK_LLM_RATE_LIMIT_RATE + settings.MOCK_LLM_ERROR_RATE:
+        return JSONResponse(status_code=500, content={"error": {"code": 500, "message": "Mock upstream error"}})
+
+    prompt = _prompt_text(payload)
+    if wants_image:
+        data_url = await asyncio.to_thread(_render_image, prompt, seed)
+        message = {
+            "role": "assistant",
+            "content": "",
+            "images": [{"type": "image_url", "image_url": {"url": data_url}}],
+        }
+        completion_tokens = 1290
+    else:
+        content = _text_reply(payload, rng)
+        message = {"role": "assistant", "content": content}
+        completion_tokens = len(content) // 4
+
+    prompt_tokens = len(prompt) // 4
+    return {
+        "id": f"mock-{digest[:24]}-{attempt}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": payload.get("model"),
+        "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
@@ -2,5 +2,7 @@ from .base import Base
 from .user import User
 from .image import Image
 from .job import Job
+from .analysis import RoomAnalysis
+from .job_step import JobStep
 
-__all__ = ["Base", "User", "Image", "Job"]
+__all__ = ["Base", "User", "Image", "Job", "RoomAnalysis", "JobStep"]
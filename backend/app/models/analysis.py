@@ -0,0 +1,18 @@
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, String, Text, DateTime, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID
+from app.models.base import Base
+
+class RoomAnalysis(Base):
+    __tablename__ = "room_analyses"
+    __table_args__ = (
+        UniqueConstraint("image_hash", "model", "prompt_version", name="uq_room_analyses_key"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    image_hash = Column(String(64), nullable=False)  # SHA-256 of the source image bytes
+    model = Column(String, nullable=False)
+    prompt_version = Column(String, nullable=False)
+    analysis = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -1,10 +1,26 @@
+import time
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
+from app.services.metrics import db_pool_checkout_wait
 
 Base = declarative_base()
 
-engine = create_async_engine(settings.DATABASE_URL, echo=True)
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that reports how long each checkout waited for a connection.
+    """
+    def _do_get(self):
+        started = time.monotonic()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_wait.observe(time.monotonic() - started)
+
+
+engine = create_async_engine(settings.DATABASE_URL, echo=True, poolclass=TimedQueuePool)
 AsyncSessionLocal = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
@@ -16,4 +16,5 @@ class Image(Base):
     height = Column(Integer)
     file_size = Column(Integer)
     format = Column(String)
+    content_hash = Column(String(64), index=True)  # SHA-256 of the uploaded bytes
     created_at = Column(DateTime, default=datetime.utcnow)
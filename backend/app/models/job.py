@@ -1,15 +1,29 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Float, Boolean
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Float, Boolean, Index, false
 from sqlalchemy.dialects.postgresql import UUID
 from app.models.base import Base
 
 class Job(Base):
     __tablename__ = "jobs"
+    __table_args__ = (
+        # Back keyset pagination of list_jobs on (created_at, id), alone or filtered
+        Index("ix_jobs_created_at_id", "created_at", "id"),
+        Index("ix_jobs_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_jobs_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_jobs_room_type_style_preset_created_at_id", "room_type", "style_preset", "created_at", "id"),
+        Index("ix_jobs_style_preset_created_at_id", "style_preset", "created_at", "id"),
+        # The default listing, which leaves batch parents out
+        Index("ix_jobs_is_batch_parent_created_at_id", "is_batch_parent", "created_at", "id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     image_id = Column(UUID(as_uuid=True), ForeignKey("images.id"), nullable=False)
+    # Set on the per-style children of a multi-style batch job
+    parent_job_id = Column(UUID(as_uuid=True), ForeignKey("jobs.id"), nullable=True, index=True)
+    # Set on the parent of a batch, which only groups its children
+    is_batch_parent = Column(Boolean, nullable=False, default=False, server_default=false())
     room_type = Column(String, nullable=False)
     style_preset = Column(String, nullable=False)
     fix_white_balance = Column(Boolean, default=False)
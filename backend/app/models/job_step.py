@@ -0,0 +1,26 @@
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, Float, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from app.models.base import Base
+
+class JobStep(Base):
+    """
+    Timing and usage of one pipeline step in one attempt of a job.
+    """
+    __tablename__ = "job_steps"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    job_id = Column(UUID(as_uuid=True), ForeignKey("jobs.id", ondelete="CASCADE"), nullable=False, index=True)
+    attempt = Column(Integer, default=0)  # Job.retry_count when the step ran
+    step = Column(String, nullable=False)  # fetch_encode, analyze, plan, prompt, plan_and_prompt, generate, upload
+    status = Column(String, nullable=False)  # ok, error
+    error_message = Column(String, nullable=True)
+    model = Column(String, nullable=True)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    duration_seconds = Column(Float, nullable=False)
+    prompt_tokens = Column(Integer, default=0)
+    completion_tokens = Column(Integer, default=0)
+    cost_usd = Column(Float, nullable=True)
+    bytes_sent = Column(BigInteger, default=0)
+    bytes_received = Column(BigInteger, default=0)
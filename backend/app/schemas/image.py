@@ -20,3 +20,23 @@ class ImageRead(ImageBase):
     id: UUID
     original_url: str
     created_at: datetime
+
+class ImageUploadRequest(BaseModel):
+    filename: str
+    content_type: str = "application/octet-stream"
+
+class ImageUploadTicket(BaseModel):
+    upload_url: str
+    # Form fields to POST before the file itself
+    fields: dict[str, str]
+    object_name: str
+    expires_in: int
+
+class ImageUploadComplete(BaseModel):
+    object_name: str
+    original_filename: str
+    content_type: Optional[str] = None
+
+class PresignedUrl(BaseModel):
+    url: str
+    expires_in: int
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from uuid import UUID
 from datetime import datetime
 from typing import Optional, List
@@ -14,10 +14,19 @@ class JobBase(BaseModel):
 class JobCreate(JobBase):
     image_id: UUID
 
+class JobBatchCreate(BaseModel):
+    image_id: UUID
+    room_type: str
+    style_presets: List[str] = Field(..., min_length=1, max_length=10)
+    fix_white_balance: bool = False
+    wall_decorations: bool = True
+    include_tv: bool = False
+
 class JobRead(JobBase):
     id: UUID
     user_id: UUID
     image_id: UUID
+    parent_job_id: Optional[UUID] = None
     status: str
     progress_percent: float
     current_step: Optional[str] = None
@@ -27,5 +36,25 @@ class JobRead(JobBase):
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
 
+class JobBatchRead(BaseModel):
+    job: JobRead
+    children: List[JobRead]
+
 class JobList(BaseModel):
     jobs: List[JobRead]
+    next_cursor: Optional[str] = None
+
+class JobStepRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    attempt: int
+    step: str
+    status: str
+    error_message: Optional[str] = None
+    model: Optional[str] = None
+    started_at: datetime
+    duration_seconds: float
+    prompt_tokens: int
+    completion_tokens: int
+    cost_usd: Optional[float] = None
+    bytes_sent: int
+    bytes_received: int
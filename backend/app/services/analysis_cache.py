@@ -0,0 +1,120 @@
+import asyncio
+import logging
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from app.core.config import settings
+from app.models.base import AsyncSessionLocal
+from app.models.analysis import RoomAnalysis
+from app.services.llm_cache import RedisLRUCache, cache_key
+from app.services.redis_client import get_async_redis
+
+logger = logging.getLogger(__name__)
+
+# Bump when the analyze_room prompt changes so stale analyses are not reused
+ANALYSIS_PROMPT_VERSION = "1"
+
+# State of a speculative analysis per image: "queued" or "running"
+SPECULATIVE_PREFIX = "analysis-speculative:"
+
+analysis_cache = RedisLRUCache(
+    "analysis",
+    ttl_seconds=settings.ANALYSIS_CACHE_TTL_SECONDS,
+    max_entries=settings.ANALYSIS_CACHE_MAX_ENTRIES
+)
+
+
+def analysis_key(image_hash: str, model: str = None) -> str:
+    # The backend keeps mock analyses from being served to real jobs
+    return cache_key(image_hash, model or settings.LITELLM_ANALYSIS_MODEL, ANALYSIS_PROMPT_VERSION, settings.LLM_BACKEND)
+
+
+def _persist() -> bool:
+    # Postgres rows are keyed by model name only, so mock output is never persisted
+    return settings.ANALYSIS_CACHE_PERSIST and settings.LLM_BACKEND != "mock"
+
+
+async def get_cached_analysis(image_hash: str):
+    """
+    Looks the analysis up in Redis, then in Postgres when persistence is on
+    (refilling Redis on a DB hit). Returns None on a miss.
+    """
+    digest = analysis_key(image_hash)
+    analysis = await analysis_cache.get(digest)
+    if analysis is not None or not _persist():
+        return analysis
+
+    try:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(RoomAnalysis.analysis).where(
+                    RoomAnalysis.image_hash == image_hash,
+                    RoomAnalysis.model == settings.LITELLM_ANALYSIS_MODEL,
+                    RoomAnalysis.prompt_version == ANALYSIS_PROMPT_VERSION
+                )
+            )
+            analysis = result.scalar_one_or_none()
+    except Exception as e:
+        logger.error(f"Room analysis lookup failed: {e}")
+        return None
+
+    if analysis is not None:
+        await analysis_cache.set(digest, analysis)
+    return analysis
+
+
+async def store_analysis(image_hash: str, analysis: str):
+    await analysis_cache.set(analysis_key(image_hash), analysis)
+    if not _persist():
+        return
+
+    try:
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                insert(RoomAnalysis).values(
+                    image_hash=image_hash,
+                    model=settings.LITELLM_ANALYSIS_MODEL,
+                    prompt_version=ANALYSIS_PROMPT_VERSION,
+                    analysis=analysis
+                ).on_conflict_do_nothing(constraint="uq_room_analyses_key")
+            )
+            await session.commit()
+    except Exception as e:
+        logger.error(f"Failed to persist room analysis: {e}")
+
+
+async def mark_speculative_analysis(image_id, state: str):
+    try:
+        await get_async_redis().set(
+            f"{SPECULATIVE_PREFIX}{image_id}", state, ex=settings.SPECULATIVE_ANALYSIS_WAIT_SECONDS * 2
+        )
+    except Exception as e:
+        logger.error(f"Failed to mark speculative analysis for image {image_id}: {e}")
+
+
+async def clear_speculative_analysis(image_id):
+    try:
+        await get_async_redis().delete(f"{SPECULATIVE_PREFIX}{image_id}")
+    except Exception as e:
+        logger.error(f"Failed to clear speculative analysis for image {image_id}: {e}")
+
+
+async def wait_for_speculative_analysis(image_id):
+    """
+    If a speculative analysis of this image is currently running, waits (up to
+    SPECULATIVE_ANALYSIS_WAIT_SECONDS) for it to land in the cache, so the job
+    reuses it instead of paying for a second call. Queued-but-not-started
+    speculative work is not waited on.
+    """
+    key = f"{SPECULATIVE_PREFIX}{image_id}"
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.SPECULATIVE_ANALYSIS_WAIT_SECONDS
+    try:
+        redis = get_async_redis()
+        while loop.time() < deadline:
+            state = await redis.get(key)
+            if state != b"running":
+                return
+            await asyncio.sleep(0.5)
+        logger.warning(f"Gave up waiting for speculative analysis of image {image_id}")
+    except Exception as e:
+        logger.error(f"Failed to check speculative analysis for image {image_id}: {e}")
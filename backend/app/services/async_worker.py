@@ -0,0 +1,294 @@
+"""
+Asyncio-native worker for the RQ `staging` queue.
+
+Unlike `rq worker`, which forks one work-horse per job, this runs up to
+WORKER_CONCURRENCY jobs at once on a single event loop. Staging jobs spend
+almost all of their time waiting on OpenRouter, so one process can keep many
+of them in flight.
+
+Run with: python -m app.services.async_worker
+"""
+import os
+import socket
+import signal
+import asyncio
+import logging
+import traceback
+from rq import Queue
+from rq.exceptions import DequeueTimeout
+from rq.job import Job, JobStatus
+from rq.defaults import DEFAULT_RESULT_TTL
+from rq.registry import StartedJobRegistry
+from rq.scheduler import RQScheduler
+from rq.utils import utcnow
+from app.core.config import settings
+from app.services.worker import redis_conn, job_queue, low_priority_queue
+from app.services.circuit_breaker import open_circuit_wait_seconds
+from app.services.metrics import worker_jobs
+from app.services.tracing import setup_tracing, shutdown_tracing, job_span
+
+logger = logging.getLogger(__name__)
+
+WORKER_KEY_PREFIX = "stagemaster:workers:"
+
+
+class AsyncStagingWorker:
+    def __init__(self, queues: list[Queue], concurrency: int):
+        self.queues = queues
+        self.concurrency = concurrency
+        self.name = f"async-{socket.gethostname()}-{os.getpid()}"
+        self.key = f"{WORKER_KEY_PREFIX}{self.name}"
+        self._slots = asyncio.Semaphore(concurrency)
+        self._active: dict[asyncio.Task, tuple] = {}
+        self._stopping = asyncio.Event()
+        # Moves jobs scheduled with enqueue_in (retries) onto their queue when due;
+        # only the worker holding the per-queue lock does this at a time
+        self._scheduler = RQScheduler(
+            queues, connection=redis_conn, interval=settings.WORKER_SCHEDULER_INTERVAL_SECONDS
+        )
+
+    def request_stop(self):
+        if not self._stopping.is_set():
+            logger.info(f"Worker {self.name} draining {len(self._active)} active job(s)")
+            self._stopping.set()
+
+    def _dequeue(self):
+        try:
+            result = Queue.dequeue_any(
+                self.queues,
+                timeout=settings.WORKER_DEQUEUE_TIMEOUT_SECONDS,
+                connection=redis_conn
+            )
+        except DequeueTimeout:
+            return None
+        return result or None
+
+    def _heartbeat_ttl(self, job) -> int:
+        # Short, so the started registry drops a dead worker's jobs quickly
+        return settings.WORKER_HEARTBEAT_SECONDS * 4
+
+    def _mark_started(self, job, queue: Queue):
+        with redis_conn.pipeline() as pipeline:
+            job.prepare_for_execution(self.name, pipeline=pipeline)
+            job.heartbeat(utcnow(), self._heartbeat_ttl(job), pipeline=pipeline)
+            # Queues on Redis >= 6.2 are popped with BLMOVE into an intermediate list
+            pipeline.lrem(queue.intermediate_queue_key, 1, job.id)
+            pipeline.execute()
+
+    def _mark_finished(self, job, queue: Queue, return_value):
+        job.ended_at = utcnow()
+        job._result = return_value
+        registry = StartedJobRegistry(queue.name, connection=redis_conn)
+        result_ttl = job.get_result_ttl(DEFAULT_RESULT_TTL)
+        with redis_conn.pipeline() as pipeline:
+            job._handle_success(result_ttl, pipeline=pipeline)
+            job.cleanup(result_ttl, pipeline=pipeline, remove_from_queue=False)
+            registry.remove(job, pipeline=pipeline)
+            pipeline.execute()
+
+    def _mark_failed(self, job, queue: Queue, exc_string: str):
+        job.ended_at = utcnow()
+        registry = StartedJobRegistry(queue.name, connection=redis_conn)
+        with redis_conn.pipeline() as pipeline:
+            job.set_status(JobStatus.FAILED, pipeline=pipeline)
+            registry.remove(job, pipeline=pipeline)
+            job._handle_failure(exc_string, pipeline=pipeline)
+            pipeline.execute()
+
+    def _requeue(self, job, queue: Queue):
+        registry = StartedJobRegistry(queue.name, connection=redis_conn)
+        registry.remove(job)
+        queue.enqueue_job(job, at_front=True)
+
+    async def _perform(self, job, queue: Queue):
+        try:
+            await asyncio.to_thread(self._mark_started, job, queue)
+            logger.info(f"Worker {self.name} started {job.func_name} ({job.id})")
+
+            if asyncio.iscoroutinefunction(job.func):
+                coro = job.func(*job.args, **job.kwargs)
+            else:
+                coro = asyncio.to_thread(job.func, *job.args, **job.kwargs)
+            timeout = job.timeout if job.timeout and job.timeout > 0 else None
+            with job_span(job) as current:
+                if current is not None and job.enqueued_at and job.started_at:
+                    current.set_attribute("rq.queue_wait_seconds", (job.started_at - job.enqueued_at).total_seconds())
+                return_value = await asyncio.wait_for(coro, timeout=timeout)
+
+            await asyncio.to_thread(self._mark_finished, job, queue, return_value)
+            worker_jobs.labels(queue.name, "finished").inc()
+        except asyncio.TimeoutError:
+            # The job overran even its own budget and was cancelled mid-way,
+            # so its DB row is retried or failed from here
+            logger.error(f"Job {job.id} exceeded its {job.timeout}s timeout")
+            await asyncio.to_thread(self._mark_failed, job, queue, traceback.format_exc())
+            worker_jobs.labels(queue.name, "failed").inc()
+            await self._recover(job)
+        except asyncio.CancelledError:
+            # Drain timed out; hand the job back so another worker picks it up
+            logger.warning(f"Job {job.id} interrupted by shutdown, requeueing")
+            await asyncio.to_thread(self._requeue, job, queue)
+            raise
+        except Exception:
+            logger.error(f"Job {job.id} failed:\n{traceback.format_exc()}")
+            await asyncio.to_thread(self._mark_failed, job, queue, traceback.format_exc())
+            worker_jobs.labels(queue.name, "failed").inc()
+        finally:
+            self._slots.release()
+
+    def _write_heartbeat(self, active_jobs: list):
+        now = utcnow()
+        with redis_conn.pipeline() as pipeline:
+            pipeline.hset(self.key, mapping={
+                "name": self.name,
+                "pid": os.getpid(),
+                "concurrency": self.concurrency,
+                "active_jobs": len(active_jobs),
+                "draining": int(self._stopping.is_set()),
+                "last_heartbeat": now.isoformat(),
+            })
+            pipeline.expire(self.key, settings.WORKER_HEARTBEAT_SECONDS * 3)
+            for job in active_jobs:
+                job.heartbeat(now, self._heartbeat_ttl(job), pipeline=pipeline, xx=True)
+            pipeline.execute()
+
+    async def _heartbeat_loop(self):
+        while True:
+            try:
+                active_jobs = [job for job, _ in self._active.values()]
+                await asyncio.to_thread(self._write_heartbeat, active_jobs)
+            except Exception as e:
+                logger.error(f"Worker heartbeat failed: {e}")
+            await asyncio.sleep(settings.WORKER_HEARTBEAT_SECONDS)
+
+    def _enqueue_due_jobs(self):
+        if self._scheduler.acquired_locks:
+            self._scheduler.heartbeat()
+        else:
+            self._scheduler.acquire_locks()
+        if self._scheduler.acquired_locks:
+            self._scheduler.enqueue_scheduled_jobs()
+
+    def _clean_started_registries(self) -> list:
+        """
+        Moves jobs whose worker stopped heartbeating to the failed registry and
+        returns them.
+        """
+        abandoned = []
+        for queue in self.queues:
+            registry = StartedJobRegistry(queue.name, connection=redis_conn)
+            job_ids = registry.cleanup()
+            abandoned.extend(job for job in Job.fetch_many(job_ids, connection=redis_conn) if job)
+        return abandoned
+
+    async def _recover(self, job):
+        from app.services.generation import recover_abandoned_job
+        try:
+            await recover_abandoned_job(job.func_name, job.args)
+        except Exception as e:
+            logger.error(f"Could not recover job {job.id}: {e}")
+
+    async def _recover_abandoned(self):
+        for job in await asyncio.to_thread(self._clean_started_registries):
+            logger.warning(f"Job {job.id} ({job.func_name}) was abandoned by worker {job.worker_name}")
+            await self._recover(job)
+
+    async def _scheduler_loop(self):
+        loop = asyncio.get_running_loop()
+        next_orphan_check = loop.time()
+        while True:
+            try:
+                await asyncio.to_thread(self._enqueue_due_jobs)
+                # Piggybacks on the scheduler lock so one worker does this at a time
+                if self._scheduler.acquired_locks and loop.time() >= next_orphan_check:
+                    next_orphan_check = loop.time() + settings.WORKER_ORPHAN_CHECK_SECONDS
+                    await self._recover_abandoned()
+            except Exception as e:
+                logger.error(f"Scheduling due jobs failed: {e}")
+            await asyncio.sleep(settings.WORKER_SCHEDULER_INTERVAL_SECONDS)
+
+    async def _drain(self):
+        if not self._active:
+            return
+        done, pending = await asyncio.wait(
+            list(self._active), timeout=settings.WORKER_DRAIN_TIMEOUT_SECONDS
+        )
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.request_stop)
+
+        logger.info(
+            f"Worker {self.name} listening on {[q.name for q in self.queues]} "
+            f"with concurrency {self.concurrency}"
+        )
+        heartbeat = asyncio.create_task(self._heartbeat_loop())
+        scheduler = asyncio.create_task(self._scheduler_loop())
+        try:
+            while not self._stopping.is_set():
+                await self._slots.acquire()
+                if self._stopping.is_set():
+                    self._slots.release()
+                    break
+
+                # Leave jobs parked in the queue while the provider is failing
+                parked_for = await open_circuit_wait_seconds()
+                if parked_for > 0:
+                    self._slots.release()
+                    logger.info(f"Circuit open, pausing dequeue for {parked_for:.0f}s")
+                    try:
+                        await asyncio.wait_for(self._stopping.wait(), timeout=parked_for)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                dequeued = await asyncio.to_thread(self._dequeue)
+                if dequeued is None:
+                    self._slots.release()
+                    continue
+
+                job, queue = dequeued
+                task = asyncio.create_task(self._perform(job, queue))
+                self._active[task] = (job, queue)
+                task.add_done_callback(self._active.pop)
+
+            await self._drain()
+        finally:
+            heartbeat.cancel()
+            scheduler.cancel()
+            self._scheduler.release_locks()
+            redis_conn.delete(self.key)
+            logger.info(f"Worker {self.name} stopped")
+
+
+async def main():
+    from app.services.image_processing import shutdown_image_executor
+    from app.services.redis_client import close_async_redis
+    from app.services.http_clients import close_http_clients
+
+    if settings.WORKER_METRICS_PORT:
+        # Step timings, token usage and job counts are recorded in this process
+        from prometheus_client import start_http_server
+        start_http_server(settings.WORKER_METRICS_PORT)
+
+    setup_tracing("stagemaster-worker")
+
+    # Queue order is priority order
+    worker = AsyncStagingWorker([job_queue, low_priority_queue], settings.WORKER_CONCURRENCY)
+    try:
+        await worker.run()
+    finally:
+        shutdown_image_executor()
+        await close_async_redis()
+        await close_http_clients()
+        shutdown_tracing()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,56 @@
+"""
+Per-step artifacts of a staging job, kept in a Redis hash so a retried job
+resumes after its last completed step instead of starting over.
+"""
+import logging
+from app.core.config import settings
+from app.services.redis_client import get_async_redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "job-checkpoint:"
+
+# Pipeline steps, in order
+ANALYSIS = "analysis"
+PLAN = "plan"
+PROMPT = "prompt"
+RESULT_URL = "result_url"
+
+
+def _key(job_id: str) -> str:
+    return f"{KEY_PREFIX}{job_id}"
+
+
+async def load_checkpoints(job_id: str) -> dict:
+    """
+    Returns the completed step outputs for a job, or {} if there are none
+    (or Redis is unavailable, in which case the job simply reruns every step).
+    """
+    try:
+        raw = await get_async_redis().hgetall(_key(job_id))
+    except Exception as e:
+        logger.error(f"Failed to load checkpoints for job {job_id}: {e}")
+        return {}
+    return {field.decode("utf-8"): value.decode("utf-8") for field, value in raw.items()}
+
+
+async def save_checkpoint(job_id: str, checkpoints: dict, step: str, value: str):
+    """
+    Records a step output both in `checkpoints` and in Redis.
+    """
+    checkpoints[step] = value
+    try:
+        redis = get_async_redis()
+        async with redis.pipeline(transaction=True) as pipeline:
+            pipeline.hset(_key(job_id), step, value)
+            pipeline.expire(_key(job_id), settings.JOB_CHECKPOINT_TTL_SECONDS)
+            await pipeline.execute()
+    except Exception as e:
+        logger.error(f"Failed to checkpoint {step} for job {job_id}: {e}")
+
+
+async def clear_checkpoints(job_id: str):
+    try:
+        await get_async_redis().delete(_key(job_id))
+    except Exception as e:
+        logger.error(f"Failed to clear checkpoints for job {job_id}: {e}")
@@ -0,0 +1,187 @@
+"""
+Circuit breakers for the model provider endpoints, shared by all workers via Redis.
+
+closed: calls go through; CIRCUIT_FAILURE_THRESHOLD provider failures
+(timeouts, connection errors, 5xx) within the failure window open the circuit.
+open: calls fail fast with CircuitOpenError for CIRCUIT_OPEN_SECONDS.
+half_open: one worker sends a probe; success closes the circuit, failure
+reopens it. Client errors and 429s (see rate_limiter) do not count.
+"""
+import time
+import asyncio
+import logging
+from typing import Awaitable, Callable
+import httpx
+from app.core.config import settings
+from app.services.redis_client import get_async_redis
+from app.services.singleflight import error_types
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "breaker:"
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# How long callers back off while another worker's half-open probe is in flight
+PROBE_WAIT_SECONDS = 1.0
+
+# litellm exception types that mean the provider, not the request, is at fault
+_PROVIDER_ERRORS = ("Timeout", "APIConnectionError", "ServiceUnavailableError", "InternalServerError")
+# httpx and asyncio ones, by name, as coalesced followers only see the names
+_TRANSPORT_ERRORS = ("TimeoutException", "TransportError", "TimeoutError")
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling a provider whose circuit is open.
+    """
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit {name} is open; retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+def _is_provider_failure(error: Exception) -> bool:
+    if isinstance(error, (httpx.TimeoutException, httpx.TransportError, asyncio.TimeoutError)):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status >= 500
+    # Also matches the leader's error re-raised in coalesced followers
+    names = error_types(error)
+    return any(name in _PROVIDER_ERRORS + _TRANSPORT_ERRORS for name in names)
+
+
+class CircuitBreaker:
+    def __init__(self, name: str):
+        self.name = name
+        self._failures_key = f"{KEY_PREFIX}{name}:failures"
+        self._open_until_key = f"{KEY_PREFIX}{name}:open_until"
+        self._probe_key = f"{KEY_PREFIX}{name}:probe"
+
+    async def state(self):
+        """
+        Returns (state, seconds until a probe is allowed).
+        """
+        open_until = await get_async_redis().get(self._open_until_key)
+        if open_until is None:
+            return CLOSED, 0.0
+        remaining = float(open_until) - time.time()
+        return (OPEN, remaining) if remaining > 0 else (HALF_OPEN, 0.0)
+
+    async def probing(self) -> bool:
+        return bool(await get_async_redis().exists(self._probe_key))
+
+    async def _open(self, redis):
+        open_until = time.time() + settings.CIRCUIT_OPEN_SECONDS
+        async with redis.pipeline(transaction=True) as pipeline:
+            # Outlives the open period so the breaker is seen as half-open afterwards
+            pipeline.set(self._open_until_key, open_until, ex=settings.CIRCUIT_OPEN_SECONDS * 10)
+            pipeline.delete(self._failures_key, self._probe_key)
+            await pipeline.execute()
+        logger.warning(f"Circuit {self.name} opened for {settings.CIRCUIT_OPEN_SECONDS}s")
+
+    async def _record_failure(self, state: str):
+        redis = get_async_redis()
+        if state == HALF_OPEN:
+            await self._open(redis)
+            return
+        async with redis.pipeline(transaction=True) as pipeline:
+            pipeline.incr(self._failures_key)
+            pipeline.expire(self._failures_key, settings.CIRCUIT_FAILURE_WINDOW_SECONDS)
+            failures = (await pipeline.execute())[0]
+        if failures >= settings.CIRCUIT_FAILURE_THRESHOLD:
+            await self._open(redis)
+
+    async def _record_success(self, state: str):
+        redis = get_async_redis()
+        if state == HALF_OPEN:
+            await redis.delete(self._failures_key, self._open_until_key, self._probe_key)
+            logger.info(f"Circuit {self.name} closed after a successful probe")
+        else:
+            await redis.delete(self._failures_key)
+
+    async def call(self, fn: Callable[[], Awaitable]):
+        """
+        Runs `fn` through the breaker. Raises CircuitOpenError without calling
+        it while the circuit is open or another worker is probing. If Redis is
+        unavailable the breaker stays out of the way.
+        """
+        if not settings.CIRCUIT_BREAKER_ENABLED:
+            return await fn()
+
+        try:
+            state, remaining = await self.state()
+            if state == OPEN:
+                raise CircuitOpenError(self.name, remaining)
+            if state == HALF_OPEN:
+                probing = await get_async_redis().set(
+                    self._probe_key, 1, nx=True, ex=settings.CIRCUIT_PROBE_TIMEOUT_SECONDS
+                )
+                if not probing:
+                    raise CircuitOpenError(self.name, PROBE_WAIT_SECONDS)
+                logger.info(f"Circuit {self.name} half-open, sending probe")
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            logger.error(f"Circuit breaker {self.name} unavailable: {e}")
+            return await fn()
+
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            if state == HALF_OPEN:
+                await get_async_redis().delete(self._probe_key)
+            raise
+        except Exception as e:
+            try:
+                if _is_provider_failure(e):
+                    await self._record_failure(state)
+                elif state == HALF_OPEN:
+                    await get_async_redis().delete(self._probe_key)
+            except Exception as redis_error:
+                logger.error(f"Failed to record failure on circuit {self.name}: {redis_error}")
+            raise
+
+        try:
+            await self._record_success(state)
+        except Exception as e:
+            logger.error(f"Failed to record success on circuit {self.name}: {e}")
+        return result
+
+
+completion_breaker = CircuitBreaker("openrouter-completions")
+image_breaker = CircuitBreaker("openrouter-images")
+BREAKERS = (completion_breaker, image_breaker)
+
+
+async def get_breaker_states() -> dict:
+    states = {}
+    for breaker in BREAKERS:
+        state, remaining = await breaker.state()
+        probing = state == HALF_OPEN and await breaker.probing()
+        if probing:
+            remaining = PROBE_WAIT_SECONDS
+        states[breaker.name] = {"state": state, "probing": probing, "retry_after_seconds": round(remaining, 1)}
+    return states
+
+
+async def open_circuit_wait_seconds() -> float:
+    """
+    Seconds until every open circuit allows a probe again, or a short wait
+    while a half-open circuit is being probed (0 if calls can go through).
+    Errors reading breaker state count as closed.
+    """
+    if not settings.CIRCUIT_BREAKER_ENABLED:
+        return 0.0
+    try:
+        states = await get_breaker_states()
+    except Exception as e:
+        logger.error(f"Failed to read circuit breaker state: {e}")
+        return 0.0
+    return max(
+        (s["retry_after_seconds"] for s in states.values() if s["state"] == OPEN or s["probing"]),
+        default=0.0
+    )
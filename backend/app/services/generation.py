@@ -1,67 +1,73 @@
 import asyncio
 import logging
 from datetime import datetime
-from sqlalchemy import update
 from app.models.base import AsyncSessionLocal
 from app.models.job import Job
 from app.core.config import settings
-import httpx
 
 logger = logging.getLogger(__name__)
 
-from sqlalchemy import select
+from sqlalchemy import select, update
 from app.models.image import Image
-from app.services.llm_service import analyze_room, plan_furniture_placement, generate_staged_image_prompt, generate_image
+from app.services.llm_service import analyze_room, plan_furniture_placement, generate_staged_image_prompt, generate_image, plan_and_generate_prompt
 from app.services.storage import storage_service
+from app.services.image_processing import prepare_model_image
+from app.services.progress import publish_progress
+from app.services.analysis_cache import mark_speculative_analysis, clear_speculative_analysis, wait_for_speculative_analysis
+from app.services.checkpoints import load_checkpoints, save_checkpoint, clear_checkpoints, ANALYSIS, PLAN, PROMPT, RESULT_URL
+from app.services.worker import schedule_staging_retry, schedule_batch_retry
+from app.services.circuit_breaker import open_circuit_wait_seconds, _is_provider_failure
+from app.services.singleflight import error_types
+from app.services.instrumentation import StepRecorder, record_bytes
 
-async def process_staging_job(job_id: str):
+async def _render_variant(job_id: str, db_job: Job, db_image: Image, encoded_image, analysis: str, checkpoints: dict, steps: StepRecorder) -> str:
     """
-    Worker task to process a staging job using OpenRouter via LiteLLM.
+    Runs the per-style steps (planning, prompt, image generation, upload) for
+    a job whose room analysis is already done, skipping steps already in
+    `checkpoints` from an earlier attempt. Returns the result URL.
     """
-    async with AsyncSessionLocal() as session:
-        # Fetch job and associated image
-        stmt = select(Job, Image).join(Image, Job.image_id == Image.id).where(Job.id == job_id)
-        result = await session.execute(stmt)
-        record = result.one_or_none()
-        
-        if not record:
-            logger.error(f"Job {job_id} or associated image not found")
-            return
-
-        db_job, db_image = record
-
-        # Update status to in_progress
-        db_job.status = "in_progress"
-        db_job.started_at = datetime.utcnow()
-        db_job.progress_percent = 10.0
-        db_job.current_step = "Analyzing room layout..."
-        await session.commit()
+    if RESULT_URL in checkpoints:
+        return checkpoints[RESULT_URL]
 
-        try:
-            # 1. Analyze Room
-            logger.info(f"Analyzing room for job {job_id}")
-            analysis = await analyze_room(db_image.original_url)
-            
-            db_job.progress_percent = 30.0
-            db_job.current_step = "Detecting surfaces and depth..."
-            await session.commit()
-
-            # 2. Plan Furniture Placement
-            logger.info(f"Planning furniture placement for job {job_id}")
-            placement_plan = await plan_furniture_placement(
+    generation_prompt = checkpoints.get(PROMPT)
+    if generation_prompt is None and settings.PIPELINE_MODE == "fused":
+        # 2+3. Plan and write the image prompt in a single call
+        logger.info(f"Planning and generating prompt (fused) for job {job_id}")
+        async with steps.step("plan_and_prompt", settings.LITELLM_ANALYSIS_MODEL):
+            fused = await plan_and_generate_prompt(
+                db_image.original_url,
                 analysis,
                 db_job.room_type,
                 db_job.style_preset,
+                fix_white_balance=db_job.fix_white_balance,
                 wall_decorations=db_job.wall_decorations,
                 include_tv=db_job.include_tv
             )
-            
-            db_job.progress_percent = 60.0
-            db_job.current_step = "Generating furniture placement plan..."
-            await session.commit()
+        if fused:
+            placement_plan, generation_prompt = fused
+            await save_checkpoint(job_id, checkpoints, PLAN, placement_plan)
+            await save_checkpoint(job_id, checkpoints, PROMPT, generation_prompt)
 
-            # 3. Generate Staged Image Prompt
-            logger.info(f"Generating staged image prompt for job {job_id}")
+    if generation_prompt is None:
+        # 2. Plan Furniture Placement
+        placement_plan = checkpoints.get(PLAN)
+        if placement_plan is None:
+            logger.info(f"Planning furniture placement for job {job_id}")
+            async with steps.step("plan", settings.LITELLM_ANALYSIS_MODEL):
+                placement_plan = await plan_furniture_placement(
+                    analysis,
+                    db_job.room_type,
+                    db_job.style_preset,
+                    wall_decorations=db_job.wall_decorations,
+                    include_tv=db_job.include_tv
+                )
+            await save_checkpoint(job_id, checkpoints, PLAN, placement_plan)
+        
+        await publish_progress(job_id, "in_progress", 60.0, "Generating furniture placement plan...")
+
+        # 3. Generate Staged Image Prompt
+        logger.info(f"Generating staged image prompt for job {job_id}")
+        async with steps.step("prompt", settings.LITELLM_ANALYSIS_MODEL):
             generation_prompt = await generate_staged_image_prompt(
                 db_image.original_url,
                 analysis,
@@ -71,46 +77,411 @@ async def process_staging_job(job_id: str):
                 wall_decorations=db_job.wall_decorations,
                 include_tv=db_job.include_tv
             )
-            
-            db_job.progress_percent = 80.0
-            db_job.current_step = "Rendering final image..."
-            await session.commit()
+        await save_checkpoint(job_id, checkpoints, PROMPT, generation_prompt)
+    
+    await publish_progress(job_id, "in_progress", 80.0, "Rendering final image...")
 
-            # TODO: In a real implementation, we would now call a text-to-image API 
-            # (like Stable Diffusion, DALL-E 3, or a specialized virtual staging API)
-            # with the generation_prompt and the original image.
-            
-            # For this integration task, we've fulfilled the requirement of using 
-            # OpenRouter via LiteLLM for the analysis and generation (prompt) steps.
-            
-            # Real Image Generation
-            logger.info(f"Generating image for job {job_id}")
-            image_data = await generate_image(
-                generation_prompt,
-                db_image.original_url,
-                fix_white_balance=db_job.fix_white_balance
-            )
-            # image_data is now bytes (decoded from base64 or downloaded)
+    # 4. Real Image Generation
+    logger.info(f"Generating image for job {job_id}")
+    async with steps.step("generate"):
+        image_data = await generate_image(
+            generation_prompt,
+            db_image.original_url,
+            fix_white_balance=db_job.fix_white_balance,
+            encoded_image=encoded_image
+        )
+    # image_data is now bytes (decoded from base64 or downloaded)
+        
+    # Upload to results bucket
+    async with steps.step("upload"):
+        result_url = await storage_service.upload_file(
+            settings.BUCKET_RESULTS,
+            f"{job_id}.jpg",
+            image_data,
+            "image/jpeg"
+        )
+        record_bytes(sent=len(image_data))
+    await save_checkpoint(job_id, checkpoints, RESULT_URL, result_url)
+    return result_url
+
+async def _remember_content_hash(db_image: Image, encoded_image):
+    """
+    Stores the hash of photos uploaded through a presigned form, which the
+    API never saw, once a worker has fetched them.
+    """
+    if db_image.content_hash:
+        return
+    db_image.content_hash = encoded_image.content_hash
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            update(Image)
+            .where(Image.id == db_image.id, Image.content_hash.is_(None))
+            .values(content_hash=encoded_image.content_hash)
+        )
+        await session.commit()
+
+async def _prepare(db_image: Image, steps: StepRecorder):
+    async with steps.step("fetch_encode"):
+        encoded_image = await prepare_model_image(db_image.original_url, db_image.content_hash)
+    await _remember_content_hash(db_image, encoded_image)
+    return encoded_image
+
+async def _analyze(job_id: str, db_image: Image, encoded_image, checkpoints: dict, steps: StepRecorder) -> str:
+    """
+    Step 1, reusing the checkpointed analysis of an earlier attempt or a
+    speculative analysis started at upload.
+    """
+    if ANALYSIS in checkpoints:
+        return checkpoints[ANALYSIS]
+    async with steps.step("analyze", settings.LITELLM_ANALYSIS_MODEL):
+        await wait_for_speculative_analysis(db_image.id)
+        logger.info(f"Analyzing room for job {job_id}")
+        analysis = await analyze_room(db_image.original_url, encoded_image=encoded_image)
+    await save_checkpoint(job_id, checkpoints, ANALYSIS, analysis)
+    return analysis
+
+async def _complete_job(session, db_job: Job, result_url: str, attempt_started_at: datetime):
+    db_job.status = "completed"
+    db_job.progress_percent = 100.0
+    db_job.current_step = "Final rendering complete"
+    db_job.completed_at = datetime.utcnow()
+    db_job.result_url = result_url
+    # Timed from the final attempt, so retry backoff and time spent re-queued
+    # do not blur the per-model latency signal
+    db_job.generation_time_seconds = int((db_job.completed_at - attempt_started_at).total_seconds())
+    await session.commit()
+    await clear_checkpoints(str(db_job.id))
+    await publish_progress(
+        db_job.id, db_job.status, db_job.progress_percent, db_job.current_step,
+        result_url=result_url, queued_at=db_job.created_at, started_at=db_job.started_at
+    )
+
+async def _fail_job(session, db_job: Job, error: Exception):
+    db_job.status = "error"
+    db_job.error_message = str(error)
+    await session.commit()
+    await publish_progress(
+        db_job.id, db_job.status, db_job.progress_percent, db_job.current_step,
+        error_message=db_job.error_message, queued_at=db_job.created_at, started_at=db_job.started_at
+    )
+
+def _retry_delay(retry_count: int) -> int:
+    return min(
+        settings.JOB_RETRY_BASE_DELAY_SECONDS * 2 ** retry_count,
+        settings.JOB_RETRY_MAX_DELAY_SECONDS
+    )
+
+async def _mark_retrying(session, db_job: Job, error: Exception, delay: int):
+    db_job.status = "queued"
+    db_job.error_message = str(error)
+    db_job.current_step = f"Retrying in {delay}s (attempt {db_job.retry_count + 1} of {settings.JOB_MAX_RETRIES + 1})..."
+    await session.commit()
+    await publish_progress(
+        db_job.id, db_job.status, db_job.progress_percent, db_job.current_step,
+        error_message=db_job.error_message
+    )
+
+async def _park(session, db_job: Job, error: Exception, schedule, wait: float, dependents=()) -> bool:
+    delay = max(int(wait) + 1, 1)
+    try:
+        await asyncio.to_thread(schedule, str(db_job.id), delay)
+    except Exception as e:
+        logger.error(f"Could not park job {db_job.id}: {e}")
+        for dependent in dependents:
+            await _fail_job(session, dependent, error)
+        await _fail_job(session, db_job, error)
+        return False
+    for job in (*dependents, db_job):
+        job.status = "queued"
+        job.current_step = "Waiting for the model provider to recover..."
+        await session.commit()
+        await publish_progress(job.id, job.status, job.progress_percent, job.current_step)
+    logger.info(f"Job {db_job.id} parked for {delay}s while a provider circuit is open")
+    return True
+
+async def _circuit_wait(*errors: Exception) -> float:
+    """
+    Seconds to park a job that failed with `errors`: the wait of a circuit
+    that rejected the call, or, for provider failures, of any circuit
+    currently open or being probed. 0 if any error is of another kind, as
+    those go through the normal backoff and retry budget.
+    """
+    rejected = [e for e in errors if "CircuitOpenError" in error_types(e)]
+    failures = [e for e in errors if e not in rejected]
+    if not errors or not all(_is_provider_failure(e) for e in failures):
+        return 0.0
+    waits = [e.retry_after for e in rejected]
+    if failures:
+        waits.append(await open_circuit_wait_seconds())
+    return max(waits)
+
+async def _retry_or_fail(session, db_job: Job, error: Exception, schedule, dependents=(), causes=()) -> bool:
+    """
+    Schedules `db_job` to run again after an exponential backoff, or fails it
+    (and `dependents`) once JOB_MAX_RETRIES is used up. Completed steps are
+    kept as checkpoints, so the retry only redoes the step that failed.
+    `causes` are the underlying errors when `error` summarises several.
+    """
+    # A provider failure while a circuit is open or half-open parks the job
+    # until it can go through, without using up one of its retries
+    parked_for = await _circuit_wait(*(causes or [error]))
+    if parked_for > 0:
+        return await _park(session, db_job, error, schedule, parked_for, dependents)
+
+    retries = db_job.retry_count or 0
+    if retries >= settings.JOB_MAX_RETRIES:
+        for dependent in dependents:
+            await _fail_job(session, dependent, error)
+        await _fail_job(session, db_job, error)
+        return False
+
+    delay = _retry_delay(retries)
+    try:
+        await asyncio.to_thread(schedule, str(db_job.id), delay)
+    except Exception as e:
+        logger.error(f"Could not schedule retry for job {db_job.id}: {e}")
+        for dependent in dependents:
+            await _fail_job(session, dependent, error)
+        await _fail_job(session, db_job, error)
+        return False
+
+    db_job.retry_count = retries + 1
+    for dependent in dependents:
+        dependent.retry_count = db_job.retry_count
+        await _mark_retrying(session, dependent, error, delay)
+    await _mark_retrying(session, db_job, error, delay)
+    logger.info(f"Job {db_job.id} scheduled for retry {db_job.retry_count} in {delay}s")
+    return True
+
+async def _start_job(session, db_job: Job) -> datetime:
+    """
+    Marks the job in progress and returns when this attempt started.
+    """
+    # Intermediate progress is only published to Redis; the DB is written
+    # again when the job finishes.
+    attempt_started_at = datetime.utcnow()
+    db_job.status = "in_progress"
+    # Kept across retries so the queue wait is measured to the first start
+    db_job.started_at = db_job.started_at or attempt_started_at
+    db_job.error_message = None
+    db_job.progress_percent = 10.0
+    db_job.current_step = "Analyzing room layout..."
+    await session.commit()
+    await publish_progress(
+        db_job.id, db_job.status, db_job.progress_percent, db_job.current_step,
+        queued_at=db_job.created_at, started_at=db_job.started_at
+    )
+    return attempt_started_at
+
+async def process_staging_job(job_id: str):
+    """
+    Worker task to process a staging job using OpenRouter via LiteLLM.
+    """
+    async with AsyncSessionLocal() as session:
+        # Fetch job and associated image
+        stmt = select(Job, Image).join(Image, Job.image_id == Image.id).where(Job.id == job_id)
+        result = await session.execute(stmt)
+        record = result.one_or_none()
+        
+        if not record:
+            logger.error(f"Job {job_id} or associated image not found")
+            return
+
+        db_job, db_image = record
+        attempt_started_at = await _start_job(session, db_job)
+
+        steps = StepRecorder(db_job.id, db_job.retry_count)
+        # Raises TimeoutError here rather than letting RQ cancel the job, so an
+        # overrun is retried like any other failure
+        deadline = asyncio.timeout(settings.JOB_TIMEOUT_SECONDS)
+        try:
+            async with deadline:
+                checkpoints = await load_checkpoints(job_id)
+                if checkpoints:
+                    logger.info(f"Resuming job {job_id} after steps: {', '.join(checkpoints)}")
+
+                # Fetch and encode the source photo once; every step below reuses it
+                encoded_image = None
+                if RESULT_URL not in checkpoints:
+                    encoded_image = await _prepare(db_image, steps)
+
+                # 1. Analyze Room
+                analysis = await _analyze(job_id, db_image, encoded_image, checkpoints, steps)
                 
-            # Upload to results bucket
-            result_url = await storage_service.upload_file(
-                settings.BUCKET_RESULTS,
-                f"{job_id}.jpg",
-                image_data,
-                "image/jpeg"
-            )
-            
-            db_job.status = "completed"
-            db_job.progress_percent = 100.0
-            db_job.current_step = "Final rendering complete"
-            db_job.completed_at = datetime.utcnow()
-            db_job.result_url = result_url
-            await session.commit()
+                await publish_progress(job_id, "in_progress", 30.0, "Detecting surfaces and depth...")
+
+                result_url = await _render_variant(job_id, db_job, db_image, encoded_image, analysis, checkpoints, steps)
+            await steps.flush()
+            await _complete_job(session, db_job, result_url, attempt_started_at)
             
             logger.info(f"Job {job_id} completed successfully")
             
         except Exception as e:
+            if deadline.expired():
+                e = TimeoutError(f"Job did not finish within {settings.JOB_TIMEOUT_SECONDS}s")
             logger.error(f"Error processing job {job_id}: {str(e)}")
-            db_job.status = "error"
-            db_job.error_message = str(e)
-            await session.commit()
+            await steps.flush()
+            await _retry_or_fail(session, db_job, e, schedule_staging_retry)
+
+async def process_staging_batch(parent_job_id: str):
+    """
+    Worker task for a multi-style batch: analyzes the room once, then renders
+    every child job (one per style) concurrently, bounded by BATCH_MAX_CONCURRENCY.
+    """
+    async with AsyncSessionLocal() as session:
+        stmt = select(Job, Image).join(Image, Job.image_id == Image.id).where(Job.id == parent_job_id)
+        record = (await session.execute(stmt)).one_or_none()
+        if not record:
+            logger.error(f"Batch job {parent_job_id} or associated image not found")
+            return
+        parent_job, db_image = record
+
+        children = (await session.execute(
+            select(Job).where(Job.parent_job_id == parent_job.id).order_by(Job.created_at)
+        )).scalars().all()
+        # Styles finished by an earlier attempt are not rendered again
+        pending = [child for child in children if child.status != "completed"]
+
+        attempt_started_at = await _start_job(session, parent_job)
+        for child in pending:
+            await _start_job(session, child)
+
+        # One time budget covers the shared analysis and every style
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.BATCH_JOB_TIMEOUT_SECONDS
+        timed_out = TimeoutError(f"Batch did not finish within {settings.BATCH_JOB_TIMEOUT_SECONDS}s")
+
+        # The shared steps are recorded on the parent, the per-style ones on each child
+        parent_steps = StepRecorder(parent_job.id, parent_job.retry_count)
+        try:
+            async with asyncio.timeout_at(deadline):
+                checkpoints = await load_checkpoints(parent_job_id)
+                encoded_image = await _prepare(db_image, parent_steps)
+                logger.info(f"Analyzing room once for batch {parent_job_id} ({len(pending)} styles)")
+                analysis = await _analyze(parent_job_id, db_image, encoded_image, checkpoints, parent_steps)
+        except Exception as e:
+            if loop.time() >= deadline:
+                e = timed_out
+            logger.error(f"Error analyzing room for batch {parent_job_id}: {str(e)}")
+            await parent_steps.flush()
+            await _retry_or_fail(session, parent_job, e, schedule_batch_retry, dependents=pending)
+            return
+        await parent_steps.flush()
+
+        for child in pending:
+            await publish_progress(child.id, "in_progress", 30.0, "Detecting surfaces and depth...")
+
+        semaphore = asyncio.Semaphore(settings.BATCH_MAX_CONCURRENCY)
+        finished = len(children) - len(pending)
+
+        async def render_child(child: Job):
+            # The shared session is not safe for concurrent use, so each child
+            # is completed in a session of its own as soon as it is rendered
+            nonlocal finished
+            async with semaphore:
+                child_steps = StepRecorder(child.id, child.retry_count)
+                try:
+                    child_checkpoints = await load_checkpoints(str(child.id))
+                    result_url = await _render_variant(str(child.id), child, db_image, encoded_image, analysis, child_checkpoints, child_steps)
+                    async with AsyncSessionLocal() as child_session:
+                        await _complete_job(child_session, await child_session.get(Job, child.id), result_url, attempt_started_at)
+                    return result_url
+                except Exception as e:
+                    logger.error(f"Error rendering {child.style_preset} for batch {parent_job_id}: {str(e)}")
+                    return e
+                finally:
+                    await child_steps.flush()
+                    finished += 1
+                    await publish_progress(
+                        parent_job.id, "in_progress",
+                        30.0 + 70.0 * finished / len(children),
+                        f"Rendered {finished} of {len(children)} styles"
+                    )
+
+        try:
+            async with asyncio.timeout_at(deadline):
+                outcomes = await asyncio.gather(*(render_child(child) for child in pending))
+        except TimeoutError:
+            # Styles completed before the deadline are skipped below
+            outcomes = [timed_out] * len(pending)
+
+        failed = []
+        for child, outcome in zip(pending, outcomes):
+            # Pick up what the child's own session wrote
+            await session.refresh(child)
+            if isinstance(outcome, Exception) and child.status != "completed":
+                failed.append((child, outcome))
+
+        failures = "; ".join(f"{child.style_preset}: {e}" for child, e in failed)
+        retries_left = (parent_job.retry_count or 0) < settings.JOB_MAX_RETRIES
+        if failed and (retries_left or await _circuit_wait(*(e for _, e in failed)) > 0):
+            # Only the failed styles are rendered again
+            await _retry_or_fail(
+                session, parent_job, Exception(failures), schedule_batch_retry,
+                dependents=[child for child, _ in failed], causes=[e for _, e in failed]
+            )
+            return
+
+        for child, e in failed:
+            await _fail_job(session, child, e)
+        completed = [child for child in children if child.status == "completed"]
+        if not completed:
+            await _fail_job(session, parent_job, Exception(failures))
+        else:
+            # The parent has no image of its own; it points at the first rendered style
+            if failed:
+                parent_job.error_message = failures
+            await _complete_job(session, parent_job, completed[0].result_url, attempt_started_at)
+        await clear_checkpoints(parent_job_id)
+        logger.info(f"Batch {parent_job_id} finished with {len(failed)} failed style(s)")
+
+async def speculative_analyze_image(image_id: str):
+    """
+    Low-priority worker task queued at upload time. Runs analyze_room so the
+    result is already cached when the user creates a job for this image.
+    """
+    async with AsyncSessionLocal() as session:
+        db_image = await session.get(Image, image_id)
+    if not db_image:
+        logger.error(f"Image {image_id} not found for speculative analysis")
+        return
+
+    await mark_speculative_analysis(image_id, "running")
+    try:
+        encoded_image = await prepare_model_image(db_image.original_url, db_image.content_hash)
+        await _remember_content_hash(db_image, encoded_image)
+        await analyze_room(db_image.original_url, encoded_image=encoded_image)
+        logger.info(f"Speculative analysis finished for image {image_id}")
+    except Exception as e:
+        # A real job will simply run the analysis itself
+        logger.warning(f"Speculative analysis failed for image {image_id}: {str(e)}")
+    finally:
+        await clear_speculative_analysis(image_id)
+
+async def recover_abandoned_job(func_name: str, args: tuple):
+    """
+    Retries or fails the DB rows of an RQ job that never reported back
+    (worker crash, SIGKILL or an overrun of the RQ timeout), so they do not
+    stay in_progress forever.
+    """
+    task = func_name.rsplit(".", 1)[-1]
+    target_id = args[0] if args else None
+    if task == "speculative_analyze_image":
+        await clear_speculative_analysis(target_id)
+        return
+    if task not in ("process_staging_job", "process_staging_batch"):
+        return
+
+    error = Exception("The worker running this job stopped before it finished")
+    async with AsyncSessionLocal() as session:
+        db_job = await session.get(Job, target_id)
+        if db_job is None or db_job.status != "in_progress":
+            return
+        logger.warning(f"Recovering job {target_id} abandoned by its worker")
+        if task == "process_staging_batch":
+            pending = (await session.execute(
+                select(Job).where(Job.parent_job_id == db_job.id, Job.status != "completed")
+            )).scalars().all()
+            await _retry_or_fail(session, db_job, error, schedule_batch_retry, dependents=pending)
+        else:
+            await _retry_or_fail(session, db_job, error, schedule_staging_retry)
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import httpx
+from typing import Optional
+from litellm.llms.custom_httpx.http_handler import AsyncHTTPHandler
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+OPENROUTER = "openrouter"
+DOWNLOADS = "downloads"
+
+# httpx connection pools are bound to the event loop that opened them, and RQ
+# work-horses start a fresh loop per job, so clients are kept per loop.
+_clients: dict = {}
+
+
+def _http2_available() -> bool:
+    if not settings.HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("HTTP2_ENABLED is set but the h2 package is missing; using HTTP/1.1")
+        return False
+    return True
+
+
+def _build_client(name: str) -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS
+    )
+    timeout = httpx.Timeout(settings.HTTP_TIMEOUT_SECONDS, connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS)
+    return httpx.AsyncClient(
+        http2=_http2_available() if name == OPENROUTER else False,
+        limits=limits,
+        timeout=timeout,
+        follow_redirects=name == DOWNLOADS
+    )
+
+
+def get_http_client(name: str = DOWNLOADS) -> httpx.AsyncClient:
+    """
+    Returns the pooled keep-alive client for `name` on the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    for stale_loop in [l for l in _clients if l.is_closed()]:
+        _clients.pop(stale_loop)
+    loop_clients = _clients.setdefault(loop, {})
+
+    client = loop_clients.get(name)
+    if client is None or client.is_closed:
+        client = _build_client(name)
+        loop_clients[name] = client
+    return client
+
+
+class _PooledHTTPHandler(AsyncHTTPHandler):
+    """
+    litellm's HTTP handler over one of our pooled clients, instead of the
+    client litellm would otherwise open and cache per provider.
+    """
+    def __init__(self, client: httpx.AsyncClient):
+        # AsyncHTTPHandler.__init__ would build a second client
+        self.timeout = client.timeout
+        self.event_hooks = None
+        self.client = client
+        self.client_alias = OPENROUTER
+
+
+def get_litellm_client(model: str) -> Optional[AsyncHTTPHandler]:
+    """
+    Handler to pass as `client=` to litellm.acompletion so OpenRouter calls
+    share the pooled connections on the running loop. None for other
+    providers, which take a different client type.
+    """
+    if not model.startswith(f"{OPENROUTER}/"):
+        return None
+    return _PooledHTTPHandler(get_http_client(OPENROUTER))
+
+
+async def close_http_clients():
+    loop_clients = _clients.pop(asyncio.get_running_loop(), {})
+    for client in loop_clients.values():
+        await client.aclose()
@@ -0,0 +1,370 @@
+import io
+import time
+import base64
+import asyncio
+import hashlib
+import logging
+import ipaddress
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from multiprocessing import shared_memory
+from urllib.parse import urlsplit
+from PIL import Image
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Largest dimension we send to the models; bigger photos are downscaled.
+MAX_IMAGE_DIMENSION = 2160
+
+# Enough of an object to read its dimensions, past a large EXIF block
+IMAGE_HEADER_BYTES = 128 * 1024
+
+# Formats the providers accept when fetching an original by URL
+URL_IMAGE_FORMATS = ("JPEG", "PNG", "WEBP")
+
+# Downscaled copies of oversized photos, keyed by content hash, for URL transport
+MODEL_COPY_PREFIX = "model-inputs/"
+
+
+@dataclass(frozen=True)
+class EncodedImage:
+    """
+    Source photo prepared once per job and shared by every pipeline step.
+    """
+    media_type: str
+    base64_data: str
+    width: int
+    height: int
+    content_hash: str
+
+    @property
+    def data_url(self) -> str:
+        return f"data:{self.media_type};base64,{self.base64_data}"
+
+    @property
+    def model_url(self) -> str:
+        return self.data_url
+
+
+@dataclass(frozen=True)
+class RemoteImage:
+    """
+    Source photo the provider fetches itself from a presigned storage URL.
+    """
+    bucket: str
+    object_name: str
+    width: int
+    height: int
+    content_hash: str
+
+    @property
+    def model_url(self) -> str:
+        # Signed on each request, so a job held up by retries, rate limiting
+        # or parking never sends a URL that expired in the meantime
+        return _presign_for_model(self.bucket, self.object_name)
+
+
+class EncodedImageCache:
+    """
+    In-process LRU cache of encoded images keyed by the SHA-256 of the source bytes.
+    """
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, EncodedImage]" = OrderedDict()
+
+    def get(self, content_hash: str):
+        from app.services.metrics import cache_requests
+
+        encoded = self._entries.get(content_hash)
+        if encoded is not None:
+            self._entries.move_to_end(content_hash)
+        cache_requests.labels("encoded_image", "hit" if encoded is not None else "miss").inc()
+        return encoded
+
+    def put(self, encoded: EncodedImage):
+        if self.max_entries <= 0:
+            return
+        self._entries[encoded.content_hash] = encoded
+        self._entries.move_to_end(encoded.content_hash)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+encoded_image_cache = EncodedImageCache(settings.IMAGE_CACHE_MAX_ENTRIES)
+
+
+async def fetch_image_bytes(image_url: str) -> bytes:
+    """
+    Fetches image bytes, reading internal/MinIO URLs straight from storage.
+    """
+    from app.services.storage import storage_service
+    location = storage_service.split_url(image_url)
+    if location:
+        bucket, object_name = location
+        return await storage_service.read_object(bucket, object_name)
+
+    from app.services.http_clients import get_http_client
+    image_response = await get_http_client().get(image_url)
+    image_response.raise_for_status()
+    return image_response.content
+
+
+def _resize_and_encode(image_content: bytes) -> tuple[str, bytes, int, int]:
+    """
+    Decodes the image with Pillow, resizes it if either dimension > MAX_IMAGE_DIMENSION
+    and base64 encodes the result.
+    Returns (media_type, base64_bytes, width, height).
+    """
+    try:
+        with Image.open(io.BytesIO(image_content)) as img:
+            width, height = img.size
+            if width > MAX_IMAGE_DIMENSION or height > MAX_IMAGE_DIMENSION:
+                img.thumbnail((MAX_IMAGE_DIMENSION, MAX_IMAGE_DIMENSION), Image.Resampling.LANCZOS)
+                width, height = img.size
+
+                # Save resized image to buffer
+                buffer = io.BytesIO()
+                fmt = img.format if img.format else 'JPEG'
+                img.save(buffer, format=fmt)
+                image_content = buffer.getvalue()
+
+            media_type = "image/jpeg"
+            if img.format == 'PNG':
+                media_type = "image/png"
+            elif img.format == 'WEBP':
+                media_type = "image/webp"
+
+            return media_type, base64.b64encode(image_content), width, height
+
+    except Exception as e:
+        logger.error(f"Error processing image with Pillow: {e}")
+        # Fallback to original content if Pillow fails, assuming jpeg
+        return "image/jpeg", base64.b64encode(image_content), 0, 0
+
+
+def encode_image_content(image_content: bytes, content_hash: str) -> EncodedImage:
+    """
+    Synchronous encode, used when no process pool is configured.
+    """
+    media_type, image_base64, width, height = _resize_and_encode(image_content)
+    return EncodedImage(media_type, image_base64.decode('utf-8'), width, height, content_hash)
+
+
+def _encode_in_subprocess(input_name: str, input_size: int) -> tuple[str, int, str, int, int]:
+    """
+    Process pool entry point. Reads the source bytes from shared memory and writes
+    the base64 payload into a new segment, so multi-MB buffers are not pickled.
+    Returns (output_name, output_size, media_type, width, height); the caller
+    owns the output segment and must unlink it.
+    """
+    shm_in = shared_memory.SharedMemory(name=input_name)
+    try:
+        image_content = bytes(shm_in.buf[:input_size])
+    finally:
+        shm_in.close()
+
+    media_type, image_base64, width, height = _resize_and_encode(image_content)
+
+    shm_out = shared_memory.SharedMemory(create=True, size=max(len(image_base64), 1))
+    try:
+        shm_out.buf[:len(image_base64)] = image_base64
+    finally:
+        shm_out.close()
+    return shm_out.name, len(image_base64), media_type, width, height
+
+
+_image_executor = None
+
+
+def get_image_executor():
+    """
+    Lazily creates the process pool used for Pillow work.
+    Returns None when IMAGE_PROCESS_POOL_WORKERS is 0 (encode in a thread instead).
+    """
+    global _image_executor
+    if _image_executor is None and settings.IMAGE_PROCESS_POOL_WORKERS > 0:
+        _image_executor = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_PROCESS_POOL_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _image_executor
+
+
+def shutdown_image_executor():
+    global _image_executor
+    if _image_executor is not None:
+        _image_executor.shutdown(wait=True, cancel_futures=True)
+        _image_executor = None
+
+
+async def encode_image_async(image_content: bytes, content_hash: str) -> EncodedImage:
+    """
+    Runs the decode/resize/encode off the event loop.
+    """
+    executor = get_image_executor()
+    if executor is None:
+        return await asyncio.to_thread(encode_image_content, image_content, content_hash)
+
+    shm_in = shared_memory.SharedMemory(create=True, size=max(len(image_content), 1))
+    try:
+        shm_in.buf[:len(image_content)] = image_content
+        loop = asyncio.get_running_loop()
+        output_name, output_size, media_type, width, height = await loop.run_in_executor(
+            executor, _encode_in_subprocess, shm_in.name, len(image_content)
+        )
+    finally:
+        shm_in.close()
+        shm_in.unlink()
+
+    shm_out = shared_memory.SharedMemory(name=output_name)
+    try:
+        image_base64 = bytes(shm_out.buf[:output_size]).decode('utf-8')
+    finally:
+        shm_out.close()
+        shm_out.unlink()
+    return EncodedImage(media_type, image_base64, width, height, content_hash)
+
+
+async def prepare_image(image_url: str) -> EncodedImage:
+    """
+    Fetches and encodes the source photo, reusing a cached encoding when the
+    same bytes were already processed (retries, re-styles).
+    """
+    # Imported here so pool processes spawned for encoding stay light
+    from app.services.instrumentation import record_bytes
+
+    image_content = await fetch_image_bytes(image_url)
+    record_bytes(received=len(image_content))
+    content_hash = hashlib.sha256(image_content).hexdigest()
+
+    encoded = encoded_image_cache.get(content_hash)
+    if encoded is not None:
+        logger.info(f"Encoded image cache hit for {content_hash[:12]}")
+        return encoded
+
+    encoded = await encode_image_async(image_content, content_hash)
+    encoded_image_cache.put(encoded)
+    return encoded
+
+
+def storage_publicly_reachable() -> bool:
+    """
+    Whether a provider on the internet can fetch from STORAGE_PUBLIC_ENDPOINT,
+    i.e. it is not localhost, a private address or an internal hostname.
+    """
+    endpoint = settings.STORAGE_PUBLIC_ENDPOINT
+    try:
+        # A bare IPv6 address, which urlsplit would cut at its first colon
+        host = str(ipaddress.ip_address(endpoint))
+    except ValueError:
+        host = urlsplit(endpoint if "://" in endpoint else f"//{endpoint}").hostname or ""
+    if host == "localhost" or host.endswith((".localhost", ".local", ".internal")):
+        return False
+    try:
+        return ipaddress.ip_address(host).is_global
+    except ValueError:
+        return "." in host
+
+
+def _use_image_urls() -> bool:
+    if settings.LLM_IMAGE_TRANSPORT == "auto":
+        return storage_publicly_reachable()
+    return settings.LLM_IMAGE_TRANSPORT == "url"
+
+
+
+def _presign_for_model(bucket: str, object_name: str) -> str:
+    """
+    Presigned URL for the provider. The signing time is rounded down to half
+    the expiry so every worker builds the same URL for the same object, which
+    keeps identical requests coalescable; it stays valid for at least half
+    the expiry from now.
+    """
+    from app.services.storage import storage_service
+
+    expiry = settings.LLM_IMAGE_URL_EXPIRY_SECONDS
+    window = max(expiry // 2, 1)
+    signed_at = datetime.fromtimestamp(int(time.time()) // window * window, tz=timezone.utc)
+    return storage_service.presigned_get_url(bucket, object_name, expiry, request_date=signed_at)
+
+
+def _header_info(header: bytes):
+    """
+    (format, width, height) from the first bytes of an image, or None.
+    """
+    try:
+        with Image.open(io.BytesIO(header)) as img:
+            return img.format, img.width, img.height
+    except Exception:
+        return None
+
+
+async def _remote_original(bucket: str, object_name: str, content_hash: str):
+    """
+    The original object as a RemoteImage if the model can take it as is
+    (accepted format, within MAX_IMAGE_DIMENSION and LLM_IMAGE_URL_MAX_BYTES).
+    """
+    from app.services.storage import storage_service
+
+    stat = await storage_service.stat_object(bucket, object_name)
+    if stat is None or stat.size > settings.LLM_IMAGE_URL_MAX_BYTES:
+        return None
+    info = await asyncio.to_thread(
+        _header_info, await storage_service.read_object_head(bucket, object_name, IMAGE_HEADER_BYTES)
+    )
+    if info is None:
+        return None
+    fmt, width, height = info
+    if fmt not in URL_IMAGE_FORMATS or width > MAX_IMAGE_DIMENSION or height > MAX_IMAGE_DIMENSION:
+        return None
+    return RemoteImage(bucket, object_name, width, height, content_hash)
+
+
+async def _remote_copy(image_url: str, content_hash: str) -> RemoteImage:
+    """
+    A downscaled copy of the photo as a RemoteImage, encoding and uploading it
+    the first time this content is used.
+    """
+    from app.services.storage import storage_service
+
+    bucket, object_name = settings.BUCKET_THUMBNAILS, f"{MODEL_COPY_PREFIX}{content_hash}"
+    stat = await storage_service.stat_object(bucket, object_name)
+    if stat is not None:
+        width, height = int(stat.metadata["x-amz-meta-width"]), int(stat.metadata["x-amz-meta-height"])
+    else:
+        encoded = await prepare_image(image_url)
+        if not encoded.width:
+            raise ValueError("Pillow could not read the image")
+        await storage_service.upload_file(
+            bucket,
+            object_name,
+            base64.b64decode(encoded.base64_data),
+            encoded.media_type,
+            metadata={"width": str(encoded.width), "height": str(encoded.height)}
+        )
+        width, height = encoded.width, encoded.height
+    return RemoteImage(bucket, object_name, width, height, content_hash)
+
+
+async def prepare_model_image(image_url: str, content_hash: str = None):
+    """
+    Source photo for the model requests of a job. With URL transport the
+    provider fetches it from a presigned storage URL instead of receiving it
+    inline; photos the model cannot take as is are served from a downscaled
+    copy. Falls back to the base64 EncodedImage of prepare_image when URLs
+    are off, the storage endpoint is not public or the photo is not in storage.
+    """
+    from app.services.storage import storage_service
+
+    location = storage_service.split_url(image_url)
+    if location is None or not content_hash or not _use_image_urls():
+        return await prepare_image(image_url)
+    try:
+        return await _remote_original(*location, content_hash) or await _remote_copy(image_url, content_hash)
+    except Exception as e:
+        logger.warning(f"Sending image {content_hash[:12]} inline, presigned URL unavailable: {e}")
+        return await prepare_image(image_url)
@@ -0,0 +1,122 @@
+"""
+Per-step timing, token, cost and byte accounting for staging jobs.
+
+`StepRecorder.step()` times a step with a monotonic clock and makes it the
+current step for its asyncio context; code deep in the call stack (litellm
+responses, OpenRouter POSTs, storage reads and writes) attributes usage to
+it with `record_usage()` / `record_bytes()` without threading a handle
+through every call. Steps are written to `job_steps` and to /metrics.
+"""
+import time
+import logging
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from app.models.base import AsyncSessionLocal
+from app.models.job_step import JobStep
+from app.services.metrics import job_step_duration, llm_tokens, llm_cost, step_bytes
+from app.services.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StepRecord:
+    step: str
+    started_at: datetime
+    status: str = "ok"
+    error_message: Optional[str] = None
+    model: Optional[str] = None
+    duration_seconds: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: Optional[float] = None
+    bytes_sent: int = 0
+    bytes_received: int = 0
+
+
+_current_step: ContextVar[Optional[StepRecord]] = ContextVar("current_step", default=None)
+
+
+def record_usage(model: str, prompt_tokens: int = 0, completion_tokens: int = 0, cost_usd: float = None):
+    """
+    Adds provider token usage (and cost, if known) to the current step.
+    """
+    record = _current_step.get()
+    if record is None:
+        return
+    record.model = model
+    record.prompt_tokens += prompt_tokens or 0
+    record.completion_tokens += completion_tokens or 0
+    if cost_usd is not None:
+        record.cost_usd = (record.cost_usd or 0.0) + cost_usd
+
+
+def record_bytes(sent: int = 0, received: int = 0):
+    record = _current_step.get()
+    if record is None:
+        return
+    record.bytes_sent += sent
+    record.bytes_received += received
+
+
+class StepRecorder:
+    """
+    Collects the steps of one attempt of a job; `flush()` persists them.
+    """
+    def __init__(self, job_id, attempt: int = 0):
+        self.job_id = job_id
+        self.attempt = attempt or 0
+        self.steps: list[StepRecord] = []
+
+    @asynccontextmanager
+    async def step(self, name: str, model: str = None):
+        record = StepRecord(step=name, started_at=datetime.utcnow(), model=model)
+        token = _current_step.set(record)
+        started = time.monotonic()
+        try:
+            with span(f"step {name}", **{"stagemaster.job_id": str(self.job_id), "gen_ai.request.model": model}):
+                yield record
+        except BaseException as e:
+            record.status = "error"
+            record.error_message = str(e)[:500]
+            raise
+        finally:
+            record.duration_seconds = time.monotonic() - started
+            _current_step.reset(token)
+            self.steps.append(record)
+            self._observe(record)
+
+    def _observe(self, record: StepRecord):
+        model = record.model or ""
+        job_step_duration.labels(record.step, model, record.status).observe(record.duration_seconds)
+        if record.prompt_tokens:
+            llm_tokens.labels(record.step, model, "prompt").inc(record.prompt_tokens)
+        if record.completion_tokens:
+            llm_tokens.labels(record.step, model, "completion").inc(record.completion_tokens)
+        if record.cost_usd:
+            llm_cost.labels(record.step, model).inc(record.cost_usd)
+        if record.bytes_sent:
+            step_bytes.labels(record.step, "sent").inc(record.bytes_sent)
+        if record.bytes_received:
+            step_bytes.labels(record.step, "received").inc(record.bytes_received)
+
+    async def flush(self):
+        """
+        Writes the recorded steps to job_steps in a session of its own.
+        Failures are logged and never break the job itself.
+        """
+        if not self.steps:
+            return
+        steps, self.steps = self.steps, []
+        try:
+            async with AsyncSessionLocal() as session:
+                session.add_all([
+                    JobStep(job_id=self.job_id, attempt=self.attempt, **vars(record))
+                    for record in steps
+                ])
+                await session.commit()
+        except Exception as e:
+            logger.error(f"Failed to persist step timings for job {self.job_id}: {e}")
@@ -0,0 +1,81 @@
+import json
+import time
+import hashlib
+import logging
+from app.services.redis_client import get_async_redis
+from app.services.metrics import cache_requests
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "llm-cache:"
+STATS_KEY = "llm-cache:stats"
+
+
+def cache_key(*parts) -> str:
+    """
+    Canonical SHA-256 of the given JSON-serialisable parts.
+    """
+    canonical = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class RedisLRUCache:
+    """
+    String cache in Redis with a TTL per entry and a size bound per namespace.
+    A sorted set of last-access times drives LRU eviction once more than
+    `max_entries` are stored. Redis errors are logged and treated as misses.
+    """
+    def __init__(self, namespace: str, ttl_seconds: int, max_entries: int):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._index_key = f"{KEY_PREFIX}{namespace}:lru"
+
+    def _key(self, digest: str) -> str:
+        return f"{KEY_PREFIX}{self.namespace}:{digest}"
+
+    async def get(self, digest: str):
+        try:
+            redis = get_async_redis()
+            value = await redis.get(self._key(digest))
+            async with redis.pipeline(transaction=False) as pipeline:
+                if value is not None:
+                    pipeline.zadd(self._index_key, {digest: time.time()})
+                pipeline.hincrby(STATS_KEY, f"{self.namespace}:{'hits' if value is not None else 'misses'}", 1)
+                await pipeline.execute()
+        except Exception as e:
+            logger.error(f"Cache read failed for {self.namespace}: {e}")
+            return None
+        cache_requests.labels(self.namespace, "hit" if value is not None else "miss").inc()
+        return value.decode("utf-8") if value is not None else None
+
+    async def set(self, digest: str, value: str):
+        try:
+            redis = get_async_redis()
+            async with redis.pipeline(transaction=False) as pipeline:
+                pipeline.set(self._key(digest), value, ex=self.ttl_seconds)
+                pipeline.zadd(self._index_key, {digest: time.time()})
+                pipeline.zcard(self._index_key)
+                size = (await pipeline.execute())[-1]
+
+            if size > self.max_entries:
+                evicted = await redis.zpopmin(self._index_key, size - self.max_entries)
+                if evicted:
+                    await redis.delete(*[self._key(member.decode("utf-8")) for member, _ in evicted])
+        except Exception as e:
+            logger.error(f"Cache write failed for {self.namespace}: {e}")
+
+
+async def get_cache_stats() -> dict:
+    """
+    Hit/miss counters per cache namespace.
+    """
+    raw = await get_async_redis().hgetall(STATS_KEY)
+    stats: dict = {}
+    for field, count in raw.items():
+        namespace, kind = field.decode("utf-8").rsplit(":", 1)
+        stats.setdefault(namespace, {"hits": 0, "misses": 0})[kind] = int(count)
+    for counters in stats.values():
+        total = counters["hits"] + counters["misses"]
+        counters["hit_ratio"] = counters["hits"] / total if total else 0.0
+    return stats
@@ -1,5 +1,7 @@
 import litellm
 import logging
+import re
+import json
 import asyncio
 import base64
 import httpx
@@ -10,76 +12,96 @@ logger = logging.getLogger(__name__)
 # Configure litellm
 litellm.telemetry = False
 
-import io
-from PIL import Image
+from app.services.image_processing import EncodedImage, RemoteImage, prepare_image
+from app.services.analysis_cache import get_cached_analysis, store_analysis
+from app.services.llm_cache import RedisLRUCache, cache_key
+from app.services.singleflight import coalesce, error_types, SingleflightError
+from app.services.model_router import generation_router
+from app.services.rate_limiter import rate_limiter, estimate_tokens
+from app.services.circuit_breaker import completion_breaker, image_breaker
+from app.services.instrumentation import record_usage, record_bytes
+from app.services.tracing import span
+from app.services.http_clients import get_http_client, get_litellm_client, OPENROUTER, DOWNLOADS
 
-# ... (imports)
+# Bump when the plan_furniture_placement prompt changes so stale plans are not reused
+PLAN_PROMPT_VERSION = "1"
 
-async def _fetch_and_encode_image(image_url: str) -> tuple[str, str, int, int]:
+plan_cache = RedisLRUCache(
+    "plan",
+    ttl_seconds=settings.PLAN_CACHE_TTL_SECONDS,
+    max_entries=settings.PLAN_CACHE_MAX_ENTRIES
+)
+
+# Provider error text for an image URL it could not download
+_IMAGE_FETCH_ERROR = re.compile(
+    r"(fetch|download|retriev|access|load|read|reach)\w*\W+(?:\w+\W+){0,4}(image|url)"
+    r"|(image|url)\W+(?:\w+\W+){0,4}(fetch|download|retriev|access|load|read|reach|unreachable|timed out|expired)",
+    re.IGNORECASE
+)
+
+def _image_rejected(image, error: Exception) -> bool:
     """
-    Helper to fetch image from URL (handling internal/MinIO URLs).
-    - Resizes image if either dimension > 2160px.
-    - Returns (media_type, base64_string, width, height).
+    True if a request carrying a presigned image URL failed because the
+    provider could not fetch the URL. Other client errors (content policy,
+    bad prompt) are not retried, as that would pay for a second call.
     """
-    # Fetch image content
-    image_content = None
-    
-    internal_prefix = f"http://{settings.STORAGE_ENDPOINT}/"
-    public_prefix = f"http://{settings.STORAGE_PUBLIC_ENDPOINT}/"
-    
-    target_prefix = None
-    if image_url.startswith(internal_prefix):
-        target_prefix = internal_prefix
-    elif image_url.startswith(public_prefix):
-        target_prefix = public_prefix
-        
-    if target_prefix:
-        from app.services.storage import storage_service
-        path_parts = image_url.replace(target_prefix, "").split("/", 1)
-        if len(path_parts) == 2:
-            bucket, object_name = path_parts
-            image_content = storage_service.get_object_data(bucket, object_name)
-    
-    if image_content is None:
-        async with httpx.AsyncClient() as client:
-            image_response = await client.get(image_url)
-            image_response.raise_for_status()
-            image_content = image_response.content
+    if not isinstance(image, RemoteImage):
+        return False
+    status = getattr(error, "status_code", None)
+    message = str(error)
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        message = error.response.text
+    elif isinstance(error, SingleflightError) and error.response is not None:
+        # A coalesced follower sees the leader's status and response body
+        message = f"{message} {error.response.text}"
+    return status in (400, 403, 404, 415, 422) and bool(_IMAGE_FETCH_ERROR.search(message))
 
-    # Process image with Pillow
-    try:
-        with Image.open(io.BytesIO(image_content)) as img:
-            width, height = img.size
-            if width > 2160 or height > 2160:
-                img.thumbnail((2160, 2160), Image.Resampling.LANCZOS)
-                width, height = img.size
-                
-                # Save resized image to buffer
-                buffer = io.BytesIO()
-                # Determine format
-                fmt = img.format if img.format else 'JPEG'
-                img.save(buffer, format=fmt)
-                image_content = buffer.getvalue()
-                
-            media_type = "image/jpeg"
-            if img.format == 'PNG':
-                media_type = "image/png"
-            elif img.format == 'WEBP':
-                media_type = "image/webp"
+def _api_base() -> str:
+    if settings.LLM_BACKEND == "mock":
+        return settings.MOCK_LLM_BASE_URL
+    return settings.OPENROUTER_BASE_URL
 
-            image_base64 = base64.b64encode(image_content).decode('utf-8')
-            return media_type, image_base64, width, height
-            
-    except Exception as e:
-        logger.error(f"Error processing image with Pillow: {e}")
-        # Fallback to original content if Pillow fails, assuming jpeg
-        image_base64 = base64.b64encode(image_content).decode('utf-8')
-        return "image/jpeg", image_base64, 0, 0
+async def _acompletion(model: str, messages: list, **kwargs) -> str:
+    """
+    Runs a litellm chat completion over the pooled OpenRouter client and
+    returns the message text. Identical requests in flight on any worker are
+    coalesced into a single upstream call, which fails fast while the
+    completions circuit is open.
+    """
+    async def request():
+        with span("litellm.acompletion", **{"gen_ai.request.model": model}):
+            response = await litellm.acompletion(
+                model=model,
+                messages=messages,
+                api_key=settings.OPENROUTER_API_KEY,
+                api_base=_api_base(),
+                client=get_litellm_client(model),
+                **kwargs
+            )
+        content = response.choices[0].message.content
+        usage = getattr(response, "usage", None)
+        record_usage(
+            model,
+            getattr(usage, "prompt_tokens", 0),
+            getattr(usage, "completion_tokens", 0),
+            (getattr(response, "_hidden_params", None) or {}).get("response_cost")
+        )
+        record_bytes(sent=len(json.dumps(messages)), received=len(content or ""))
+        return content, getattr(usage, "total_tokens", None)
 
-async def analyze_room(image_url: str) -> str:
+    async def call():
+        tokens = estimate_tokens(messages, kwargs.get("max_tokens"))
+        return await completion_breaker.call(lambda: rate_limiter.run(model, tokens, request))
+
+    return await coalesce(cache_key("acompletion", settings.LLM_BACKEND, model, messages, kwargs), call)
+
+async def analyze_room(image_url: str, encoded_image: EncodedImage | RemoteImage = None) -> str:
     """
     Analyzes room layout, surfaces, and depth using LiteLLM/OpenRouter.
     Returns a text description of the room analysis.
+    Pass `encoded_image` to reuse a photo already prepared for this job.
+    Results are cached by image content hash, model and prompt version.
     """
     prompt = f"""
     Analyze the uploaded interior photo for virtual staging.
@@ -94,33 +116,53 @@ async def analyze_room(image_url: str) -> str:
     """
     
     try:
-        media_type, image_base64, _, _ = await _fetch_and_encode_image(image_url)
+        if encoded_image is None:
+            encoded_image = await prepare_image(image_url)
+        
+        cached = await get_cached_analysis(encoded_image.content_hash)
+        if cached is not None:
+            logger.info(f"Room analysis cache hit for image {encoded_image.content_hash[:12]}")
+            return cached
         
-        response = await litellm.acompletion(
-            model=settings.LITELLM_ANALYSIS_MODEL,
-            messages=[
+        analysis = await _acompletion(
+            settings.LITELLM_ANALYSIS_MODEL,
+            [
                 {"role": "user", "content": [
                     {"type": "text", "text": prompt},
-                    {"type": "image_url", "image_url": {"url": f"data:{media_type};base64,{image_base64}"}}
+                    {"type": "image_url", "image_url": {"url": encoded_image.model_url}}
                 ]}
-            ],
-            api_key=settings.OPENROUTER_API_KEY
+            ]
         )
-        return response.choices[0].message.content
+        await store_analysis(encoded_image.content_hash, analysis)
+        return analysis
     except Exception as e:
+        if _image_rejected(encoded_image, e):
+            logger.warning(f"Image URL rejected for room analysis, retrying inline: {e}")
+            return await analyze_room(image_url, encoded_image=await prepare_image(image_url))
         logger.error(f"Error calling LiteLLM for room analysis: {str(e)}")
         raise
 
-# ... (plan_furniture_placement and generate_staged_image_prompt remain unchanged)
+def _plan_instructions(wall_decorations: bool, include_tv: bool) -> tuple[str, str]:
+    decor_instruction = "Include wall decorations like art, mirrors, or clocks, but ONLY those that do not require drilling into the wall (e.g., leaning mirrors, leaning art, or lightweight items that can be mounted with adhesive strips)." if wall_decorations else "Do NOT include any wall decorations or wall art."
+    tv_instruction = "Include a non-wall mounted flat screen TV in the furniture arrangement (e.g., on a TV stand or media console)." if include_tv else ""
+    return decor_instruction, tv_instruction
 
-# Duplicate generate_image removed (confirmed)
+def _prompt_instructions(fix_white_balance: bool, wall_decorations: bool, include_tv: bool) -> tuple[str, str, str]:
+    if fix_white_balance:
+        wb_instruction = "CORRECT the white balance if the original image is too warm (yellow) or cool (blue), making it look like high-end neutral architectural photography, BUT ensure the original colors of painted surfaces (walls, etc.) are preserved and not altered by the correction."
+    else:
+        wb_instruction = "STRICTLY PRESERVE the original white balance, color temperature, and lighting tint of the photo exactly as it is. Do NOT attempt to 'fix' or 'neutralize' the colors. If the original photo is warm/yellow or cool/blue, the final rendered image MUST maintain that exact same warmth or coolness."
+    
+    decor_instruction = "Add furniture and wall decor, ensuring that any wall-mounted items do not require drilling (e.g., use leaning art, mirrors on the floor, or lightweight decor)." if wall_decorations else "Add furniture only. Keep walls completely bare of any art or decorations."
+    tv_instruction = "If the room is a living room or similar include a non-wall mounted flat screen TV on a stand or console. If the room is a bedroom it is ok to place the TV on furniture facing the bed." if include_tv else ""
+    return wb_instruction, decor_instruction, tv_instruction
 
 async def plan_furniture_placement(analysis: str, room_type: str, style_preset: str, wall_decorations: bool = True, include_tv: bool = False) -> str:
     """
     Generates a furniture placement plan based on room analysis.
+    The plan is a pure function of its inputs and the model, so it is memoized in Redis.
     """
-    decor_instruction = "Include wall decorations like art, mirrors, or clocks, but ONLY those that do not require drilling into the wall (e.g., leaning mirrors, leaning art, or lightweight items that can be mounted with adhesive strips)." if wall_decorations else "Do NOT include any wall decorations or wall art."
-    tv_instruction = "Include a non-wall mounted flat screen TV in the furniture arrangement (e.g., on a TV stand or media console)." if include_tv else ""
+    decor_instruction, tv_instruction = _plan_instructions(wall_decorations, include_tv)
     
     prompt = f"""
     Based on the following room analysis:
@@ -139,13 +181,22 @@ async def plan_furniture_placement(analysis: str, room_type: str, style_preset:
     The goal is to furnish the room AS IS.
     """
     
+    digest = cache_key(
+        analysis, room_type, style_preset, wall_decorations, include_tv,
+        settings.LITELLM_ANALYSIS_MODEL, PLAN_PROMPT_VERSION, settings.LLM_BACKEND
+    )
+    cached = await plan_cache.get(digest)
+    if cached is not None:
+        logger.info("Furniture placement plan cache hit")
+        return cached
+    
     try:
-        response = await litellm.acompletion(
-            model=settings.LITELLM_ANALYSIS_MODEL,
-            messages=[{"role": "user", "content": prompt}],
-            api_key=settings.OPENROUTER_API_KEY
+        placement_plan = await _acompletion(
+            settings.LITELLM_ANALYSIS_MODEL,
+            [{"role": "user", "content": prompt}]
         )
-        return response.choices[0].message.content
+        await plan_cache.set(digest, placement_plan)
+        return placement_plan
     except Exception as e:
         logger.error(f"Error calling LiteLLM for furniture placement: {str(e)}")
         raise
@@ -163,13 +214,9 @@ async def generate_staged_image_prompt(
     Generates a highly detailed prompt for the image generation model (e.g., Stable Diffusion or DALL-E)
     to stage the room.
     """
-    if fix_white_balance:
-        wb_instruction = "CORRECT the white balance if the original image is too warm (yellow) or cool (blue), making it look like high-end neutral architectural photography, BUT ensure the original colors of painted surfaces (walls, etc.) are preserved and not altered by the correction."
-    else:
-        wb_instruction = "STRICTLY PRESERVE the original white balance, color temperature, and lighting tint of the photo exactly as it is. Do NOT attempt to 'fix' or 'neutralize' the colors. If the original photo is warm/yellow or cool/blue, the final rendered image MUST maintain that exact same warmth or coolness."
-    
-    decor_instruction = "Add furniture and wall decor, ensuring that any wall-mounted items do not require drilling (e.g., use leaning art, mirrors on the floor, or lightweight decor)." if wall_decorations else "Add furniture only. Keep walls completely bare of any art or decorations."
-    tv_instruction = "If the room is a living room or similar include a non-wall mounted flat screen TV on a stand or console. If the room is a bedroom it is ok to place the TV on furniture facing the bed." if include_tv else ""
+    wb_instruction, decor_instruction, tv_instruction = _prompt_instructions(
+        fix_white_balance, wall_decorations, include_tv
+    )
 
     prompt = f"""
     You are a professional architectural photographer and interior designer.
@@ -198,21 +245,162 @@ async def generate_staged_image_prompt(
     """
     
     try:
-        response = await litellm.acompletion(
-            model=settings.LITELLM_ANALYSIS_MODEL,
-            messages=[{"role": "user", "content": prompt}],
-            api_key=settings.OPENROUTER_API_KEY
+        return await _acompletion(
+            settings.LITELLM_ANALYSIS_MODEL,
+            [{"role": "user", "content": prompt}]
         )
-        return response.choices[0].message.content
     except Exception as e:
         logger.error(f"Error calling LiteLLM for generation prompt: {str(e)}")
         raise
 
-async def generate_image(prompt: str, original_image_url: str = None, fix_white_balance: bool = False) -> bytes:
+async def plan_and_generate_prompt(
+    original_image_url: str,
+    analysis: str,
+    room_type: str,
+    style_preset: str,
+    fix_white_balance: bool = False,
+    wall_decorations: bool = True,
+    include_tv: bool = False
+):
+    """
+    "Fused planning": produces the furniture placement plan and the image
+    generation prompt in one structured-output call instead of two round trips.
+    Returns (placement_plan, generation_prompt), or None if the model's output
+    could not be parsed, in which case callers fall back to the two-step path.
+    Provider errors are raised.
+    """
+    plan_decor_instruction, plan_tv_instruction = _plan_instructions(wall_decorations, include_tv)
+    wb_instruction, decor_instruction, tv_instruction = _prompt_instructions(
+        fix_white_balance, wall_decorations, include_tv
+    )
+
+    prompt = f"""
+    You are a professional architectural photographer and interior designer preparing a virtual staging render.
+    
+    Original Room Analysis:
+    {analysis}
+    
+    Room Type: {room_type}
+    Design Style: {style_preset}
+    
+    TASK 1 - placement_plan:
+    Provide a detailed furniture placement plan. List specific furniture items, their positions, and how they should look in the given design style.
+    {plan_decor_instruction}
+    {plan_tv_instruction}
+    The furniture arrangement must respect the existing room layout, doors, windows, and traffic flow.
+    Do not suggest removing or altering any architectural features (walls, windows, ceilings, floors).
+    The goal is to furnish the room AS IS.
+    
+    TASK 2 - image_prompt:
+    Using that plan, create a highly detailed, photorealistic prompt for generating a virtually staged version of this room.
+    1. The goal is to VIRTUAL STAGE the EXISTING room.
+    2. You MUST preserve the EXACT structure of the room (walls, ceiling, floor plan, windows, doors).
+    3. You MUST preserve the EXACT camera angle and perspective of the original image.
+    4. You MUST preserve the current natural lighting direction, shadows, and reflections from windows/surfaces.
+    5. {wb_instruction}
+    6. {decor_instruction} {tv_instruction} DO NOT remove or alter architectural elements.
+    Write it as a single paragraph that includes lighting details, texture descriptions, specific camera settings, and photorealistic keywords.
+    It should explicitly instruct the generation model to "render the following furniture into the provided room image without changing the room's geometry or perspective".
+    
+    Original Image URL for reference: {original_image_url}
+    
+    Respond with a JSON object only, with exactly two string fields: "placement_plan" and "image_prompt".
+    """
+
+    # Provider errors (timeouts, 5xx, open circuits) propagate: retrying the
+    # same failing provider with two calls instead of one would only add load
+    try:
+        content = await _acompletion(
+            settings.LITELLM_ANALYSIS_MODEL,
+            [{"role": "user", "content": prompt}],
+            response_format={"type": "json_object"}
+        )
+    except Exception as e:
+        # litellm rejects response_format for models without JSON mode before calling them
+        if "UnsupportedParamsError" not in error_types(e):
+            raise
+        logger.warning(f"Fused planning unsupported by the model, falling back to two-step planning: {str(e)}")
+        return None
+
+    try:
+        # Some models wrap JSON in a markdown fence despite response_format
+        content = (content or "").strip()
+        if content.startswith("```"):
+            content = content.strip("`")
+            content = content[content.index("{"):]
+        result = json.loads(content)
+        placement_plan = result["placement_plan"]
+        generation_prompt = result["image_prompt"]
+        if not isinstance(placement_plan, str) or not isinstance(generation_prompt, str) \
+                or not placement_plan.strip() or not generation_prompt.strip():
+            raise ValueError("Empty or non-string fields in fused planning output")
+        return placement_plan, generation_prompt
+    except (ValueError, KeyError, TypeError) as e:
+        logger.warning(f"Fused planning output unusable, falling back to two-step planning: {str(e)}")
+        return None
+
+async def _request_image_generation(headers: dict, payload: dict) -> bytes:
+    """
+    POSTs an image generation request to OpenRouter and returns the image bytes.
+    """
+    client = get_http_client(OPENROUTER)
+    response = await client.post(
+        f"{_api_base()}/chat/completions",
+        headers=headers,
+        json=payload,
+        timeout=60.0 # Image generation can be slow
+    )
+    response.raise_for_status()
+    record_bytes(sent=len(response.request.content), received=len(response.content))
+    result = response.json()
+    usage = result.get("usage") or {}
+    record_usage(payload["model"], usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0), usage.get("cost"))
+        
+    # Parse response
+    # Expected format: choices[0].message.images[0].image_url.url
+    # The user said: message["images"] list
+    
+    if not result.get("choices"):
+         raise ValueError(f"No choices in response: {result}")
+         
+    message = result["choices"][0]["message"]
+    
+    # OpenRouter/Gemini specific format for images in chat
+    image_url = None
+    if message.get("images"):
+         image_url = message["images"][0]["image_url"]["url"]
+    
+    # Fallback: sometimes purely text models might return a link in content? 
+    # But we expect 'images' key based on user snippet.
+    
+    if not image_url:
+         # Debug log entire message to see what happened
+         logger.error(f"Full response message: {message}")
+         raise ValueError("No image URL found in response")
+
+    # Handle Base64 Data URL
+    if image_url.startswith("data:"):
+        # Format: data:image/png;base64,.....
+        header, encoded = image_url.split(",", 1)
+        return base64.b64decode(encoded)
+    else:
+        # It's a regular URL, download it
+        img_resp = await get_http_client(DOWNLOADS).get(image_url)
+        img_resp.raise_for_status()
+        record_bytes(received=len(img_resp.content))
+        return img_resp.content
+
+async def generate_image(
+    prompt: str,
+    original_image_url: str = None,
+    fix_white_balance: bool = False,
+    encoded_image: EncodedImage | RemoteImage = None
+) -> bytes:
     """
     Generates an image using the configured image generation model.
     Returns the raw binary content of the generated image.
     Uses direct HTTP call to OpenRouter to support specific 'modalities' param for Gemini.
+    Pass `encoded_image` to reuse a photo already prepared for this job.
     """
     try:
         api_key = settings.OPENROUTER_API_KEY
@@ -223,23 +411,19 @@ async def generate_image(prompt: str, original_image_url: str = None, fix_white_
             "X-Title": "Stage Master",
         }
         
-        # Ensure we use an explicit model name, stripping openrouter/ if present to be safe, 
-        # though OpenRouter often accepts both. The user example showed "google/gemini-..."
-        model = settings.LITELLM_GENERATION_MODEL
-        if model.startswith("openrouter/"):
-            model = model.replace("openrouter/", "")
-
         messages_content = [{"type": "text", "text": prompt}]
 
-        if original_image_url:
-             media_type, image_base64, width, height = await _fetch_and_encode_image(original_image_url)
+        if encoded_image is None and original_image_url:
+             encoded_image = await prepare_image(original_image_url)
+
+        if encoded_image is not None:
              messages_content.append(
-                 {"type": "image_url", "image_url": {"url": f"data:{media_type};base64,{image_base64}"}}
+                 {"type": "image_url", "image_url": {"url": encoded_image.model_url}}
              )
              
              # Add instruction for output resolution if we have valid dimensions
-             if width > 0 and height > 0:
-                 resolution_instruction = f"\n\nIMPORTANT: Generate the output image with the exact resolution of {width}x{height} pixels."
+             if encoded_image.width > 0 and encoded_image.height > 0:
+                 resolution_instruction = f"\n\nIMPORTANT: Generate the output image with the exact resolution of {encoded_image.width}x{encoded_image.height} pixels."
                  messages_content[0]["text"] += resolution_instruction
              
              if not fix_white_balance:
@@ -247,7 +431,6 @@ async def generate_image(prompt: str, original_image_url: str = None, fix_white_
                  messages_content[0]["text"] += wb_preservation_instruction
         
         payload = {
-            "model": model,
             "messages": [
                 {
                     "role": "user",
@@ -257,52 +440,29 @@ async def generate_image(prompt: str, original_image_url: str = None, fix_white_
             "modalities": ["image", "text"]
         }
 
-        logger.info(f"Calling OpenRouter Chat API for image generation with model: {model}")
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers=headers,
-                json=payload,
-                timeout=60.0 # Image generation can be slow
-            )
-            response.raise_for_status()
-            result = response.json()
-            
-        # Parse response
-        # Expected format: choices[0].message.images[0].image_url.url
-        # The user said: message["images"] list
-        
-        if not result.get("choices"):
-             raise ValueError(f"No choices in response: {result}")
-             
-        message = result["choices"][0]["message"]
-        
-        # OpenRouter/Gemini specific format for images in chat
-        image_url = None
-        if message.get("images"):
-             image_url = message["images"][0]["image_url"]["url"]
-        
-        # Fallback: sometimes purely text models might return a link in content? 
-        # But we expect 'images' key based on user snippet.
-        
-        if not image_url:
-             # Debug log entire message to see what happened
-             logger.error(f"Full response message: {message}")
-             raise ValueError("No image URL found in response")
+        async def request(model: str) -> bytes:
+            # Ensure we use an explicit model name, stripping openrouter/ if present to be safe, 
+            # though OpenRouter often accepts both. The user example showed "google/gemini-..."
+            if model.startswith("openrouter/"):
+                model = model.replace("openrouter/", "")
+            async def limited():
+                logger.info(f"Calling OpenRouter Chat API for image generation with model: {model}")
+                return await _request_image_generation(headers, {"model": model, **payload}), None
 
-        # Handle Base64 Data URL
-        if image_url.startswith("data:"):
-            # Format: data:image/png;base64,.....
-            header, encoded = image_url.split(",", 1)
-            return base64.b64decode(encoded)
-        else:
-            # It's a regular URL, download it
-            async with httpx.AsyncClient() as client:
-                img_resp = await client.get(image_url)
-                img_resp.raise_for_status()
-                return img_resp.content
+            return await rate_limiter.run(model, estimate_tokens(payload["messages"]), limited)
+
+        # Identical generation requests in flight on any worker share one upstream
+        # call, which the router sends to the fastest model and hedges if it lags
+        return await coalesce(
+            cache_key("image-generation", settings.LLM_BACKEND, generation_router.models, payload),
+            lambda: image_breaker.call(lambda: generation_router.call(request))
+        )
 
     except Exception as e:
+        if original_image_url and _image_rejected(encoded_image, e):
+            logger.warning(f"Image URL rejected for image generation, retrying inline: {e}")
+            return await generate_image(
+                prompt, original_image_url, fix_white_balance, encoded_image=await prepare_image(original_image_url)
+            )
         logger.error(f"Error generating image: {str(e)}")
         raise
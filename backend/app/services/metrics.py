@@ -0,0 +1,117 @@
+"""
+Prometheus metrics. The API serves them at /metrics; the worker process
+serves its own registry on WORKER_METRICS_PORT.
+
+Counters and histograms are per process. Queue, worker and DB pool gauges
+are read at scrape time by QueueCollector, so every process reports them.
+"""
+import logging
+from prometheus_client import Counter, Histogram, REGISTRY
+from prometheus_client.core import GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+# Steps range from sub-second cache hits to minute-long image generations
+STEP_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 45, 60, 90, 120, 180, 300)
+
+job_step_duration = Histogram(
+    "stagemaster_job_step_duration_seconds",
+    "Duration of one pipeline step of a staging job",
+    ["step", "model", "status"],
+    buckets=STEP_BUCKETS
+)
+llm_tokens = Counter(
+    "stagemaster_llm_tokens_total",
+    "Tokens reported by the model provider",
+    ["step", "model", "kind"]
+)
+llm_cost = Counter(
+    "stagemaster_llm_cost_usd_total",
+    "Provider cost of model calls in USD, where known",
+    ["step", "model"]
+)
+step_bytes = Counter(
+    "stagemaster_job_step_bytes_total",
+    "Bytes sent to and received from providers and storage per step",
+    ["step", "direction"]
+)
+http_request_duration = Histogram(
+    "stagemaster_http_request_duration_seconds",
+    "API request latency by route template",
+    ["method", "route", "status"]
+)
+cache_requests = Counter(
+    "stagemaster_cache_requests_total",
+    "Cache lookups by cache and result (hit/miss)",
+    ["cache", "result"]
+)
+db_pool_checkout_wait = Histogram(
+    "stagemaster_db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the SQLAlchemy pool",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+storage_bytes = Counter(
+    "stagemaster_storage_bytes_total",
+    "Bytes written to and read from object storage",
+    ["bucket", "direction"]
+)
+worker_jobs = Counter(
+    "stagemaster_worker_jobs_total",
+    "RQ jobs finished by this worker process",
+    ["queue", "status"]
+)
+
+
+class QueueCollector:
+    """
+    Scrape-time gauges for the RQ queues, the asyncio workers' heartbeats and
+    the DB connection pool of this process.
+    """
+    def describe(self):
+        # Keeps registration from calling collect() (and Redis) at import time
+        return []
+
+    def collect(self):
+        from rq.job import Job as RQJob
+        from rq.registry import StartedJobRegistry, ScheduledJobRegistry
+        from rq.utils import utcnow
+        from app.services.worker import redis_conn, job_queue, low_priority_queue
+        from app.services.async_worker import WORKER_KEY_PREFIX
+        from app.models.base import engine
+
+        depth = GaugeMetricFamily("stagemaster_queue_depth", "Jobs waiting in the queue", labels=["queue"])
+        oldest = GaugeMetricFamily(
+            "stagemaster_queue_oldest_job_age_seconds", "Age of the job at the head of the queue", labels=["queue"]
+        )
+        started = GaugeMetricFamily("stagemaster_queue_started_jobs", "Jobs currently being worked on", labels=["queue"])
+        scheduled = GaugeMetricFamily("stagemaster_queue_scheduled_jobs", "Jobs scheduled for later (retries)", labels=["queue"])
+        active = GaugeMetricFamily("stagemaster_worker_active_jobs", "Jobs in flight per worker", labels=["worker"])
+        concurrency = GaugeMetricFamily("stagemaster_worker_concurrency", "Job slots per worker", labels=["worker"])
+        try:
+            for queue in (job_queue, low_priority_queue):
+                depth.add_metric([queue.name], queue.count)
+                head = queue.get_job_ids(0, 0)
+                job = RQJob.fetch(head[0], connection=redis_conn) if head else None
+                age = (utcnow() - job.enqueued_at).total_seconds() if job and job.enqueued_at else 0.0
+                oldest.add_metric([queue.name], age)
+                started.add_metric([queue.name], StartedJobRegistry(queue=queue).count)
+                scheduled.add_metric([queue.name], ScheduledJobRegistry(queue=queue).count)
+
+            for key in redis_conn.scan_iter(f"{WORKER_KEY_PREFIX}*"):
+                heartbeat = redis_conn.hgetall(key)
+                name = heartbeat.get(b"name", b"").decode("utf-8")
+                active.add_metric([name], float(heartbeat.get(b"active_jobs", 0)))
+                concurrency.add_metric([name], float(heartbeat.get(b"concurrency", 0)))
+        except Exception as e:
+            logger.error(f"Failed to collect queue metrics: {e}")
+        yield from (depth, oldest, started, scheduled, active, concurrency)
+
+        pool = engine.sync_engine.pool
+        checked_out = GaugeMetricFamily("stagemaster_db_pool_checked_out", "DB connections in use in this process")
+        checked_out.add_metric([], pool.checkedout())
+        size = GaugeMetricFamily("stagemaster_db_pool_size", "DB pool size of this process")
+        size.add_metric([], pool.size())
+        yield from (checked_out, size)
+
+
+REGISTRY.register(QueueCollector())
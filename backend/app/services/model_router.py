@@ -0,0 +1,147 @@
+"""
+Latency-aware routing with hedged requests for slow upstream model calls.
+
+Each configured model keeps an EWMA of its latency and error rate plus a
+window of recent latencies. Calls go to the best-scoring model; if it has not
+answered by the chosen latency percentile, a hedged duplicate is sent to the
+next model (or the same one again) and the first success wins. A budget caps
+hedges to a fraction of all calls so a slow provider cannot double our load.
+"""
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Below this many samples the percentile is not trusted yet
+MIN_SAMPLES = 20
+
+
+class ModelStats:
+    def __init__(self, window: int):
+        self.ewma_latency = None
+        self.error_rate = 0.0
+        self.latencies = deque(maxlen=window)
+
+    def record_success(self, latency: float, alpha: float):
+        self.latencies.append(latency)
+        if self.ewma_latency is None:
+            self.ewma_latency = latency
+        else:
+            self.ewma_latency = alpha * latency + (1 - alpha) * self.ewma_latency
+        self.error_rate = (1 - alpha) * self.error_rate
+
+    def record_error(self, alpha: float):
+        self.error_rate = alpha + (1 - alpha) * self.error_rate
+
+    def percentile(self, q: float):
+        if len(self.latencies) < MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def score(self) -> float:
+        # Unmeasured models score 0 so each one gets tried early on
+        latency = self.ewma_latency or 0.0
+        return latency * (1 + 4 * self.error_rate) + 60 * self.error_rate
+
+
+class ModelRouter:
+    """
+    In-process router over `models`. Stats are per worker process, which is
+    enough to steer away from stragglers without a shared store.
+    """
+    def __init__(self, models: list[str]):
+        self.models = models
+        self._stats = {model: ModelStats(settings.ROUTER_LATENCY_WINDOW) for model in models}
+        self._calls = 0
+        self._hedges = 0
+
+    def ranked(self) -> list[str]:
+        return sorted(self.models, key=lambda model: self._stats[model].score())
+
+    def hedge_delay(self, model: str) -> float:
+        observed = self._stats[model].percentile(settings.HEDGE_PERCENTILE)
+        if observed is None:
+            return settings.HEDGE_INITIAL_DELAY_SECONDS
+        return max(observed, settings.HEDGE_MIN_DELAY_SECONDS)
+
+    def _take_hedge(self) -> bool:
+        if not settings.HEDGE_ENABLED or self._hedges + 1 > settings.HEDGE_BUDGET_RATIO * self._calls:
+            return False
+        self._hedges += 1
+        return True
+
+    async def _timed(self, model: str, fn: Callable[[str], Awaitable]):
+        started = time.monotonic()
+        try:
+            result = await fn(model)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._stats[model].record_error(settings.ROUTER_EWMA_ALPHA)
+            raise
+        self._stats[model].record_success(time.monotonic() - started, settings.ROUTER_EWMA_ALPHA)
+        return result
+
+    async def call(self, fn: Callable[[str], Awaitable]):
+        """
+        Runs `fn(model)` on the best model, hedging onto the next one if it
+        is slow (or failing over once if it errors). Returns the first success
+        and cancels the other request.
+        """
+        self._calls += 1
+        ranked = self.ranked()
+        primary, backup = ranked[0], ranked[1] if len(ranked) > 1 else ranked[0]
+
+        tasks = {asyncio.create_task(self._timed(primary, fn))}
+        extra_sent = False
+        error = None
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay(primary))
+            if not done and self._take_hedge():
+                logger.info(f"Hedging slow request to {primary} with {backup}")
+                tasks.add(asyncio.create_task(self._timed(backup, fn)))
+                extra_sent = True
+
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    error = task.exception() or error
+                winner = next((task for task in done if task.exception() is None), None)
+                if winner is not None:
+                    return winner.result()
+                if not tasks and not extra_sent and backup != primary:
+                    logger.warning(f"Request to {primary} failed, failing over to {backup}: {error}")
+                    tasks.add(asyncio.create_task(self._timed(backup, fn)))
+                    extra_sent = True
+            raise error
+        finally:
+            # Cancel the losing request
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "hedged_calls": self._hedges,
+            "total_calls": self._calls,
+            "models": {
+                model: {
+                    "ewma_latency_seconds": stats.ewma_latency,
+                    "error_rate": stats.error_rate,
+                    "hedge_delay_seconds": self.hedge_delay(model),
+                }
+                for model, stats in self._stats.items()
+            },
+        }
+
+
+def generation_models() -> list[str]:
+    configured = [m.strip() for m in settings.LITELLM_GENERATION_MODELS.split(",") if m.strip()]
+    return configured or [settings.LITELLM_GENERATION_MODEL]
+
+
+generation_router = ModelRouter(generation_models())
@@ -0,0 +1,107 @@
+import json
+import time
+import logging
+from datetime import datetime, timezone
+from app.core.config import settings
+from app.services.redis_client import get_async_redis
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "job-progress:"
+SNAPSHOT_PREFIX = "job-progress:last:"
+TERMINAL_STATUSES = ("completed", "error")
+
+
+def _channel(job_id: str) -> str:
+    return f"{CHANNEL_PREFIX}{job_id}"
+
+
+def _snapshot_key(job_id: str) -> str:
+    return f"{SNAPSHOT_PREFIX}{job_id}"
+
+
+def _epoch(moment: datetime):
+    return moment.replace(tzinfo=timezone.utc).timestamp() if moment else None
+
+
+async def publish_progress(
+    job_id: str,
+    status: str,
+    progress_percent: float,
+    current_step: str = None,
+    result_url: str = None,
+    error_message: str = None,
+    queued_at: datetime = None,
+    started_at: datetime = None
+):
+    """
+    Publishes a job progress event and keeps it as the latest snapshot, so
+    subscribers that connect mid-job still get the current state.
+    `queued_at`/`started_at` (the job's naive UTC created_at and started_at)
+    let late subscribers time the queue wait without seeing every event.
+    Failures are logged and never break the job itself.
+    """
+    event = {
+        "job_id": str(job_id),
+        "status": status,
+        "progress_percent": progress_percent,
+        "current_step": current_step,
+        "result_url": result_url,
+        "error_message": error_message,
+        "timestamp": time.time(),
+        "queued_at": _epoch(queued_at),
+        "started_at": _epoch(started_at),
+    }
+    payload = json.dumps(event)
+    try:
+        redis = get_async_redis()
+        async with redis.pipeline(transaction=False) as pipeline:
+            pipeline.set(_snapshot_key(job_id), payload, ex=settings.PROGRESS_SNAPSHOT_TTL_SECONDS)
+            pipeline.publish(_channel(job_id), payload)
+            await pipeline.execute()
+    except Exception as e:
+        logger.error(f"Failed to publish progress for job {job_id}: {e}")
+
+
+async def get_progress_snapshot(job_id: str):
+    """
+    Returns the latest progress event for a job, or None if none is cached.
+    """
+    payload = await get_async_redis().get(_snapshot_key(job_id))
+    return json.loads(payload) if payload else None
+
+
+async def stream_progress(job_id: str, keepalive_seconds: float = None):
+    """
+    Async generator of progress events for a job: the current snapshot first,
+    then live updates until the job reaches a terminal status.
+    Yields None every `keepalive_seconds` without updates so transports can ping.
+    """
+    if keepalive_seconds is None:
+        keepalive_seconds = settings.PROGRESS_KEEPALIVE_SECONDS
+
+    redis = get_async_redis()
+    pubsub = redis.pubsub()
+    # Subscribe before reading the snapshot so no event falls in between
+    await pubsub.subscribe(_channel(job_id))
+    try:
+        snapshot = await get_progress_snapshot(job_id)
+        if snapshot:
+            yield snapshot
+            if snapshot["status"] in TERMINAL_STATUSES:
+                return
+
+        while True:
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True, timeout=keepalive_seconds
+            )
+            if message is None:
+                yield None
+                continue
+            event = json.loads(message["data"])
+            yield event
+            if event["status"] in TERMINAL_STATUSES:
+                return
+    finally:
+        await pubsub.unsubscribe(_channel(job_id))
+        await pubsub.aclose()
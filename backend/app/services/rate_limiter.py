@@ -0,0 +1,225 @@
+"""
+Distributed rate limiter for OpenRouter calls, shared by all workers via Redis.
+
+Per model there is a requests/min and a tokens/min token bucket, plus an
+adaptive concurrency limit (AIMD): every success raises the limit by
+1/limit, a 429 halves it and blocks the model for its Retry-After. Leases on
+in-flight slots expire, so a crashed worker cannot leak capacity.
+"""
+import json
+import uuid
+import asyncio
+import logging
+from typing import Awaitable, Callable
+import httpx
+from app.core.config import settings
+from app.services.redis_client import get_async_redis
+from app.services.singleflight import error_types
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ratelimit:"
+
+# Rough token cost of one attached image; image bytes are not counted as text
+IMAGE_TOKEN_ESTIMATE = 1500
+
+_ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local rpm, tpm = tonumber(ARGV[1]), tonumber(ARGV[2])
+
+local blocked = tonumber(redis.call('GET', KEYS[5]) or '0')
+if blocked > now then return {0, tostring(blocked - now)} end
+
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', now)
+local limit = tonumber(redis.call('GET', KEYS[4]) or ARGV[5])
+if redis.call('ZCARD', KEYS[3]) >= math.floor(limit) then return {0, '0.25'} end
+
+local function level(key, capacity)
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    return math.min(capacity, tokens + (now - ts) * capacity / 60)
+end
+local requests = level(KEYS[1], rpm)
+if requests < 1 then return {0, tostring((1 - requests) * 60 / rpm)} end
+local need = math.min(tonumber(ARGV[3]), tpm)
+local tokens = level(KEYS[2], tpm)
+if tokens < need then return {0, tostring((need - tokens) * 60 / tpm)} end
+
+redis.call('HSET', KEYS[1], 'tokens', requests - 1, 'ts', now)
+redis.call('HSET', KEYS[2], 'tokens', tokens - need, 'ts', now)
+redis.call('EXPIRE', KEYS[1], 120)
+redis.call('EXPIRE', KEYS[2], 120)
+redis.call('ZADD', KEYS[3], now + tonumber(ARGV[6]), ARGV[4])
+redis.call('EXPIRE', KEYS[3], math.ceil(tonumber(ARGV[6])) + 60)
+return {1, '0'}
+"""
+
+_RELEASE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+redis.call('ZREM', KEYS[1], ARGV[1])
+local limit = tonumber(redis.call('GET', KEYS[2]) or ARGV[5])
+
+if ARGV[2] == 'throttled' then
+    local retry_after = tonumber(ARGV[3])
+    local blocked = tonumber(redis.call('GET', KEYS[3]) or '0')
+    -- Concurrent 429s from one overload only back off once
+    if blocked <= now then
+        limit = math.max(tonumber(ARGV[4]), limit * tonumber(ARGV[7]))
+    end
+    if now + retry_after > blocked then
+        redis.call('SET', KEYS[3], tostring(now + retry_after), 'EX', math.ceil(retry_after) + 1)
+    end
+elseif ARGV[2] == 'ok' then
+    limit = math.min(tonumber(ARGV[6]), limit + 1 / limit)
+end
+redis.call('SET', KEYS[2], tostring(limit))
+
+local adjust = tonumber(ARGV[8])
+if adjust ~= 0 and redis.call('EXISTS', KEYS[4]) == 1 then
+    redis.call('HINCRBYFLOAT', KEYS[4], 'tokens', -adjust)
+end
+return tostring(limit)
+"""
+
+
+class RateLimited(Exception):
+    """
+    Raised when a model stays throttled past RATE_LIMIT_MAX_WAIT_SECONDS.
+    """
+    pass
+
+
+def estimate_tokens(messages: list, max_tokens: int = None) -> int:
+    """
+    Cheap prompt+completion token estimate (~4 characters per token).
+    """
+    chars, images = 0, 0
+    for message in messages:
+        content = message.get("content")
+        parts = content if isinstance(content, list) else [{"type": "text", "text": content or ""}]
+        for part in parts:
+            if part.get("type") == "image_url":
+                images += 1
+            else:
+                chars += len(json.dumps(part.get("text", "")))
+    return chars // 4 + images * IMAGE_TOKEN_ESTIMATE + (max_tokens or settings.RATE_LIMIT_COMPLETION_TOKEN_ESTIMATE)
+
+
+def _throttle_info(error: Exception):
+    """
+    Returns the Retry-After seconds if `error` is a 429 from the provider, else None.
+    """
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+    if status != 429 and "RateLimitError" not in error_types(error):
+        return None
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return max(float(headers.get("retry-after", "")), 0.0)
+    except (TypeError, ValueError):
+        return settings.RATE_LIMIT_DEFAULT_RETRY_AFTER_SECONDS
+
+
+class RateLimiter:
+    def _keys(self, model: str) -> dict:
+        # litellm and direct OpenRouter calls name the same model differently
+        base = f"{KEY_PREFIX}{model.removeprefix('openrouter/')}"
+        return {
+            "rpm": f"{base}:rpm",
+            "tpm": f"{base}:tpm",
+            "leases": f"{base}:leases",
+            "limit": f"{base}:limit",
+            "blocked": f"{base}:blocked",
+        }
+
+    async def _acquire(self, redis, model: str, tokens: int) -> str:
+        keys = self._keys(model)
+        lease = uuid.uuid4().hex
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.RATE_LIMIT_MAX_WAIT_SECONDS
+        while True:
+            granted, wait = await redis.eval(
+                _ACQUIRE_SCRIPT, 5,
+                keys["rpm"], keys["tpm"], keys["leases"], keys["limit"], keys["blocked"],
+                settings.RATE_LIMIT_REQUESTS_PER_MINUTE,
+                settings.RATE_LIMIT_TOKENS_PER_MINUTE,
+                tokens,
+                lease,
+                settings.RATE_LIMIT_INITIAL_CONCURRENCY,
+                settings.RATE_LIMIT_LEASE_SECONDS
+            )
+            if granted:
+                return lease
+            wait = float(wait)
+            if loop.time() + wait > deadline:
+                raise RateLimited(f"{model} is rate limited; gave up after {settings.RATE_LIMIT_MAX_WAIT_SECONDS}s")
+            await asyncio.sleep(wait)
+
+    async def _release(self, redis, model: str, lease: str, outcome: str, retry_after: float = 0.0, token_adjust: int = 0):
+        keys = self._keys(model)
+        limit = await redis.eval(
+            _RELEASE_SCRIPT, 4,
+            keys["leases"], keys["limit"], keys["blocked"], keys["tpm"],
+            lease,
+            outcome,
+            retry_after,
+            settings.RATE_LIMIT_MIN_CONCURRENCY,
+            settings.RATE_LIMIT_INITIAL_CONCURRENCY,
+            settings.RATE_LIMIT_MAX_CONCURRENCY,
+            settings.RATE_LIMIT_BACKOFF_FACTOR,
+            token_adjust
+        )
+        if outcome == "throttled":
+            logger.warning(f"{model} returned 429; concurrency limit now {float(limit):.1f}, blocked for {retry_after:.1f}s")
+
+    async def run(self, model: str, tokens: int, fn: Callable[[], Awaitable]):
+        """
+        Calls `fn` once a slot and bucket capacity for `model` are free and
+        returns its value. `fn` returns (value, used_tokens or None); reported
+        usage corrects the `tokens` estimate taken from the tokens/min bucket.
+        A 429 shrinks the limit and the call is retried after Retry-After,
+        up to RATE_LIMIT_MAX_RETRIES times.
+        Falls back to calling `fn` directly if Redis is unavailable.
+        """
+        if not settings.RATE_LIMIT_ENABLED:
+            return (await fn())[0]
+
+        attempt = 0
+        while True:
+            try:
+                redis = get_async_redis()
+                lease = await self._acquire(redis, model, tokens)
+            except RateLimited:
+                raise
+            except Exception as e:
+                logger.error(f"Rate limiter unavailable for {model}, calling directly: {e}")
+                return (await fn())[0]
+
+            outcome, retry_after, token_adjust = "error", 0.0, 0
+            try:
+                value, used_tokens = await fn()
+                outcome = "ok"
+                if used_tokens:
+                    token_adjust = used_tokens - tokens
+                return value
+            except Exception as e:
+                retry_after = _throttle_info(e)
+                if retry_after is None:
+                    raise
+                outcome = "throttled"
+                attempt += 1
+                if attempt > settings.RATE_LIMIT_MAX_RETRIES:
+                    raise
+            finally:
+                try:
+                    await self._release(redis, model, lease, outcome, retry_after or 0.0, token_adjust)
+                except Exception as e:
+                    logger.error(f"Failed to release rate limit lease for {model}: {e}")
+
+
+rate_limiter = RateLimiter()
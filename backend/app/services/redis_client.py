@@ -0,0 +1,24 @@
+import asyncio
+from redis import asyncio as aioredis
+from app.core.config import settings
+
+# redis.asyncio connections are bound to the event loop that opened them, and
+# RQ work-horses start a fresh loop per job, so keep one client per loop.
+_clients: dict = {}
+
+
+def get_async_redis() -> aioredis.Redis:
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        for stale_loop in [l for l in _clients if l.is_closed()]:
+            _clients.pop(stale_loop)
+        client = aioredis.Redis.from_url(settings.REDIS_URL)
+        _clients[loop] = client
+    return client
+
+
+async def close_async_redis():
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
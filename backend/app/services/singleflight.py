@@ -0,0 +1,211 @@
+"""
+Cross-worker request coalescing ("singleflight").
+
+The first caller for a key takes a Redis lock and runs the upstream call;
+concurrent callers with the same key wait on a pub/sub channel for its
+result instead of making their own call. Results are only shared between
+callers overlapping the same flight, never reused afterwards.
+"""
+import json
+import uuid
+import asyncio
+import logging
+from typing import Awaitable, Callable, Union
+import httpx
+from app.core.config import settings
+from app.services.redis_client import get_async_redis
+
+logger = logging.getLogger(__name__)
+
+LOCK_PREFIX = "singleflight:lock:"
+RESULT_PREFIX = "singleflight:result:"
+
+# One-byte tags on stored payloads
+_TEXT, _BYTES, _NONE, _ERROR = b"s", b"b", b"n", b"e"
+
+# Deletes the lock only while it still holds this leader's token; an expired
+# lock may already belong to another leader
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class SingleflightError(Exception):
+    """
+    Raised in waiting callers when the call they were coalesced onto failed.
+    Mirrors the leader's error so callers classify it the same way: see
+    error_types(), and `status_code`, `response` (status, Retry-After and
+    body) and `retry_after` where the original had them.
+    """
+    def __init__(self, message: str, types: tuple = (), status_code: int = None,
+                 headers: dict = None, body: str = "", retry_after: float = None):
+        super().__init__(message)
+        self.types = tuple(types)
+        self.status_code = status_code
+        self.response = httpx.Response(status_code, headers=headers or {}, text=body) if status_code else None
+        self.retry_after = retry_after
+
+
+def error_types(error: Exception) -> tuple:
+    """
+    Class names in the hierarchy of `error`, or of the leader's error that a
+    SingleflightError stands in for.
+    """
+    if isinstance(error, SingleflightError) and error.types:
+        return error.types
+    return tuple(cls.__name__ for cls in type(error).__mro__)
+
+
+def _encode_error(error: Exception) -> bytes:
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None)
+    if not isinstance(status, int):
+        status = getattr(response, "status_code", None)
+    try:
+        body = response.text[:4096] if response is not None else ""
+    except Exception:
+        # Streamed responses that were never read
+        body = ""
+    retry_after = (getattr(response, "headers", None) or {}).get("retry-after")
+    return _ERROR + json.dumps({
+        "message": str(error),
+        "types": error_types(error),
+        "status_code": status if isinstance(status, int) else None,
+        "headers": {"retry-after": retry_after} if retry_after is not None else {},
+        "body": body if isinstance(body, str) else "",
+        "retry_after": getattr(error, "retry_after", None),
+    }).encode("utf-8")
+
+
+def _decode_error(body: bytes) -> SingleflightError:
+    try:
+        fields = json.loads(body)
+    except ValueError:
+        return SingleflightError(body.decode("utf-8", "replace"))
+    return SingleflightError(**fields)
+
+
+def _encode(value: Union[str, bytes, None]) -> bytes:
+    if value is None:
+        return _NONE
+    if isinstance(value, bytes):
+        return _BYTES + value
+    return _TEXT + value.encode("utf-8")
+
+
+def _decode(payload: bytes):
+    tag, body = payload[:1], payload[1:]
+    if tag == _ERROR:
+        raise _decode_error(body)
+    if tag == _BYTES:
+        return body
+    if tag == _NONE:
+        return None
+    return body.decode("utf-8")
+
+
+async def _release(redis, key: str, token: str, payload: bytes = None):
+    """
+    Publishes the flight's result (if any) and releases its lock.
+    """
+    result_key = f"{RESULT_PREFIX}{key}:{token}"
+    try:
+        async with redis.pipeline(transaction=True) as pipeline:
+            if payload is not None:
+                pipeline.set(result_key, payload, ex=settings.SINGLEFLIGHT_RESULT_TTL_SECONDS)
+                pipeline.publish(result_key, payload)
+            pipeline.eval(_RELEASE_SCRIPT, 1, f"{LOCK_PREFIX}{key}", token)
+            await pipeline.execute()
+    except Exception as e:
+        logger.error(f"Failed to release singleflight {key[:12]}: {e}")
+
+
+async def _lead(redis, key: str, token: str, fn):
+    # A cancelled leader publishes nothing but still frees the lock, so a
+    # waiting caller takes over instead of blocking until the lock expires
+    payload = None
+    try:
+        value = await fn()
+        payload = _encode(value)
+        return value
+    except Exception as e:
+        payload = _encode_error(e)
+        raise
+    finally:
+        await _release(redis, key, token, payload)
+
+
+async def _follow(redis, key: str, token: str, deadline: float):
+    """
+    Waits for the flight identified by `token`. Returns (True, value) once it
+    finishes, or (False, None) if the leader vanished or the wait timed out.
+    """
+    loop = asyncio.get_running_loop()
+    result_key = f"{RESULT_PREFIX}{key}:{token}"
+    pubsub = redis.pubsub()
+    await pubsub.subscribe(result_key)
+    try:
+        while loop.time() < deadline:
+            # Covers results published before we subscribed
+            payload = await redis.get(result_key)
+            if payload is None:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                payload = message["data"] if message else None
+            if payload is not None:
+                return True, _decode(payload)
+            if await redis.get(f"{LOCK_PREFIX}{key}") != token.encode():
+                # The leader crashed or its lock expired without a result
+                payload = await redis.get(result_key)
+                return (True, _decode(payload)) if payload is not None else (False, None)
+        return False, None
+    finally:
+        await pubsub.unsubscribe(result_key)
+        await pubsub.aclose()
+
+
+async def coalesce(key: str, fn: Callable[[], Awaitable[Union[str, bytes, None]]]):
+    """
+    Runs `fn` once across all workers for concurrent callers sharing `key`
+    (a canonical request hash) and returns its str/bytes/None result to each.
+    Falls back to calling `fn` directly if coalescing is disabled, Redis is
+    unavailable, or waiting exceeds SINGLEFLIGHT_LOCK_TTL_SECONDS.
+    """
+    if not settings.SINGLEFLIGHT_ENABLED:
+        return await fn()
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.SINGLEFLIGHT_LOCK_TTL_SECONDS
+    lock_key = f"{LOCK_PREFIX}{key}"
+
+    while loop.time() < deadline:
+        try:
+            redis = get_async_redis()
+            token = uuid.uuid4().hex
+            acquired = await redis.set(lock_key, token, nx=True, ex=settings.SINGLEFLIGHT_LOCK_TTL_SECONDS)
+            leader_token = None if acquired else await redis.get(lock_key)
+        except Exception as e:
+            logger.error(f"Singleflight unavailable for {key[:12]}, calling directly: {e}")
+            return await fn()
+
+        if acquired:
+            return await _lead(redis, key, token, fn)
+        if leader_token is None:
+            # Lock released between SET NX and GET; try to take it
+            continue
+
+        logger.info(f"Coalescing onto in-flight request {key[:12]}")
+        try:
+            done, value = await _follow(redis, key, leader_token.decode(), deadline)
+        except SingleflightError:
+            raise
+        except Exception as e:
+            logger.error(f"Singleflight wait failed for {key[:12]}, calling directly: {e}")
+            return await fn()
+        if done:
+            return value
+
+    logger.warning(f"Timed out waiting on in-flight request {key[:12]}, calling directly")
+    return await fn()
@@ -1,15 +1,73 @@
 import io
 import json
+import asyncio
+import hashlib
+import functools
+import urllib3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import BinaryIO, Optional
 from minio import Minio
+from minio.datatypes import PostPolicy
+from minio.error import S3Error
 from app.core.config import settings
+from app.services.metrics import storage_bytes
+from app.services.tracing import span
+
+
+class UploadTooLargeError(Exception):
+    pass
+
+
+class _HashingReader:
+    """
+    File-like wrapper that hashes and counts bytes as Minio reads them,
+    aborting once more than `max_bytes` have been read.
+    """
+    def __init__(self, stream: BinaryIO, max_bytes: int):
+        self.stream = stream
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self.stream.read(size)
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadTooLargeError(f"Upload exceeds the {self.max_bytes} byte limit")
+        self.sha256.update(chunk)
+        return chunk
+
 
 class StorageService:
+    """
+    MinIO access for the API and worker. The Minio client is synchronous, so the
+    async methods run it on a bounded thread pool sized to match the urllib3
+    connection pool, letting storage I/O overlap with other coroutines.
+    """
     def __init__(self):
         self.client = Minio(
             settings.STORAGE_ENDPOINT,
             access_key=settings.STORAGE_ACCESS_KEY,
             secret_key=settings.STORAGE_SECRET_KEY,
-            secure=settings.STORAGE_USE_SSL
+            secure=settings.STORAGE_USE_SSL,
+            http_client=urllib3.PoolManager(
+                maxsize=settings.STORAGE_POOL_MAXSIZE,
+                timeout=urllib3.Timeout(connect=5.0, read=settings.STORAGE_READ_TIMEOUT_SECONDS),
+                retries=urllib3.Retry(total=3, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504])
+            )
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.STORAGE_MAX_WORKERS, thread_name_prefix="storage"
+        )
+        # Presigned URLs are signed for the host clients will use. Passing the
+        # region keeps the client from looking it up over the network.
+        self.public_client = Minio(
+            settings.STORAGE_PUBLIC_ENDPOINT,
+            access_key=settings.STORAGE_ACCESS_KEY,
+            secret_key=settings.STORAGE_SECRET_KEY,
+            secure=settings.STORAGE_PUBLIC_USE_SSL,
+            region=settings.STORAGE_REGION
         )
         self._ensure_buckets()
 
@@ -20,6 +78,8 @@ class StorageService:
             settings.BUCKET_THUMBNAILS
         ]
         public_buckets = [settings.BUCKET_RESULTS, settings.BUCKET_THUMBNAILS, settings.BUCKET_UPLOADS]
+        if not settings.STORAGE_PUBLIC_READ:
+            public_buckets = []
         
         for bucket in buckets:
             if not self.client.bucket_exists(bucket):
@@ -38,23 +98,147 @@ class StorageService:
                     ]
                 }
                 self.client.set_bucket_policy(bucket, json.dumps(policy))
+            else:
+                # Revoke anonymous reads granted while STORAGE_PUBLIC_READ was on
+                try:
+                    self.client.delete_bucket_policy(bucket)
+                except S3Error as e:
+                    if e.code != "NoSuchBucketPolicy":
+                        raise
+
+    async def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        bucket = args[0] if args and isinstance(args[0], str) else None
+        with span(f"minio {getattr(fn, '__name__', 'call')}", **{"minio.bucket": bucket}):
+            return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
 
-    async def upload_file(self, bucket: str, object_name: str, data: bytes, content_type: str):
+    async def upload_file(self, bucket: str, object_name: str, data: bytes, content_type: str, metadata: dict = None):
         data_stream = io.BytesIO(data)
-        self.client.put_object(
+        await self._run(
+            self.client.put_object,
             bucket,
             object_name,
             data_stream,
             length=len(data),
-            content_type=content_type
+            content_type=content_type,
+            metadata=metadata
         )
+        storage_bytes.labels(bucket, "write").inc(len(data))
         return self.get_url(bucket, object_name)
 
+    def _put_stream(self, bucket: str, object_name: str, reader: _HashingReader, content_type: str):
+        self.client.put_object(
+            bucket,
+            object_name,
+            reader,
+            length=-1,
+            content_type=content_type,
+            part_size=settings.UPLOAD_PART_SIZE,
+            num_parallel_uploads=settings.UPLOAD_PARALLEL_PARTS
+        )
+
+    async def upload_stream(
+        self,
+        bucket: str,
+        object_name: str,
+        stream: BinaryIO,
+        content_type: str,
+        max_bytes: int = None
+    ) -> tuple[str, int, str]:
+        """
+        Streams a file-like object to storage as a multipart upload in a worker
+        thread, holding at most a few parts in memory.
+        Returns (url, size, sha256 hex digest).
+        Raises UploadTooLargeError (and aborts the upload) past `max_bytes`.
+        """
+        reader = _HashingReader(stream, max_bytes or settings.UPLOAD_MAX_BYTES)
+        await self._run(self._put_stream, bucket, object_name, reader, content_type)
+        storage_bytes.labels(bucket, "write").inc(reader.size)
+        return self.get_url(bucket, object_name), reader.size, reader.sha256.hexdigest()
+
     def get_url(self, bucket: str, object_name: str):
         # For local development with MinIO in Docker, we might need to handle external vs internal URLs
         # For now, returning a direct URL. In production, this would be a signed URL or CDN URL.
         return f"http://{settings.STORAGE_PUBLIC_ENDPOINT}/{bucket}/{object_name}"
 
+    def split_url(self, url: str) -> Optional[tuple[str, str]]:
+        """
+        Returns (bucket, object_name) for URLs pointing at our storage, else None.
+        """
+        for endpoint in (settings.STORAGE_ENDPOINT, settings.STORAGE_PUBLIC_ENDPOINT):
+            for scheme in ("http", "https"):
+                prefix = f"{scheme}://{endpoint}/"
+                if url.startswith(prefix):
+                    path_parts = url[len(prefix):].split("?", 1)[0].split("/", 1)
+                    if len(path_parts) == 2:
+                        return path_parts[0], path_parts[1]
+        return None
+
+    def presigned_post_form(self, bucket: str, object_name: str, content_type: str, max_bytes: int = None, expires_seconds: int = None) -> tuple[str, dict]:
+        """
+        Short-lived form upload a client can POST the object bytes with.
+        Unlike a presigned PUT, storage itself rejects bodies over `max_bytes`.
+        Returns (url, form fields); the file goes in a last "file" field.
+        """
+        expires = timedelta(seconds=expires_seconds or settings.STORAGE_PRESIGN_EXPIRY_SECONDS)
+        policy = PostPolicy(bucket, datetime.utcnow() + expires)
+        policy.add_equals_condition("key", object_name)
+        policy.add_equals_condition("Content-Type", content_type)
+        policy.add_content_length_range_condition(1, max_bytes or settings.UPLOAD_MAX_BYTES)
+        fields = self.public_client.presigned_post_policy(policy)
+        fields.update({"key": object_name, "Content-Type": content_type})
+        scheme = "https" if settings.STORAGE_PUBLIC_USE_SSL else "http"
+        return f"{scheme}://{settings.STORAGE_PUBLIC_ENDPOINT}/{bucket}", fields
+
+    def presigned_get_url(self, bucket: str, object_name: str, expires_seconds: int = None, request_date: datetime = None) -> str:
+        """
+        Short-lived download URL, usable even when the bucket is not public.
+        A fixed `request_date` makes the signature (and so the URL) repeatable.
+        """
+        expires = timedelta(seconds=expires_seconds or settings.STORAGE_PRESIGN_EXPIRY_SECONDS)
+        return self.public_client.presigned_get_object(bucket, object_name, expires=expires, request_date=request_date)
+
+    def _stat_object(self, bucket: str, object_name: str):
+        try:
+            return self.client.stat_object(bucket, object_name)
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchObject", "NoSuchBucket"):
+                return None
+            raise
+
+    async def stat_object(self, bucket: str, object_name: str):
+        """
+        Returns the object's metadata, or None if it does not exist.
+        """
+        return await self._run(self._stat_object, bucket, object_name)
+
+    async def remove_object(self, bucket: str, object_name: str):
+        await self._run(self.client.remove_object, bucket, object_name)
+
+    async def read_object(self, bucket: str, object_name: str) -> bytes:
+        """
+        Non-blocking variant of get_object_data.
+        """
+        return await self._run(self.get_object_data, bucket, object_name)
+
+    async def read_object_head(self, bucket: str, object_name: str, length: int) -> bytes:
+        """
+        Reads only the first `length` bytes of an object (e.g. an image header).
+        """
+        return await self._run(self._get_object_range, bucket, object_name, length)
+
+    def _get_object_range(self, bucket: str, object_name: str, length: int) -> bytes:
+        response = None
+        try:
+            response = self.client.get_object(bucket, object_name, offset=0, length=length)
+            data = response.read()
+            storage_bytes.labels(bucket, "read").inc(len(data))
+            return data
+        finally:
+            if response:
+                response.close()
+                response.release_conn()
+
     def get_object_data(self, bucket: str, object_name: str) -> bytes:
         """
         Retrieves object data from MinIO.
@@ -62,7 +246,9 @@ class StorageService:
         response = None
         try:
             response = self.client.get_object(bucket, object_name)
-            return response.read()
+            data = b"".join(response.stream(settings.STORAGE_READ_CHUNK_SIZE))
+            storage_bytes.labels(bucket, "read").inc(len(data))
+            return data
         finally:
             if response:
                 response.close()
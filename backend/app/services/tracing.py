@@ -0,0 +1,119 @@
+"""
+Optional OpenTelemetry tracing across the API, the RQ queue and the worker.
+
+Enabled by TRACING_EXPORTER ("otlp" for a collector at
+OTEL_EXPORTER_OTLP_ENDPOINT, "file" for JSON lines in TRACING_FILE_PATH).
+FastAPI, SQLAlchemy, httpx (OpenRouter, downloads, litellm) and Redis are
+instrumented automatically; MinIO and litellm calls get spans from `span()`.
+Trace context travels from the enqueuing request to the worker in the RQ
+job's meta. Without the opentelemetry packages everything here is a no-op.
+"""
+import logging
+from contextlib import contextmanager, nullcontext
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TRACE_CONTEXT_META_KEY = "trace_context"
+
+_enabled = False
+
+
+def _build_exporter():
+    if settings.TRACING_EXPORTER == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter(endpoint=f"{settings.OTEL_EXPORTER_OTLP_ENDPOINT.rstrip('/')}/v1/traces")
+    if settings.TRACING_EXPORTER == "file":
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+        return ConsoleSpanExporter(
+            out=open(settings.TRACING_FILE_PATH, "a"),
+            formatter=lambda s: s.to_json(indent=None) + "\n"
+        )
+    raise ValueError(f"Unknown TRACING_EXPORTER: {settings.TRACING_EXPORTER}")
+
+
+def setup_tracing(service_name: str, app=None):
+    """
+    Installs the tracer provider and auto-instrumentation for this process.
+    Pass the FastAPI `app` from the API process.
+    """
+    global _enabled
+    if not settings.TRACING_EXPORTER or _enabled:
+        return
+    try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+        from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
+        from opentelemetry.instrumentation.redis import RedisInstrumentor
+    except ImportError:
+        logger.warning("TRACING_EXPORTER is set but the opentelemetry packages are missing; tracing disabled")
+        return
+
+    from app.models.base import engine
+
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    provider.add_span_processor(BatchSpanProcessor(_build_exporter()))
+    trace.set_tracer_provider(provider)
+
+    SQLAlchemyInstrumentor().instrument(engine=engine.sync_engine)
+    HTTPXClientInstrumentor().instrument()
+    RedisInstrumentor().instrument()
+    if app is not None:
+        from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+        FastAPIInstrumentor.instrument_app(app, excluded_urls="health,metrics")
+
+    _enabled = True
+    logger.info(f"Tracing enabled for {service_name} ({settings.TRACING_EXPORTER} exporter)")
+
+
+def shutdown_tracing():
+    if not _enabled:
+        return
+    from opentelemetry import trace
+    trace.get_tracer_provider().shutdown()
+
+
+def span(name: str, context=None, **attributes):
+    """
+    Context manager for a span named `name` under the current (or the given
+    parent) context; a no-op when tracing is off.
+    """
+    if not _enabled:
+        return nullcontext()
+    from opentelemetry import trace
+    return trace.get_tracer("stagemaster").start_as_current_span(
+        name, context=context, attributes={k: v for k, v in attributes.items() if v is not None}
+    )
+
+
+def inject_context() -> dict:
+    """
+    Serialised current trace context, for the meta of an RQ job.
+    """
+    if not _enabled:
+        return {}
+    from opentelemetry.propagate import inject
+    carrier: dict = {}
+    inject(carrier)
+    return carrier
+
+
+@contextmanager
+def job_span(job):
+    """
+    Span for an RQ job, continuing the trace of the request that enqueued it.
+    """
+    if not _enabled:
+        yield None
+        return
+    from opentelemetry.propagate import extract
+    parent = extract(job.meta.get(TRACE_CONTEXT_META_KEY) or {})
+    with span(f"rq.job {job.func_name}", context=parent, **{
+        "messaging.system": "rq",
+        "messaging.destination.name": job.origin,
+        "messaging.message.id": job.id,
+    }) as current:
+        yield current
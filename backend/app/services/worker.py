@@ -1,9 +1,21 @@
+from datetime import timedelta
 from redis import Redis
 from rq import Queue
 from app.core.config import settings
+from app.services.tracing import inject_context, TRACE_CONTEXT_META_KEY
 
 redis_conn = Redis.from_url(settings.REDIS_URL)
 job_queue = Queue("staging", connection=redis_conn)
+# Speculative work; workers only take from it when `staging` is empty
+low_priority_queue = Queue("staging-low", connection=redis_conn)
+
+def _job_timeout(budget_seconds: int) -> int:
+    # Past the job's own budget, so it can still mark itself failed or retrying
+    return budget_seconds + settings.JOB_TIMEOUT_GRACE_SECONDS
+
+def _trace_meta() -> dict:
+    # Lets the worker continue the trace of the request that enqueued the job
+    return {TRACE_CONTEXT_META_KEY: inject_context()}
 
 def queue_staging_job(job_id: str):
     # This will be imported in the routes to queue a job
@@ -11,7 +23,53 @@ def queue_staging_job(job_id: str):
     job = job_queue.enqueue(
         process_staging_job,
         job_id,
-        job_timeout="5m",
-        result_ttl=86400
+        job_timeout=_job_timeout(settings.JOB_TIMEOUT_SECONDS),
+        result_ttl=86400,
+        meta=_trace_meta()
+    )
+    return job
+
+def queue_staging_batch(parent_job_id: str):
+    from app.services.generation import process_staging_batch
+    job = job_queue.enqueue(
+        process_staging_batch,
+        parent_job_id,
+        job_timeout=_job_timeout(settings.BATCH_JOB_TIMEOUT_SECONDS),
+        result_ttl=86400,
+        meta=_trace_meta()
+    )
+    return job
+
+def schedule_staging_retry(job_id: str, delay_seconds: int):
+    # Picked up by the worker's scheduler once the delay has passed
+    from app.services.generation import process_staging_job
+    return job_queue.enqueue_in(
+        timedelta(seconds=delay_seconds),
+        process_staging_job,
+        job_id,
+        job_timeout=_job_timeout(settings.JOB_TIMEOUT_SECONDS),
+        result_ttl=86400,
+        meta=_trace_meta()
+    )
+
+def schedule_batch_retry(parent_job_id: str, delay_seconds: int):
+    from app.services.generation import process_staging_batch
+    return job_queue.enqueue_in(
+        timedelta(seconds=delay_seconds),
+        process_staging_batch,
+        parent_job_id,
+        job_timeout=_job_timeout(settings.BATCH_JOB_TIMEOUT_SECONDS),
+        result_ttl=86400,
+        meta=_trace_meta()
+    )
+
+def queue_speculative_analysis(image_id: str):
+    from app.services.generation import speculative_analyze_image
+    job = low_priority_queue.enqueue(
+        speculative_analyze_image,
+        image_id,
+        job_timeout="3m",
+        result_ttl=3600,
+        meta=_trace_meta()
     )
     return job
@@ -0,0 +1,283 @@
+"""
+End-to-end benchmark of the staging pipeline:
+API upload -> job creation -> RQ queue -> worker -> MinIO -> Postgres.
+
+Jobs arrive open-loop (Poisson) at --rate per second for --duration seconds.
+Each one uploads an image through POST /images/upload, creates a job through
+POST /jobs/ and follows its SSE progress stream. Queue wait and end-to-end
+latency come from the queued_at/started_at timestamps the server puts on the
+progress events (the terminal event always carries them), so jobs that start
+before the client subscribes are measured too. Step durations come from the
+timestamps of consecutive events the client observed. Run it against local
+stand-ins so numbers are reproducible:
+
+    LLM_BACKEND=mock docker compose --profile mock up -d
+    python -m benchmarks.pipeline run --rate 0.5 --duration 120 --out baseline.json
+    python -m benchmarks.pipeline compare baseline.json candidate.json
+"""
+import io
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+from datetime import datetime, timezone
+import httpx
+from PIL import Image
+
+# Progress milestones published by the worker, mapped to the step they end
+STEP_ENDS = {30.0: "analysis", 60.0: "plan", 80.0: "prompt", 100.0: "render"}
+PERCENTILES = (50, 95, 99)
+
+
+def _synthetic_image(seed: int, size=(1600, 1200)) -> bytes:
+    """
+    A random-noise JPEG, so each upload has a distinct content hash and
+    misses the analysis cache like a real photo would.
+    """
+    rng = random.Random(seed)
+    image = Image.new("RGB", (64, 48))
+    image.putdata([tuple(rng.randrange(256) for _ in range(3)) for _ in range(64 * 48)])
+    buffer = io.BytesIO()
+    image.resize(size).save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def _percentile(ordered: list, q: float) -> float:
+    index = (len(ordered) - 1) * q / 100
+    low = int(index)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (index - low)
+
+
+def summarize(samples: list) -> dict:
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    summary = {"count": len(ordered), "mean": sum(ordered) / len(ordered), "max": ordered[-1]}
+    for q in PERCENTILES:
+        summary[f"p{q}"] = _percentile(ordered, q)
+    return summary
+
+
+async def _follow_job(client: httpx.AsyncClient, job_id: str, timeout: float) -> list:
+    events = []
+    async with client.stream("GET", f"/jobs/{job_id}/events", timeout=httpx.Timeout(timeout, read=timeout)) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            event = json.loads(line[len("data: "):])
+            events.append(event)
+            if event["status"] in ("completed", "error"):
+                break
+    return events
+
+
+def _latest(events: list, field: str):
+    return next((e[field] for e in reversed(events) if e.get(field) is not None), None)
+
+
+def _step_durations(events: list) -> dict:
+    """
+    Queue wait (first start minus creation) and per-step durations. A step
+    is only counted when the events at both of its ends were observed. A
+    status of "queued" after work started is a retry; its wait is counted
+    as retry time rather than as a step.
+    """
+    durations = {}
+    queued_at, started_at = _latest(events, "queued_at"), _latest(events, "started_at")
+    if queued_at is not None and started_at is not None:
+        durations["queue_wait"] = started_at - queued_at
+
+    previous = None
+    for event in events:
+        if previous is None:
+            if event["status"] != "queued":
+                previous = event
+            continue
+        if event["timestamp"] <= previous["timestamp"]:
+            continue
+        elapsed = event["timestamp"] - previous["timestamp"]
+        step = STEP_ENDS.get(event["progress_percent"])
+        if event["status"] == "queued" or previous["status"] == "queued":
+            durations["retry_wait"] = durations.get("retry_wait", 0.0) + elapsed
+        elif step == "prompt" and previous["progress_percent"] == 30.0:
+            # Fused mode writes the plan and the prompt in one call
+            durations["plan_and_prompt"] = elapsed
+        elif step and event["status"] != "error":
+            durations[step] = durations.get(step, 0.0) + elapsed
+        previous = event
+    return durations
+
+
+async def _run_one(client: httpx.AsyncClient, index: int, args, results: list):
+    record = {"index": index, "arrived_at": time.time()}
+    results.append(record)
+    try:
+        image = _synthetic_image(args.seed * 1_000_003 + index if args.unique_images else args.seed)
+        started = time.perf_counter()
+        response = await client.post(
+            "/images/upload",
+            params={"speculative_analysis": str(args.speculative).lower()},
+            files={"file": (f"bench-{index}.jpg", image, "image/jpeg")}
+        )
+        response.raise_for_status()
+        record["upload_seconds"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        record["submitted_at"] = time.time()
+        response = await client.post("/jobs/", json={
+            "image_id": response.json()["id"],
+            "room_type": args.room_type,
+            "style_preset": args.style,
+        })
+        response.raise_for_status()
+        record["create_job_seconds"] = time.perf_counter() - started
+        record["job_id"] = response.json()["id"]
+
+        events = await _follow_job(client, record["job_id"], args.job_timeout)
+        record["status"] = events[-1]["status"] if events else "unknown"
+        record["steps"] = _step_durations(events)
+        if record["status"] == "completed":
+            # Server creation time when available, else the client's submit time
+            created = _latest(events, "queued_at") or record["submitted_at"]
+            record["end_to_end_seconds"] = events[-1]["timestamp"] - created
+            record["completed_at"] = time.time()
+    except httpx.TimeoutException:
+        record["status"] = "timeout"
+    except Exception as e:
+        record["status"] = "client_error"
+        record["error"] = f"{type(e).__name__}: {e}"
+
+
+async def run(args) -> dict:
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=100)
+    results: list = []
+    started_at = time.time()
+    async with httpx.AsyncClient(base_url=args.api, limits=limits, timeout=60.0) as client:
+        tasks = []
+        index = 0
+        deadline = time.monotonic() + args.duration
+        while time.monotonic() < deadline:
+            tasks.append(asyncio.create_task(_run_one(client, index, args, results)))
+            index += 1
+            await asyncio.sleep(rng.expovariate(args.rate))
+        print(f"Submitted {index} jobs, waiting for them to finish...", file=sys.stderr)
+        await asyncio.gather(*tasks)
+
+    completed = [r for r in results if r.get("status") == "completed"]
+    statuses: dict = {}
+    for record in results:
+        statuses[record.get("status", "unknown")] = statuses.get(record.get("status", "unknown"), 0) + 1
+
+    window = (max(r["completed_at"] for r in completed) - started_at) if completed else 0.0
+    step_names = sorted({name for r in results for name in r.get("steps", {})})
+    return {
+        "config": {
+            "api": args.api,
+            "rate_per_second": args.rate,
+            "duration_seconds": args.duration,
+            "room_type": args.room_type,
+            "style_preset": args.style,
+            "speculative_analysis": args.speculative,
+            "unique_images": args.unique_images,
+            "seed": args.seed,
+            "label": args.label,
+        },
+        "environment": {"python": platform.python_version(), "host": platform.node()},
+        "started_at": datetime.fromtimestamp(started_at, timezone.utc).isoformat(),
+        "summary": {
+            "submitted": len(results),
+            "statuses": statuses,
+            "throughput_jobs_per_minute": 60.0 * len(completed) / window if window else 0.0,
+        },
+        "latency_seconds": {
+            "upload": summarize([r["upload_seconds"] for r in results if "upload_seconds" in r]),
+            "create_job": summarize([r["create_job_seconds"] for r in results if "create_job_seconds" in r]),
+            "end_to_end": summarize([r["end_to_end_seconds"] for r in completed]),
+            **{
+                f"step.{name}": summarize([r["steps"][name] for r in results if name in r.get("steps", {})])
+                for name in step_names
+            },
+        },
+        "jobs": results if args.include_jobs else None,
+    }
+
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> bool:
+    """
+    Prints percentile deltas per metric. Returns False if any p95 got worse
+    by more than `threshold` (a fraction), or throughput dropped by as much.
+    """
+    ok = True
+    print(f"{'metric':<24}" + "".join(f"{f'p{q} base':>12}{f'p{q} new':>12}{'delta':>9}" for q in PERCENTILES))
+    for metric in sorted(set(baseline["latency_seconds"]) | set(candidate["latency_seconds"])):
+        base = baseline["latency_seconds"].get(metric, {})
+        new = candidate["latency_seconds"].get(metric, {})
+        row, regressed = f"{metric:<24}", False
+        for q in PERCENTILES:
+            b, n = base.get(f"p{q}"), new.get(f"p{q}")
+            delta = (n - b) / b if b and n is not None else None
+            row += f"{b if b is not None else float('nan'):>12.3f}{n if n is not None else float('nan'):>12.3f}"
+            row += f"{delta:>+9.1%}" if delta is not None else f"{'n/a':>9}"
+            if q == 95 and delta is not None and delta > threshold:
+                regressed = True
+        ok = ok and not regressed
+        print(row + ("  REGRESSION" if regressed else ""))
+
+    base_tp = baseline["summary"]["throughput_jobs_per_minute"]
+    new_tp = candidate["summary"]["throughput_jobs_per_minute"]
+    print(f"\nthroughput (jobs/min): {base_tp:.2f} -> {new_tp:.2f}")
+    if base_tp and (base_tp - new_tp) / base_tp > threshold:
+        ok = False
+        print("throughput REGRESSION")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subcommands.add_parser("run", help="Drive load and write a JSON report")
+    run_parser.add_argument("--api", default="http://localhost:8000/api/v1")
+    run_parser.add_argument("--rate", type=float, default=0.5, help="Job arrivals per second")
+    run_parser.add_argument("--duration", type=float, default=60.0, help="Seconds to keep submitting jobs")
+    run_parser.add_argument("--job-timeout", type=float, default=600.0)
+    run_parser.add_argument("--room-type", default="living_room")
+    run_parser.add_argument("--style", default="modern")
+    run_parser.add_argument("--speculative", action=argparse.BooleanOptionalAction, default=False)
+    run_parser.add_argument("--unique-images", action=argparse.BooleanOptionalAction, default=True)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--label", default=None, help="Free-form tag stored in the report")
+    run_parser.add_argument("--include-jobs", action="store_true", help="Keep per-job records in the report")
+    run_parser.add_argument("--out", default=None, help="Report path (default: stdout)")
+
+    compare_parser = subcommands.add_parser("compare", help="Compare two reports")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="Allowed p95 regression (fraction)")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        report = asyncio.run(run(args))
+        output = json.dumps(report, indent=2)
+        if args.out:
+            with open(args.out, "w") as f:
+                f.write(output)
+            print(f"Wrote {args.out}", file=sys.stderr)
+        else:
+            print(output)
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.candidate) as f:
+            candidate = json.load(f)
+        sys.exit(0 if compare(baseline, candidate, args.threshold) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import fakeredis
+import pytest
+from app.core.config import settings
+from app.services import checkpoints, circuit_breaker, rate_limiter, singleflight
+
+# Modules that import get_async_redis by name
+REDIS_USERS = (checkpoints, circuit_breaker, rate_limiter, singleflight)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    """
+    In-memory Redis (with Lua) standing in for get_async_redis everywhere.
+    """
+    client = fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer())
+    for module in REDIS_USERS:
+        monkeypatch.setattr(module, "get_async_redis", lambda: client)
+    return client
+
+
+@pytest.fixture
+def config(monkeypatch):
+    """
+    Overrides settings for one test: config(NAME=value, ...).
+    """
+    def override(**values):
+        for name, value in values.items():
+            monkeypatch.setattr(settings, name, value)
+    return override
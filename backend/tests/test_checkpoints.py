@@ -0,0 +1,48 @@
+import pytest
+from app.services import checkpoints
+from app.services.checkpoints import (
+    load_checkpoints, save_checkpoint, clear_checkpoints, ANALYSIS, PLAN, PROMPT, KEY_PREFIX
+)
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_retry_resumes_after_the_last_saved_step(redis):
+    first_attempt = await load_checkpoints("job-1")
+    assert first_attempt == {}
+    await save_checkpoint("job-1", first_attempt, ANALYSIS, "a kitchen")
+    await save_checkpoint("job-1", first_attempt, PLAN, "add a table")
+    assert first_attempt == {ANALYSIS: "a kitchen", PLAN: "add a table"}
+
+    retry = await load_checkpoints("job-1")
+    assert retry == {ANALYSIS: "a kitchen", PLAN: "add a table"}
+    assert PROMPT not in retry
+
+
+async def test_checkpoints_expire(redis, config):
+    config(JOB_CHECKPOINT_TTL_SECONDS=120)
+    await save_checkpoint("job-1", {}, ANALYSIS, "a kitchen")
+    assert 0 < await redis.ttl(f"{KEY_PREFIX}job-1") <= 120
+
+
+async def test_jobs_do_not_share_checkpoints(redis):
+    await save_checkpoint("job-1", {}, ANALYSIS, "a kitchen")
+    assert await load_checkpoints("job-2") == {}
+
+
+async def test_clear_starts_over(redis):
+    await save_checkpoint("job-1", {}, ANALYSIS, "a kitchen")
+    await clear_checkpoints("job-1")
+    assert await load_checkpoints("job-1") == {}
+
+
+async def test_unavailable_redis_reruns_every_step(monkeypatch):
+    def unavailable():
+        raise ConnectionError("redis is down")
+
+    monkeypatch.setattr(checkpoints, "get_async_redis", unavailable)
+    assert await load_checkpoints("job-1") == {}
+    saved = {}
+    await save_checkpoint("job-1", saved, ANALYSIS, "a kitchen")
+    # Still usable within the current attempt
+    assert saved == {ANALYSIS: "a kitchen"}
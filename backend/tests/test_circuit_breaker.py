@@ -0,0 +1,116 @@
+import time
+import httpx
+import pytest
+from app.services import circuit_breaker
+from app.services.circuit_breaker import (
+    CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN, PROBE_WAIT_SECONDS
+)
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def breaker(redis, config):
+    config(CIRCUIT_FAILURE_THRESHOLD=3, CIRCUIT_OPEN_SECONDS=30)
+    return CircuitBreaker("test")
+
+
+async def _ok():
+    return "ok"
+
+
+async def _server_error():
+    request = httpx.Request("POST", "https://openrouter.ai")
+    raise httpx.HTTPStatusError("Bad Gateway", request=request, response=httpx.Response(502, request=request))
+
+
+async def _client_error():
+    raise ValueError("bad request")
+
+
+async def _fail(breaker, fn, times: int):
+    for _ in range(times):
+        with pytest.raises(Exception):
+            await breaker.call(fn)
+
+
+async def _end_open_period(redis, breaker):
+    await redis.set(breaker._open_until_key, time.time() - 1)
+
+
+async def test_opens_after_threshold_failures(breaker):
+    await _fail(breaker, _server_error, 2)
+    assert (await breaker.state())[0] == CLOSED
+    await _fail(breaker, _server_error, 1)
+    state, remaining = await breaker.state()
+    assert state == OPEN
+    assert 29 < remaining <= 30
+
+
+async def test_open_circuit_rejects_without_calling(breaker):
+    await _fail(breaker, _server_error, 3)
+    called = False
+
+    async def fn():
+        nonlocal called
+        called = True
+
+    with pytest.raises(CircuitOpenError) as exc:
+        await breaker.call(fn)
+    assert not called
+    assert exc.value.retry_after > 29
+
+
+async def test_client_errors_do_not_count(breaker):
+    await _fail(breaker, _client_error, 5)
+    assert (await breaker.state())[0] == CLOSED
+
+
+async def test_success_resets_failure_count(breaker):
+    await _fail(breaker, _server_error, 2)
+    assert await breaker.call(_ok) == "ok"
+    await _fail(breaker, _server_error, 2)
+    assert (await breaker.state())[0] == CLOSED
+
+
+async def test_successful_probe_closes(redis, breaker):
+    await _fail(breaker, _server_error, 3)
+    await _end_open_period(redis, breaker)
+    assert (await breaker.state())[0] == HALF_OPEN
+    assert await breaker.call(_ok) == "ok"
+    assert (await breaker.state())[0] == CLOSED
+
+
+async def test_failed_probe_reopens(redis, breaker):
+    await _fail(breaker, _server_error, 3)
+    await _end_open_period(redis, breaker)
+    await _fail(breaker, _server_error, 1)
+    assert (await breaker.state())[0] == OPEN
+
+
+async def test_client_error_probe_frees_the_probe_slot(redis, breaker):
+    await _fail(breaker, _server_error, 3)
+    await _end_open_period(redis, breaker)
+    await _fail(breaker, _client_error, 1)
+    assert (await breaker.state())[0] == HALF_OPEN
+    assert not await breaker.probing()
+
+
+async def test_only_one_probe_at_a_time(redis, breaker):
+    await _fail(breaker, _server_error, 3)
+    await _end_open_period(redis, breaker)
+    await redis.set(breaker._probe_key, 1)
+    with pytest.raises(CircuitOpenError) as exc:
+        await breaker.call(_ok)
+    assert exc.value.retry_after == PROBE_WAIT_SECONDS
+
+
+async def test_open_circuit_wait_counts_open_and_probing(redis, breaker, monkeypatch):
+    monkeypatch.setattr(circuit_breaker, "BREAKERS", (breaker,))
+    assert await circuit_breaker.open_circuit_wait_seconds() == 0.0
+    await _fail(breaker, _server_error, 3)
+    assert await circuit_breaker.open_circuit_wait_seconds() > 29
+    await _end_open_period(redis, breaker)
+    assert await circuit_breaker.open_circuit_wait_seconds() == 0.0
+    await redis.set(breaker._probe_key, 1)
+    assert await circuit_breaker.open_circuit_wait_seconds() == PROBE_WAIT_SECONDS
@@ -0,0 +1,113 @@
+import uuid
+from datetime import datetime, timedelta
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+from app.api.routes.jobs import list_jobs, _encode_cursor, _decode_cursor
+
+pytestmark = pytest.mark.anyio
+
+FILTERS = dict(status=None, room_type=None, style_preset=None, user_id=None,
+               parent_job_id=None, include_batch_parents=False)
+
+
+class _Row:
+    def __init__(self, mapping: dict):
+        self._mapping = mapping
+
+
+class FakeSession:
+    """
+    Serves list_jobs from a list, applying the keyset condition for the
+    cursor it is given the way Postgres would.
+    """
+    def __init__(self, jobs: list):
+        self.jobs = sorted(jobs, key=lambda j: (j["created_at"], j["id"]), reverse=True)
+        self.cursor = None
+        self.statements = []
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        rows = self.jobs
+        if self.cursor:
+            after = _decode_cursor(self.cursor)
+            rows = [j for j in rows if (j["created_at"], j["id"]) < after]
+        return [_Row(j) for j in rows[:stmt._limit]]
+
+
+def _jobs(count: int, same_time: bool = False) -> list:
+    base = datetime(2026, 1, 1, 12, 0, 0, 123456)
+    return [
+        {"id": uuid.uuid4(), "created_at": base if same_time else base + timedelta(microseconds=i)}
+        for i in range(count)
+    ]
+
+
+async def _all_pages(db: FakeSession, limit: int) -> list:
+    pages, cursor = [], None
+    while True:
+        db.cursor = cursor
+        page = await list_jobs(limit=limit, cursor=cursor, db=db, **FILTERS)
+        pages.append(page["jobs"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def test_cursor_round_trips_microseconds():
+    created_at, job_id = datetime(2026, 1, 1, 12, 0, 0, 1), uuid.uuid4()
+    assert _decode_cursor(_encode_cursor(created_at, job_id)) == (created_at, job_id)
+
+
+@pytest.mark.parametrize("cursor", ["", "not base64!", "bm8tc2VwYXJhdG9y", "MjAyNi0wMS0wMXxub3QtYS11dWlk"])
+def test_invalid_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as exc:
+        _decode_cursor(cursor)
+    assert exc.value.status_code == 400
+
+
+async def test_no_next_cursor_when_the_page_is_exactly_full():
+    db = FakeSession(_jobs(3))
+    page = await list_jobs(limit=3, cursor=None, db=db, **FILTERS)
+    assert len(page["jobs"]) == 3
+    assert page["next_cursor"] is None
+
+
+async def test_next_cursor_points_at_the_last_row():
+    db = FakeSession(_jobs(4))
+    page = await list_jobs(limit=3, cursor=None, db=db, **FILTERS)
+    last = page["jobs"][-1]
+    assert _decode_cursor(page["next_cursor"]) == (last["created_at"], last["id"])
+
+
+async def test_empty_list():
+    page = await list_jobs(limit=10, cursor=None, db=FakeSession([]), **FILTERS)
+    assert page == {"jobs": [], "next_cursor": None}
+
+
+@pytest.mark.parametrize("same_time", [False, True])
+async def test_paging_visits_every_job_once(same_time):
+    jobs = _jobs(10, same_time=same_time)
+    pages = await _all_pages(FakeSession(jobs), limit=3)
+    assert [len(page) for page in pages] == [3, 3, 3, 1]
+    seen = [job["id"] for page in pages for job in page]
+    assert sorted(seen) == sorted(job["id"] for job in jobs)
+    assert len(set(seen)) == len(seen)
+
+
+async def test_query_uses_the_keyset_and_fetches_one_extra_row():
+    db = FakeSession(_jobs(1))
+    cursor = _encode_cursor(datetime(2026, 1, 1), uuid.uuid4())
+    db.cursor = cursor
+    await list_jobs(limit=5, cursor=cursor, db=db, **FILTERS)
+    sql = str(db.statements[0].compile(dialect=postgresql.dialect()))
+    assert "(jobs.created_at, jobs.id) < (" in sql
+    assert "ORDER BY jobs.created_at DESC, jobs.id DESC" in sql
+    assert "jobs.is_batch_parent = false" in sql
+    assert db.statements[0]._limit == 6
+
+
+async def test_batch_parents_can_be_included():
+    db = FakeSession([])
+    await list_jobs(limit=5, cursor=None, db=db, **{**FILTERS, "include_batch_parents": True})
+    assert "is_batch_parent" not in str(db.statements[0].compile(dialect=postgresql.dialect()))
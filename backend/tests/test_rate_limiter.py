@@ -0,0 +1,142 @@
+import time
+import httpx
+import pytest
+from app.services.rate_limiter import RateLimiter, RateLimited, _throttle_info
+
+pytestmark = pytest.mark.anyio
+
+MODEL = "openrouter/test/model"
+
+
+def _throttled(retry_after: str = None) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "https://openrouter.ai/api/v1/chat/completions")
+    headers = {"retry-after": retry_after} if retry_after is not None else {}
+    response = httpx.Response(429, headers=headers, request=request)
+    return httpx.HTTPStatusError("Too Many Requests", request=request, response=response)
+
+
+async def _limit(redis, limiter) -> float:
+    return float(await redis.get(limiter._keys(MODEL)["limit"]))
+
+
+async def test_burst_up_to_requests_per_minute(redis, config):
+    config(RATE_LIMIT_REQUESTS_PER_MINUTE=3, RATE_LIMIT_MAX_WAIT_SECONDS=0)
+    limiter = RateLimiter()
+    for _ in range(3):
+        await limiter._acquire(redis, MODEL, 10)
+    with pytest.raises(RateLimited):
+        await limiter._acquire(redis, MODEL, 10)
+
+
+async def test_bucket_refills_over_time(redis, config):
+    config(RATE_LIMIT_REQUESTS_PER_MINUTE=60, RATE_LIMIT_INITIAL_CONCURRENCY=64, RATE_LIMIT_MAX_WAIT_SECONDS=0)
+    limiter = RateLimiter()
+    # Empty half a minute ago: half the per-minute capacity is back
+    await redis.hset(limiter._keys(MODEL)["rpm"], mapping={"tokens": 0, "ts": time.time() - 30})
+    for _ in range(29):
+        await limiter._acquire(redis, MODEL, 10)
+    await redis.hset(limiter._keys(MODEL)["rpm"], mapping={"tokens": 0, "ts": time.time()})
+    with pytest.raises(RateLimited):
+        await limiter._acquire(redis, MODEL, 10)
+
+
+async def test_tokens_per_minute_bucket(redis, config):
+    config(RATE_LIMIT_TOKENS_PER_MINUTE=1000, RATE_LIMIT_MAX_WAIT_SECONDS=0)
+    limiter = RateLimiter()
+    await limiter._acquire(redis, MODEL, 900)
+    with pytest.raises(RateLimited):
+        await limiter._acquire(redis, MODEL, 200)
+
+
+async def test_concurrency_limit_counts_leases(redis, config):
+    config(RATE_LIMIT_INITIAL_CONCURRENCY=2, RATE_LIMIT_MAX_WAIT_SECONDS=0)
+    limiter = RateLimiter()
+    first = await limiter._acquire(redis, MODEL, 10)
+    await limiter._acquire(redis, MODEL, 10)
+    with pytest.raises(RateLimited):
+        await limiter._acquire(redis, MODEL, 10)
+    await limiter._release(redis, MODEL, first, "ok")
+    await limiter._acquire(redis, MODEL, 10)
+
+
+async def test_success_raises_limit_additively(redis, config):
+    config(RATE_LIMIT_INITIAL_CONCURRENCY=4)
+    limiter = RateLimiter()
+
+    async def call():
+        return "ok", None
+
+    assert await limiter.run(MODEL, 10, call) == "ok"
+    assert await _limit(redis, limiter) == pytest.approx(4.25)
+
+
+async def test_throttle_halves_limit_and_retries_after_retry_after(redis, config):
+    config(RATE_LIMIT_INITIAL_CONCURRENCY=8)
+    limiter = RateLimiter()
+    calls = []
+
+    async def call():
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise _throttled("0.3")
+        return "ok", None
+
+    assert await limiter.run(MODEL, 10, call) == "ok"
+    assert len(calls) == 2
+    assert calls[1] - calls[0] >= 0.25
+    # Halved by the 429, then +1/limit for the success
+    assert await _limit(redis, limiter) == pytest.approx(4.25)
+
+
+async def test_throttle_gives_up_after_max_retries(redis, config):
+    config(RATE_LIMIT_MAX_RETRIES=1, RATE_LIMIT_MIN_CONCURRENCY=1)
+    limiter = RateLimiter()
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        raise _throttled("0")
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await limiter.run(MODEL, 10, call)
+    assert calls == 2
+
+
+async def test_concurrent_throttles_back_off_once(redis, config):
+    config(RATE_LIMIT_INITIAL_CONCURRENCY=8)
+    limiter = RateLimiter()
+    leases = [await limiter._acquire(redis, MODEL, 10) for _ in range(3)]
+    for lease in leases:
+        await limiter._release(redis, MODEL, lease, "throttled", retry_after=5.0)
+    assert await _limit(redis, limiter) == pytest.approx(4.0)
+
+
+async def test_limit_stays_within_bounds(redis, config):
+    config(RATE_LIMIT_INITIAL_CONCURRENCY=2, RATE_LIMIT_MIN_CONCURRENCY=2, RATE_LIMIT_MAX_CONCURRENCY=3)
+    limiter = RateLimiter()
+    lease = await limiter._acquire(redis, MODEL, 10)
+    await limiter._release(redis, MODEL, lease, "throttled", retry_after=0.0)
+    assert await _limit(redis, limiter) == pytest.approx(2.0)
+    for _ in range(10):
+        lease = await limiter._acquire(redis, MODEL, 10)
+        await limiter._release(redis, MODEL, lease, "ok")
+    assert await _limit(redis, limiter) == pytest.approx(3.0)
+
+
+def test_throttle_info_reads_retry_after():
+    assert _throttle_info(_throttled("12")) == 12.0
+    assert _throttle_info(_throttled("-3")) == 0.0
+
+
+def test_throttle_info_defaults_without_header(config):
+    config(RATE_LIMIT_DEFAULT_RETRY_AFTER_SECONDS=7.0)
+    assert _throttle_info(_throttled()) == 7.0
+    assert _throttle_info(_throttled("soon")) == 7.0
+
+
+def test_throttle_info_ignores_other_errors():
+    request = httpx.Request("POST", "https://openrouter.ai")
+    error = httpx.HTTPStatusError("Bad", request=request, response=httpx.Response(400, request=request))
+    assert _throttle_info(error) is None
+    assert _throttle_info(ValueError("nope")) is None
@@ -0,0 +1,114 @@
+import asyncio
+import httpx
+import pytest
+from app.services.singleflight import coalesce, error_types, SingleflightError, LOCK_PREFIX
+
+pytestmark = pytest.mark.anyio
+
+
+async def _started(redis, key: str):
+    # Until the leader holds the lock, another caller would lead too
+    while not await redis.exists(f"{LOCK_PREFIX}{key}"):
+        await asyncio.sleep(0.01)
+
+
+async def test_followers_share_the_leaders_result(redis):
+    calls = 0
+    release = asyncio.Event()
+
+    async def fn():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "result"
+
+    leader = asyncio.create_task(coalesce("k", fn))
+    await _started(redis, "k")
+    followers = [asyncio.create_task(coalesce("k", fn)) for _ in range(3)]
+    await asyncio.sleep(0.05)
+    release.set()
+    assert await asyncio.gather(leader, *followers) == ["result"] * 4
+    assert calls == 1
+
+
+@pytest.mark.parametrize("value", [b"\x89PNG", None, ""])
+async def test_bytes_and_empty_results(redis, value):
+    release = asyncio.Event()
+
+    async def fn():
+        await release.wait()
+        return value
+
+    leader = asyncio.create_task(coalesce("k", fn))
+    await _started(redis, "k")
+    follower = asyncio.create_task(coalesce("k", fn))
+    await asyncio.sleep(0.05)
+    release.set()
+    assert await asyncio.gather(leader, follower) == [value, value]
+
+
+async def test_follower_gets_an_equivalent_error(redis):
+    release = asyncio.Event()
+
+    async def fn():
+        await release.wait()
+        request = httpx.Request("POST", "https://openrouter.ai")
+        response = httpx.Response(429, headers={"retry-after": "7"}, text="slow down", request=request)
+        raise httpx.HTTPStatusError("Too Many Requests", request=request, response=response)
+
+    leader = asyncio.create_task(coalesce("k", fn))
+    await _started(redis, "k")
+    follower = asyncio.create_task(coalesce("k", fn))
+    await asyncio.sleep(0.05)
+    release.set()
+    with pytest.raises(httpx.HTTPStatusError):
+        await leader
+    with pytest.raises(SingleflightError) as exc:
+        await follower
+    error = exc.value
+    assert str(error) == "Too Many Requests"
+    assert "HTTPStatusError" in error_types(error)
+    assert error.status_code == 429
+    assert error.response.headers["retry-after"] == "7"
+    assert error.response.text == "slow down"
+
+
+async def test_cancelled_leader_hands_over_to_a_follower(redis):
+    calls = 0
+
+    async def fn():
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            await asyncio.sleep(60)
+        return "retried"
+
+    leader = asyncio.create_task(coalesce("k", fn))
+    await _started(redis, "k")
+    follower = asyncio.create_task(coalesce("k", fn))
+    await asyncio.sleep(0.05)
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    assert await asyncio.wait_for(follower, 5) == "retried"
+    assert calls == 2
+
+
+async def test_release_keeps_a_lock_taken_over_by_another_leader(redis):
+    async def fn():
+        # The lock expired and another worker now leads this key
+        await redis.set(f"{LOCK_PREFIX}k", "other-token")
+        return "mine"
+
+    assert await coalesce("k", fn) == "mine"
+    assert await redis.get(f"{LOCK_PREFIX}k") == b"other-token"
+
+
+async def test_disabled_calls_directly(redis, config):
+    config(SINGLEFLIGHT_ENABLED=False)
+
+    async def fn():
+        return "direct"
+
+    assert await coalesce("k", fn) == "direct"
+    assert not await redis.exists(f"{LOCK_PREFIX}k")
@@ -2,17 +2,32 @@ import React, { useState, useEffect } from 'react';
 import Header from '../components/Common/Header';
 import { Link } from 'react-router-dom';
 import { Plus, Image as ImageIcon, Clock, CheckCircle2, AlertCircle, ArrowRight, Loader2, Trash2 } from 'lucide-react';
-import api from '../services/api';
+import api, { getJobResultUrl } from '../services/api';
+import { useSignedUrl } from '../services/signedUrls';
+
+const JobThumbnail = ({ job }) => {
+    const src = useSignedUrl(getJobResultUrl, job.id, job.result_url);
+    return src ? (
+        <img
+            src={src}
+            alt={job.room_type}
+            className="w-full h-full object-cover transition-transform duration-500 group-hover:scale-105"
+        />
+    ) : null;
+};
 
 const Gallery = () => {
     const [jobs, setJobs] = useState([]);
     const [isLoading, setIsLoading] = useState(true);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [isLoadingMore, setIsLoadingMore] = useState(false);
 
     useEffect(() => {
         const fetchJobs = async () => {
             try {
                 const response = await api.get('/jobs');
                 setJobs(response.data.jobs || []);
+                setNextCursor(response.data.next_cursor || null);
             } catch (e) {
                 console.error("Failed to fetch jobs");
             } finally {
@@ -22,6 +37,20 @@ const Gallery = () => {
         fetchJobs();
     }, []);
 
+    const loadMore = async () => {
+        if (!nextCursor) return;
+        setIsLoadingMore(true);
+        try {
+            const response = await api.get('/jobs', { params: { cursor: nextCursor } });
+            setJobs(prevJobs => [...prevJobs, ...(response.data.jobs || [])]);
+            setNextCursor(response.data.next_cursor || null);
+        } catch (e) {
+            console.error("Failed to fetch more jobs");
+        } finally {
+            setIsLoadingMore(false);
+        }
+    };
+
     const handleDelete = async (e, jobId) => {
         // Prevent clicking the parent Link
         e.preventDefault();
@@ -125,11 +154,7 @@ const Gallery = () => {
                             >
                                 <div className="aspect-[4/3] bg-surface-container relative overflow-hidden">
                                     {job.result_url ? (
-                                        <img
-                                            src={job.result_url}
-                                            alt={job.room_type}
-                                            className="w-full h-full object-cover transition-transform duration-500 group-hover:scale-105"
-                                        />
+                                        <JobThumbnail job={job} />
                                     ) : (
                                         <div className="absolute inset-0 flex items-center justify-center">
                                             <Loader2 size={24} className="text-on-surface-muted animate-spin" />
@@ -174,6 +199,19 @@ const Gallery = () => {
                         ))}
                     </div>
                 )}
+
+                {nextCursor && (
+                    <div className="flex justify-center mt-10">
+                        <button
+                            onClick={loadMore}
+                            disabled={isLoadingMore}
+                            className="inline-flex items-center gap-2 bg-surface border border-outline-variant px-6 py-2.5 rounded-lg font-medium text-primary hover:border-accent/50 transition-colors disabled:opacity-50"
+                        >
+                            {isLoadingMore && <Loader2 size={16} className="animate-spin" />}
+                            Load more
+                        </button>
+                    </div>
+                )}
             </main>
         </div>
     );
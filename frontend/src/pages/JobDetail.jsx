@@ -4,7 +4,8 @@ import { ArrowLeft, Download, Info, Zap, ShieldCheck, RefreshCw, Loader2 } from
 import Header from '../components/Common/Header';
 import RenderingProgress from '../components/Staging/RenderingProgress';
 import BeforeAfterSlider from '../components/Results/BeforeAfterSlider';
-import { getJobStatus, createStagingJob } from '../services/api';
+import { getJobStatus, createStagingJob, subscribeToJobUpdates, getImageDownloadUrl, getJobResultUrl } from '../services/api';
+import { useSignedUrl } from '../services/signedUrls';
 
 const JobDetail = () => {
     const { jobId } = useParams();
@@ -12,6 +13,8 @@ const JobDetail = () => {
     const [job, setJob] = useState(null);
     const [error, setError] = useState(null);
     const [isRetrying, setIsRetrying] = useState(false);
+    const originalUrl = useSignedUrl(getImageDownloadUrl, job?.image_id, job?.original_image_url);
+    const resultUrl = useSignedUrl(getJobResultUrl, job?.status === 'completed' ? job.id : null, job?.result_url);
 
     const handleRetry = async () => {
         if (!job) return;
@@ -39,23 +42,42 @@ const JobDetail = () => {
         setJob(null);
         setError(null);
         let interval;
+        let unsubscribe;
+        const isFinished = (data) => data.status === 'completed' || data.status === 'error';
+
         const fetchStatus = async () => {
             try {
                 const data = await getJobStatus(jobId);
                 setJob(data);
-                if (data.status === 'completed' || data.status === 'error') {
+                if (isFinished(data)) {
                     clearInterval(interval);
                 }
+                return data;
             } catch (e) {
                 setError("Failed to load job details");
                 clearInterval(interval);
             }
         };
 
-        fetchStatus();
-        interval = setInterval(fetchStatus, 3000);
+        // Load the job once, then follow progress over SSE; fall back to polling
+        fetchStatus().then((data) => {
+            if (!data || isFinished(data)) return;
+            unsubscribe = subscribeToJobUpdates(
+                jobId,
+                (update) => {
+                    setJob((current) => ({ ...current, ...update, id: current.id }));
+                    if (update.status === 'completed') fetchStatus();
+                },
+                () => {
+                    interval = setInterval(fetchStatus, 3000);
+                }
+            );
+        });
 
-        return () => clearInterval(interval);
+        return () => {
+            clearInterval(interval);
+            if (unsubscribe) unsubscribe();
+        };
     }, [jobId]);
 
     return (
@@ -105,8 +127,8 @@ const JobDetail = () => {
                         <div className="lg:col-span-8 animate-fade-in">
                             {job.status === 'completed' ? (
                                 <BeforeAfterSlider
-                                    original={job.original_image_url}
-                                    staged={job.result_url}
+                                    original={originalUrl}
+                                    staged={resultUrl}
                                 />
                             ) : job.status === 'error' ? (
                                 <div className="aspect-[4/3] bg-surface border border-outline-variant rounded-2xl flex flex-col items-center justify-center p-10 text-center">
@@ -137,7 +159,7 @@ const JobDetail = () => {
                                     <RenderingProgress job={job} />
                                     <div className="relative w-full min-h-[200px] overflow-hidden rounded-2xl shadow-elevation-4 border border-outline-variant bg-surface-container">
                                         <img
-                                            src={job.original_image_url}
+                                            src={originalUrl || undefined}
                                             alt="Original"
                                             className="w-full h-auto block opacity-60"
                                         />
@@ -192,7 +214,7 @@ const JobDetail = () => {
                                     <button
                                         onClick={async () => {
                                             try {
-                                                const response = await fetch(job.result_url);
+                                                const response = await fetch(resultUrl || job.result_url);
                                                 const blob = await response.blob();
                                                 const url = window.URL.createObjectURL(blob);
                                                 const link = document.createElement('a');
@@ -7,10 +7,27 @@ const api = axios.create({
 });
 
 export const uploadImage = async (file) => {
-    const formData = new FormData();
-    formData.append('file', file);
-    const response = await api.post('/images/upload', formData, {
-        headers: { 'Content-Type': 'multipart/form-data' },
+    // Upload straight to storage through a presigned form, then register the image
+    const contentType = file.type || 'application/octet-stream';
+    const { data: ticket } = await api.post('/images/presign', {
+        filename: file.name,
+        content_type: contentType,
+    });
+    const form = new FormData();
+    Object.entries(ticket.fields).forEach(([name, value]) => form.append(name, value));
+    // Storage only reads fields sent before the file
+    form.append('file', file);
+    const uploadResponse = await fetch(ticket.upload_url, {
+        method: 'POST',
+        body: form,
+    });
+    if (!uploadResponse.ok) {
+        throw new Error(`Upload failed with status ${uploadResponse.status}`);
+    }
+    const response = await api.post('/images/complete', {
+        object_name: ticket.object_name,
+        original_filename: file.name,
+        content_type: contentType,
     });
     return response.data;
 };
@@ -31,4 +48,32 @@ export const getJobStatus = async (jobId) => {
     return response.data;
 };
 
+// Short-lived presigned URLs, so images load even when the buckets are not public
+export const getImageDownloadUrl = async (imageId) => {
+    const response = await api.get(`/images/${imageId}/download-url`);
+    return response.data;
+};
+
+export const getJobResultUrl = async (jobId) => {
+    const response = await api.get(`/jobs/${jobId}/result-url`);
+    return response.data;
+};
+
+// Streams job progress over Server-Sent Events. Returns a function that closes the stream.
+export const subscribeToJobUpdates = (jobId, onUpdate, onError) => {
+    const source = new EventSource(`${API_BASE_URL}/jobs/${jobId}/events`);
+    source.onmessage = (event) => {
+        const update = JSON.parse(event.data);
+        onUpdate(update);
+        if (update.status === 'completed' || update.status === 'error') {
+            source.close();
+        }
+    };
+    source.onerror = (e) => {
+        source.close();
+        if (onError) onError(e);
+    };
+    return () => source.close();
+};
+
 export default api;
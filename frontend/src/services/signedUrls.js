@@ -0,0 +1,35 @@
+import { useState, useEffect } from 'react';
+
+// Presigned URLs per fetch function and id, reused until shortly before they expire
+const caches = new Map();
+const EXPIRY_MARGIN_MS = 30 * 1000;
+
+const getSignedUrl = async (fetchUrl, id) => {
+    if (!caches.has(fetchUrl)) caches.set(fetchUrl, new Map());
+    const cache = caches.get(fetchUrl);
+    const cached = cache.get(id);
+    if (cached && cached.expiresAt > Date.now()) {
+        return cached.url;
+    }
+    const { url, expires_in: expiresIn } = await fetchUrl(id);
+    cache.set(id, { url, expiresAt: Date.now() + expiresIn * 1000 - EXPIRY_MARGIN_MS });
+    return url;
+};
+
+// Resolves a presigned URL for `id` through `fetchUrl` (e.g. getJobResultUrl).
+// Returns null while loading or when `id` is empty; falls back to `fallbackUrl` on error.
+export const useSignedUrl = (fetchUrl, id, fallbackUrl = null) => {
+    const [url, setUrl] = useState(null);
+
+    useEffect(() => {
+        let cancelled = false;
+        setUrl(null);
+        if (!id) return undefined;
+        getSignedUrl(fetchUrl, id)
+            .then((signed) => { if (!cancelled) setUrl(signed); })
+            .catch(() => { if (!cancelled) setUrl(fallbackUrl); });
+        return () => { cancelled = true; };
+    }, [fetchUrl, id, fallbackUrl]);
+
+    return url;
+};